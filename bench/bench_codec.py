@@ -0,0 +1,173 @@
+#
+# Copyright 2009-2012 Alan Kennedy
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); 
+# you may not use this file except in compliance with the License. 
+# You may obtain a copy of the License at 
+#
+#    http://www.apache.org/licenses/LICENSE-2.0 
+#
+# Unless required by applicable law or agreed to in writing, software 
+# distributed under the License is distributed on an "AS IS" BASIS, 
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+# See the License for the specific language governing permissions and 
+# limitations under the License. 
+#
+
+#
+# Measures the throughput (MB/s of UTF-8 JSON text) and the allocations per call of JysonCodec.loads()
+# and JysonCodec.dumps() over the corpora generated by com.xhaus.jyson.bench.JysonCorpus, and compares
+# them with a stored baseline, so that regressions are visible.
+#
+# Run through build.xml, which compiles the corpus generator and sets the classpath:
+#
+#   ant bench                # compare with bench/baseline.json
+#   ant bench-baseline       # record bench/baseline.json, on the reference machine
+#
+# or directly, with the jyson classes and bench classes on the classpath:
+#
+#   jython bench/bench_codec.py [--save-baseline] [--repeat N] [--tolerance PERCENT] [corpus ...]
+#
+
+import os
+import sys
+import time
+from optparse import OptionParser
+
+import java
+from java.lang.management import ManagementFactory
+
+from com.xhaus.jyson import JysonCodec
+from com.xhaus.jyson.bench import JysonCorpus
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+def allocated_bytes():
+	"""Return the number of bytes allocated so far by the current thread, or None if the JVM cannot tell"""
+	try:
+		return ManagementFactory.getThreadMXBean().getThreadAllocatedBytes(java.lang.Thread.currentThread().getId())
+	except (AttributeError, java.lang.Throwable):
+		return None
+
+def utf8_length(text):
+	return len(java.lang.String(text).getBytes("UTF-8"))
+
+def make_cases(texts, objects):
+	"""Return the (name, function, number of bytes processed) of each case measured for a corpus"""
+	encoded_bytes = sum([utf8_length(JysonCodec.dumps(o)) for o in objects])
+	text_bytes = sum([utf8_length(t) for t in texts])
+	def loads_strict():
+		for t in texts:
+			JysonCodec.loads(t)
+	def loads_permissive():
+		for t in texts:
+			JysonCodec.loads(t, strict_mode=False)
+	def dumps_unicode():
+		for o in objects:
+			JysonCodec.dumps(o)
+	def dumps_emit_ascii():
+		for o in objects:
+			JysonCodec.dumps(o, emit_ascii=True)
+	return [
+		("loads_strict", loads_strict, text_bytes),
+		("loads_permissive", loads_permissive, text_bytes),
+		("dumps_unicode", dumps_unicode, encoded_bytes),
+		("dumps_emit_ascii", dumps_emit_ascii, encoded_bytes),
+	]
+
+def measure(fn, num_calls, repeat):
+	"""Return the best elapsed time of a call of fn, and the bytes allocated per call of loads() or dumps() within it"""
+	fn() # warm up
+	fn()
+	best = None
+	for ix in range(repeat):
+		start = time.time()
+		fn()
+		elapsed = time.time() - start
+		if best is None or elapsed < best:
+			best = elapsed
+	before = allocated_bytes()
+	fn()
+	after = allocated_bytes()
+	if before is None or after is None:
+		return best, None
+	return best, (after - before) / num_calls
+
+def run(corpora, repeat):
+	results = {}
+	for corpus in corpora:
+		texts = list(JysonCorpus.documents(corpus))
+		objects = [JysonCodec.loads(t) for t in texts]
+		for case, fn, num_bytes in make_cases(texts, objects):
+			elapsed, alloc_per_call = measure(fn, len(texts), repeat)
+			results["%s/%s" % (corpus, case)] = {
+				"mb_per_s": num_bytes / (1024.0 * 1024.0) / max(elapsed, 1e-9),
+				"alloc_per_call": alloc_per_call,
+			}
+	return results
+
+def change(value, base):
+	if value is None or not base:
+		return None
+	return (value - base) * 100.0 / base
+
+def fmt(value, pattern):
+	if value is None:
+		return "-"
+	return pattern % value
+
+def report(results, baseline, tolerance):
+	"""Print the results, beside the baseline, and return the number of regressions beyond the tolerance"""
+	regressions = 0
+	print "%-36s %10s %10s %8s %14s %14s %8s" % ("case", "MB/s", "base MB/s", "change", "bytes/call", "base", "change")
+	for key in sorted(results.keys()):
+		result = results[key]
+		base = baseline.get(key, {})
+		speed_change = change(result["mb_per_s"], base.get("mb_per_s"))
+		alloc_change = change(result["alloc_per_call"], base.get("alloc_per_call"))
+		flags = []
+		if speed_change is not None and speed_change < -tolerance:
+			flags.append("SLOWER")
+		if alloc_change is not None and alloc_change > tolerance:
+			flags.append("MORE ALLOCATION")
+		regressions += len(flags)
+		print "%-36s %10s %10s %8s %14s %14s %8s %s" % (key,
+			fmt(result["mb_per_s"], "%.1f"), fmt(base.get("mb_per_s"), "%.1f"), fmt(speed_change, "%+.1f%%"),
+			fmt(result["alloc_per_call"], "%d"), fmt(base.get("alloc_per_call"), "%d"), fmt(alloc_change, "%+.1f%%"),
+			" ".join(flags))
+	return regressions
+
+def main(argv):
+	parser = OptionParser(usage="%prog [options] [corpus ...]")
+	parser.add_option("--baseline", default=DEFAULT_BASELINE, help="the baseline file [default: %default]")
+	parser.add_option("--save-baseline", action="store_true", default=False, help="record the results as the baseline")
+	parser.add_option("--repeat", type="int", default=5, help="the number of timed runs of each case [default: %default]")
+	parser.add_option("--tolerance", type="float", default=10.0, help="the percentage change reported as a regression [default: %default]")
+	options, corpora = parser.parse_args(argv)
+	if not corpora:
+		corpora = list(JysonCorpus.NAMES)
+	results = run(corpora, options.repeat)
+	baseline = {}
+	if os.path.exists(options.baseline):
+		f = open(options.baseline, "rb")
+		try:
+			baseline = JysonCodec.loads(f.read().decode("utf-8"))
+		finally:
+			f.close()
+	regressions = report(results, baseline, options.tolerance)
+	if options.save_baseline:
+		baseline.update(results)
+		f = open(options.baseline, "wb")
+		try:
+			f.write(JysonCodec.dumps(baseline).encode("utf-8"))
+		finally:
+			f.close()
+		print "Saved baseline to %s" % options.baseline
+	elif not baseline:
+		print "No baseline at %s: record one with --save-baseline" % options.baseline
+	elif regressions:
+		print "%d regression(s) beyond %.0f%%" % (regressions, options.tolerance)
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,76 @@
+#
+# Copyright 2009-2012 Alan Kennedy
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); 
+# you may not use this file except in compliance with the License. 
+# You may obtain a copy of the License at 
+#
+#    http://www.apache.org/licenses/LICENSE-2.0 
+#
+# Unless required by applicable law or agreed to in writing, software 
+# distributed under the License is distributed on an "AS IS" BASIS, 
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+# See the License for the specific language governing permissions and 
+# limitations under the License. 
+#
+
+#
+# Compares the decoding engines on a large generated JSON file.
+#
+# Run with jython, with the jyson jar on the classpath, e.g.
+#
+#   jython -J-cp lib/jyson-1.1.0.jar bench/bench_engines.py [number_of_records]
+#
+
+import os
+import sys
+import tempfile
+import time
+
+from com.xhaus.jyson import JysonCodec
+
+def make_record(ix):
+	return {
+		"id": ix,
+		"name": "record number %d" % ix,
+		"price": ix * 1.25,
+		"active": ix % 2 == 0,
+		"tags": ["alpha", "beta", "gamma"],
+		"description": "A plain ASCII description, long enough to span several words of the index",
+		"escaped": "line one\nline two",
+		"location": {"lat": 53.3498, "lon": -6.2603},
+	}
+
+def best_time(fn, repeats=5):
+	best = None
+	for ix in range(repeats):
+		start = time.time()
+		fn()
+		elapsed = time.time() - start
+		if best is None or elapsed < best:
+			best = elapsed
+	return best
+
+def main(num_records):
+	json_text = JysonCodec.dumps([make_record(ix) for ix in xrange(num_records)])
+	fd, path = tempfile.mkstemp(suffix=".json")
+	try:
+		f = os.fdopen(fd, "wb")
+		f.write(json_text)
+		f.close()
+		size_mb = len(json_text) / (1024.0 * 1024.0)
+		print "Decoding %d records, %.1f MB" % (num_records, size_mb)
+		# Warm up the JIT before timing
+		for engine in ["stream", "index"]:
+			JysonCodec.load_path(path, engine=engine)
+		for engine in ["stream", "index"]:
+			elapsed = best_time(lambda: JysonCodec.load_path(path, engine=engine))
+			print "  %-8s %8.3f s  %8.1f MB/s" % (engine, elapsed, size_mb / elapsed)
+	finally:
+		os.remove(path)
+
+if __name__ == "__main__":
+	if len(sys.argv) > 1:
+		main(int(sys.argv[1]))
+	else:
+		main(200000)
@@ -0,0 +1,146 @@
+/*
+ * Copyright 2009-2012 Alan Kennedy
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License"); 
+ * you may not use this file except in compliance with the License. 
+ * You may obtain a copy of the License at 
+ *
+ *    http://www.apache.org/licenses/LICENSE-2.0 
+ *
+ * Unless required by applicable law or agreed to in writing, software 
+ * distributed under the License is distributed on an "AS IS" BASIS, 
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+ * See the License for the specific language governing permissions and 
+ * limitations under the License. 
+ *
+ */
+
+package com.xhaus.jyson.bench;
+
+import java.util.concurrent.TimeUnit;
+
+import org.openjdk.jmh.annotations.*;
+import org.openjdk.jmh.infra.Blackhole;
+
+import org.python.core.*;
+
+import com.xhaus.jyson.JysonCodec;
+
+/**
+ * JMH benchmarks of JysonCodec.loads() and JysonCodec.dumps(), over each of the JysonCorpus corpora.
+ * <br/><br/>
+ * One operation decodes or encodes every document of the corpus. The <b>bytes</b> counter is the number of
+ * UTF-8 bytes of JSON text processed, so its rate is the throughput in bytes per second; run with
+ * <b>-prof gc</b> (as the bench-jmh target of build.xml does) for the bytes allocated per operation.
+ */
+
+@BenchmarkMode(Mode.Throughput)
+@OutputTimeUnit(TimeUnit.SECONDS)
+@Warmup(iterations = 3, time = 2)
+@Measurement(iterations = 5, time = 2)
+@Fork(1)
+@State(Scope.Thread)
+public class JysonBenchmark
+
+{
+
+	protected static final String[] NO_KEYWORDS = new String[0];
+
+	@Param({"numeric_arrays", "string_objects", "deep_nesting", "small_docs", "huge_doc"})
+	public String corpus;
+
+	protected PyObject[] texts;
+
+	protected PyObject[] objects;
+
+	/** The number of UTF-8 bytes in all of the texts of the corpus */
+	protected long text_bytes;
+
+	/** The number of UTF-8 bytes in the JSON text generated by encoding all of the objects of the corpus */
+	protected long encoded_bytes;
+
+	@AuxCounters(AuxCounters.Type.OPERATIONS)
+	@State(Scope.Thread)
+	public static class Counters
+	{
+		public long bytes;
+
+		@Setup(Level.Iteration)
+		public void reset()
+		{
+			bytes = 0;
+		}
+	}
+
+	@Setup(Level.Trial)
+	public void setup()
+		throws Exception
+	{
+		PySystemState.initialize();
+		String[] docs = JysonCorpus.documents(corpus);
+		texts = new PyObject[docs.length];
+		objects = new PyObject[docs.length];
+		text_bytes = 0;
+		encoded_bytes = 0;
+		for (int ix = 0 ; ix < docs.length ; ix++)
+		{
+			texts[ix] = new PyUnicode(docs[ix]);
+			objects[ix] = JysonCodec.loads(new PyObject[] {texts[ix]}, NO_KEYWORDS);
+			text_bytes += docs[ix].getBytes("UTF-8").length;
+			encoded_bytes += JysonCodec.dumps(new PyObject[] {objects[ix]}, NO_KEYWORDS).getBytes("UTF-8").length;
+		}
+	}
+
+	protected void loads ( Blackhole bh, Counters counters, PyObject option, String keyword )
+		throws Exception
+	{
+		String[] keywords = option == null ? NO_KEYWORDS : new String[] {keyword};
+		for (int ix = 0 ; ix < texts.length ; ix++)
+		{
+			PyObject[] args = option == null ? new PyObject[] {texts[ix]} : new PyObject[] {texts[ix], option};
+			bh.consume(JysonCodec.loads(args, keywords));
+		}
+		counters.bytes += text_bytes;
+	}
+
+	protected void dumps ( Blackhole bh, Counters counters, PyObject option, String keyword )
+		throws Exception
+	{
+		String[] keywords = option == null ? NO_KEYWORDS : new String[] {keyword};
+		for (int ix = 0 ; ix < objects.length ; ix++)
+		{
+			PyObject[] args = option == null ? new PyObject[] {objects[ix]} : new PyObject[] {objects[ix], option};
+			bh.consume(JysonCodec.dumps(args, keywords));
+		}
+		counters.bytes += encoded_bytes;
+	}
+
+	@Benchmark
+	public void loads_strict ( Blackhole bh, Counters counters )
+		throws Exception
+	{
+		loads(bh, counters, null, null);
+	}
+
+	@Benchmark
+	public void loads_permissive ( Blackhole bh, Counters counters )
+		throws Exception
+	{
+		loads(bh, counters, Py.False, "strict_mode");
+	}
+
+	@Benchmark
+	public void dumps_unicode ( Blackhole bh, Counters counters )
+		throws Exception
+	{
+		dumps(bh, counters, null, null);
+	}
+
+	@Benchmark
+	public void dumps_emit_ascii ( Blackhole bh, Counters counters )
+		throws Exception
+	{
+		dumps(bh, counters, Py.True, "emit_ascii");
+	}
+
+}
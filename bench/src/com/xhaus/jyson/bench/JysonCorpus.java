@@ -0,0 +1,211 @@
+/*
+ * Copyright 2009-2012 Alan Kennedy
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License"); 
+ * you may not use this file except in compliance with the License. 
+ * You may obtain a copy of the License at 
+ *
+ *    http://www.apache.org/licenses/LICENSE-2.0 
+ *
+ * Unless required by applicable law or agreed to in writing, software 
+ * distributed under the License is distributed on an "AS IS" BASIS, 
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+ * See the License for the specific language governing permissions and 
+ * limitations under the License. 
+ *
+ */
+
+package com.xhaus.jyson.bench;
+
+import java.util.Random;
+
+/**
+ * Generates the JSON texts of the benchmark corpora, shared by the JMH benchmarks and the Jython harness.
+ * <br/><br/>
+ * The texts are generated from a fixed seed, so that every run, on every machine, measures the same input.
+ * <ul>
+ * <li><b>numeric_arrays</b>: arrays of integers and floats</li>
+ * <li><b>string_objects</b>: objects whose values are mostly strings, some with escapes and non-ASCII characters</li>
+ * <li><b>deep_nesting</b>: objects and arrays nested thousands deep</li>
+ * <li><b>small_docs</b>: many small documents, each decoded or encoded separately</li>
+ * <li><b>huge_doc</b>: a single document of tens of megabytes</li>
+ * </ul>
+ */
+
+public class JysonCorpus
+
+{
+
+	public static final String[] NAMES = {"numeric_arrays", "string_objects", "deep_nesting", "small_docs", "huge_doc"};
+
+	protected static final long SEED = 20090317L;
+
+	protected static final String[] WORDS = {
+		"alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel",
+		"caf\u00e9", "na\u00efve", "\u00c1ras", "\u65e5\u672c", "tab\there", "line\nbreak", "\"quoted\"", "back\\slash",
+	};
+
+	/**
+	* Return the JSON texts of the named corpus: a single text, except for <b>small_docs</b>
+	*/
+
+	public static String[] documents ( String name )
+	{
+		Random random = new Random(SEED);
+		if ("numeric_arrays".equals(name))
+			return new String[] {numeric_arrays(random, 2000, 50)};
+		if ("string_objects".equals(name))
+			return new String[] {string_objects(random, 5000)};
+		if ("deep_nesting".equals(name))
+			return new String[] {deep_nesting(5000)};
+		if ("small_docs".equals(name))
+		{
+			String[] docs = new String[10000];
+			for (int ix = 0 ; ix < docs.length ; ix++)
+			{
+				StringBuilder buf = new StringBuilder();
+				append_record(buf, random, ix);
+				docs[ix] = buf.toString();
+			}
+			return docs;
+		}
+		if ("huge_doc".equals(name))
+			return new String[] {huge_doc(random, 100000)};
+		throw new IllegalArgumentException("Unknown corpus '"+name+"'");
+	}
+
+	protected static void append_string ( StringBuilder buf, String s )
+	{
+		buf.append('"');
+		for (int ix = 0 ; ix < s.length() ; ix++)
+		{
+			char c = s.charAt(ix);
+			switch (c)
+			{
+				case '"': buf.append("\\\""); break;
+				case '\\': buf.append("\\\\"); break;
+				case '\n': buf.append("\\n"); break;
+				case '\t': buf.append("\\t"); break;
+				default: buf.append(c);
+			}
+		}
+		buf.append('"');
+	}
+
+	protected static String words ( Random random, int n )
+	{
+		StringBuilder buf = new StringBuilder();
+		for (int ix = 0 ; ix < n ; ix++)
+		{
+			if (ix > 0)
+				buf.append(' ');
+			buf.append(WORDS[random.nextInt(WORDS.length)]);
+		}
+		return buf.toString();
+	}
+
+	protected static void append_number ( StringBuilder buf, Random random )
+	{
+		if (random.nextBoolean())
+			buf.append(random.nextInt(2000000) - 1000000);
+		else
+			buf.append(random.nextDouble() * 1e6 - 5e5);
+	}
+
+	protected static String numeric_arrays ( Random random, int num_arrays, int array_length )
+	{
+		StringBuilder buf = new StringBuilder();
+		buf.append('[');
+		for (int ix = 0 ; ix < num_arrays ; ix++)
+		{
+			if (ix > 0)
+				buf.append(',');
+			buf.append('[');
+			for (int jx = 0 ; jx < array_length ; jx++)
+			{
+				if (jx > 0)
+					buf.append(',');
+				append_number(buf, random);
+			}
+			buf.append(']');
+		}
+		buf.append(']');
+		return buf.toString();
+	}
+
+	protected static String string_objects ( Random random, int num_objects )
+	{
+		StringBuilder buf = new StringBuilder();
+		buf.append('[');
+		for (int ix = 0 ; ix < num_objects ; ix++)
+		{
+			if (ix > 0)
+				buf.append(',');
+			buf.append("{\"title\":");
+			append_string(buf, words(random, 4));
+			buf.append(",\"author\":");
+			append_string(buf, words(random, 2));
+			buf.append(",\"summary\":");
+			append_string(buf, words(random, 30));
+			buf.append(",\"tags\":[");
+			for (int jx = 0 ; jx < 5 ; jx++)
+			{
+				if (jx > 0)
+					buf.append(',');
+				append_string(buf, WORDS[random.nextInt(WORDS.length)]);
+			}
+			buf.append("]}");
+		}
+		buf.append(']');
+		return buf.toString();
+	}
+
+	protected static String deep_nesting ( int depth )
+	{
+		StringBuilder buf = new StringBuilder();
+		for (int ix = 0 ; ix < depth ; ix++)
+			buf.append(ix % 2 == 0 ? "{\"level\":" + ix + ",\"child\":" : "[" + ix + ",");
+		buf.append("null");
+		for (int ix = depth - 1 ; ix >= 0 ; ix--)
+			buf.append(ix % 2 == 0 ? '}' : ']');
+		return buf.toString();
+	}
+
+	protected static void append_record ( StringBuilder buf, Random random, int id )
+	{
+		buf.append("{\"id\":").append(id);
+		buf.append(",\"name\":");
+		append_string(buf, words(random, 3));
+		buf.append(",\"active\":").append(random.nextBoolean());
+		buf.append(",\"score\":");
+		append_number(buf, random);
+		buf.append(",\"parent\":null");
+		buf.append(",\"location\":{\"lat\":").append(random.nextDouble() * 180 - 90);
+		buf.append(",\"lon\":").append(random.nextDouble() * 360 - 180).append('}');
+		buf.append(",\"history\":[");
+		for (int ix = 0 ; ix < 4 ; ix++)
+		{
+			if (ix > 0)
+				buf.append(',');
+			append_number(buf, random);
+		}
+		buf.append("]}");
+	}
+
+	protected static String huge_doc ( Random random, int num_records )
+	{
+		StringBuilder buf = new StringBuilder();
+		buf.append("{\"records\":[");
+		for (int ix = 0 ; ix < num_records ; ix++)
+		{
+			if (ix > 0)
+				buf.append(',');
+			append_record(buf, random, ix);
+		}
+		buf.append("],\"numbers\":");
+		buf.append(numeric_arrays(random, 1000, 100));
+		buf.append('}');
+		return buf.toString();
+	}
+
+}
@@ -0,0 +1,73 @@
+/*
+ * Copyright 2009-2012 Alan Kennedy
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License"); 
+ * you may not use this file except in compliance with the License. 
+ * You may obtain a copy of the License at 
+ *
+ *    http://www.apache.org/licenses/LICENSE-2.0 
+ *
+ * Unless required by applicable law or agreed to in writing, software 
+ * distributed under the License is distributed on an "AS IS" BASIS, 
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+ * See the License for the specific language governing permissions and 
+ * limitations under the License. 
+ *
+ */
+
+package com.xhaus.jyson;
+
+import java.math.BigInteger;
+
+/**
+ * Builds the objects corresponding to the values in a JSON text, as they are decoded by a JysonDecoder.
+ * <br/><br/>
+ * The decoder does all of the tokenizing and validation, and calls the builder to construct every value.
+ * JysonPythonBuilder (the default) builds Jython objects, and JysonJavaBuilder builds Java collections:
+ * other representations can be built by subclassing JysonBuilder, in Java or in Jython, and passing
+ * an instance of the subclass as the <b>target</b> option of the decoder.
+ */
+
+public abstract class JysonBuilder
+
+{
+
+	/** Return a new, empty, object, to which entries will be added with <b>put()</b> */
+	public abstract Object new_object ( );
+
+	/** Return the key of an object entry. Keys may be shared between every entry with the same key in a JSON text. */
+	public abstract Object new_key ( String key );
+
+	/** Add an entry to an object */
+	public abstract void put ( Object json_object, Object key, Object value );
+
+	/** Return a new, empty, array, to which elements will be added with <b>append()</b> */
+	public abstract Object new_array ( );
+
+	/** Add an element to an array */
+	public abstract void append ( Object json_array, Object value );
+
+	public abstract Object new_string ( String s );
+
+	public abstract Object new_integer ( long value );
+
+	/** Return an integer which is too large for a long */
+	public abstract Object new_big_integer ( BigInteger value );
+
+	public abstract Object new_float ( double value );
+
+	public abstract Object new_boolean ( boolean value );
+
+	public abstract Object new_null ( );
+
+	/**
+	* Return a JSON object or array, once all of its entries or elements have been added to it.
+	* The default returns the object unchanged, but a builder may use this to, for example, freeze it.
+	*/
+
+	public Object end_container ( Object container )
+	{
+		return container;
+	}
+
+}
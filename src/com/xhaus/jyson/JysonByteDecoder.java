@@ -0,0 +1,169 @@
+/*
+ * Copyright 2009-2012 Alan Kennedy
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License"); 
+ * you may not use this file except in compliance with the License. 
+ * You may obtain a copy of the License at 
+ *
+ *    http://www.apache.org/licenses/LICENSE-2.0 
+ *
+ * Unless required by applicable law or agreed to in writing, software 
+ * distributed under the License is distributed on an "AS IS" BASIS, 
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+ * See the License for the specific language governing permissions and 
+ * limitations under the License. 
+ *
+ */
+
+package com.xhaus.jyson;
+
+import java.nio.ByteBuffer;
+
+/**
+ * A JysonDecoder which decodes UTF-8 encoded JSON text directly from a java.nio.ByteBuffer.
+ * <br/><br/>
+ * Outside of strings, JSON text consists only of ASCII characters, so the bytes are tokenized directly;
+ * only the contents of strings are transcoded from UTF-8. Positions in error messages are byte offsets.
+ */
+
+public class JysonByteDecoder extends JysonDecoder
+
+{
+
+	protected ByteBuffer bytes;
+
+	protected int limit;
+
+	protected JysonByteDecoder(ByteBuffer b)
+	{
+		super(null);
+		bytes = b;
+		curr_pos = b.position();
+		limit = b.limit();
+		// Skip any UTF-8 byte order mark
+		if (limit - curr_pos >= 3 && bytes.get(curr_pos) == (byte)0xEF &&
+			bytes.get(curr_pos+1) == (byte)0xBB && bytes.get(curr_pos+2) == (byte)0xBF)
+			curr_pos += 3;
+	}
+
+	/**
+	* Move on to the next buffer of bytes, for decoders whose JSON text spans several buffers
+	*
+	* @return false if there are no more bytes
+	*/
+
+	protected boolean next_window ( )
+		throws JSONDecodeError
+	{
+		return false;
+	}
+
+	protected char get_char ( )
+		throws JSONDecodeError
+	{
+		if (curr_pos < limit || next_window())
+			return (char)(bytes.get(curr_pos++) & 0xff);
+		else
+			return 0;
+	}
+
+	protected String get_chars ( int n, String desc )
+		throws JSONDecodeError
+	{
+		char[] next = new char[n];
+		for (int ix = 0 ; ix < n ; ix++)
+		{
+			if (curr_pos >= limit && !next_window())
+				{ throw decode_exception("Ran out of characters reading "+desc); }
+			next[ix] = (char)(bytes.get(curr_pos++) & 0xff);
+		}
+		return new String(next);
+	}
+
+	/**
+	* Return the next continuation byte of a UTF-8 sequence, as the 6 bits it contributes
+	*/
+
+	protected int get_continuation_bits ( )
+		throws JSONDecodeError
+	{
+		if (curr_pos >= limit && !next_window())
+			{ throw decode_exception("Ran out of bytes reading UTF-8 sequence"); }
+		int b = bytes.get(curr_pos++);
+		if ((b & 0xC0) != 0x80)
+			{ throw decode_exception("Invalid UTF-8 continuation byte"); }
+		return b & 0x3F;
+	}
+
+	/**
+	* Decode the UTF-8 sequence starting with the given (non-ASCII) lead byte, and append it to the buffer
+	*/
+
+	protected void append_utf8_sequence ( StringBuilder buf, int lead )
+		throws JSONDecodeError
+	{
+		int code_point;
+		if ((lead & 0xE0) == 0xC0)
+		{
+			code_point = ((lead & 0x1F) << 6) | get_continuation_bits();
+			if (code_point < 0x80)
+				{ throw decode_exception("Overlong UTF-8 sequence"); }
+		}
+		else if ((lead & 0xF0) == 0xE0)
+		{
+			code_point = ((lead & 0x0F) << 12) | (get_continuation_bits() << 6);
+			code_point |= get_continuation_bits();
+			if (code_point < 0x800)
+				{ throw decode_exception("Overlong UTF-8 sequence"); }
+			if (code_point >= Character.MIN_SURROGATE && code_point <= Character.MAX_SURROGATE)
+				{ throw decode_exception("UTF-8 encoded surrogate character"); }
+		}
+		else if ((lead & 0xF8) == 0xF0)
+		{
+			code_point = ((lead & 0x07) << 18) | (get_continuation_bits() << 12);
+			code_point |= get_continuation_bits() << 6;
+			code_point |= get_continuation_bits();
+			if (code_point < 0x10000 || code_point > Character.MAX_CODE_POINT)
+				{ throw decode_exception("Invalid UTF-8 sequence"); }
+		}
+		else
+			{ throw decode_exception("Invalid UTF-8 lead byte"); }
+		buf.appendCodePoint(code_point);
+	}
+
+	protected String get_string(char quote)
+		throws JSONDecodeError
+	{
+		StringBuilder buf = get_string_buf();
+		while (true)
+		{
+			if (curr_pos >= limit && !next_window())
+				throw decode_exception("Line terminators must be escaped inside strings");
+			int b = bytes.get(curr_pos++);
+			if (b < 0)
+			{
+				append_utf8_sequence(buf, b & 0xff);
+				continue;
+			}
+			char c = (char)b;
+			switch (c)
+			{
+				case '\\':
+					buf.append(decode_escape());
+					break;
+				case 0:
+				case '\n':
+				case '\r':
+					throw decode_exception("Line terminators must be escaped inside strings");
+				case '\'':
+				case '"':
+					if (c == quote)
+						{ return buf.toString(); }
+					// else let it flow into the default case
+				default:
+					buf.append(c);
+			}
+		}
+	}
+
+}
@@ -0,0 +1,125 @@
+/*
+ * Copyright 2009-2012 Alan Kennedy
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License"); 
+ * you may not use this file except in compliance with the License. 
+ * You may obtain a copy of the License at 
+ *
+ *    http://www.apache.org/licenses/LICENSE-2.0 
+ *
+ * Unless required by applicable law or agreed to in writing, software 
+ * distributed under the License is distributed on an "AS IS" BASIS, 
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+ * See the License for the specific language governing permissions and 
+ * limitations under the License. 
+ *
+ */
+
+package com.xhaus.jyson;
+
+import org.python.core.*;
+
+/**
+ * A Jython iterator which yields the JSON text for an object (hierarchy) in chunks of roughly <b>chunk_size</b> characters.
+ *
+ * The object hierarchy is walked with the encoder's own stack of open arrays and objects, one element at a
+ * time, so that encoding stops as soon as a chunk is full, and resumes from the same place when the next chunk
+ * is requested. An array or object which contains itself raises a JSONEncodeError, as for the encoder.
+ */
+
+public class JysonChunkIterator extends PyIterator
+
+{
+
+	/** The default minimum number of characters in each chunk */
+	public static final int DEFAULT_CHUNK_SIZE = 8192;
+
+	protected JysonEncoder encoder;
+
+	protected int chunk_size;
+
+	protected StringBuilder buf;
+
+	/** The top level object, until encoding of it has started */
+	protected PyObject root;
+
+	protected JysonChunkIterator(JysonEncoder e, PyObject obj, int size)
+	{
+		encoder = e;
+		chunk_size = Math.max(size, 1);
+		buf = new StringBuilder(chunk_size + 64);
+		root = obj;
+	}
+
+	/**
+	* Append the next piece of JSON text to the buffer: the top level object, or the next element of the
+	* innermost open array or object, or its closing bracket
+	*
+	* @return false if the entire object hierarchy has been encoded
+	*/
+
+	protected boolean step ( )
+		throws JSONEncodeError
+	{
+		if (encoder.stack.isEmpty())
+		{
+			if (root == null)
+				return false;
+			PyObject py_obj = root;
+			root = null;
+			encoder.append_json_value(buf, py_obj);
+			return true;
+		}
+		PyObject element = encoder.next_element(buf, encoder.stack.get(encoder.stack.size()-1));
+		if (element == null)
+			encoder.pop_frame(buf);
+		else
+			encoder.append_json_value(buf, element);
+		return true;
+	}
+
+	/**
+	* Return the next chunk of JSON text, or null when the entire object hierarchy has been encoded
+	*/
+
+	public String next_chunk ( )
+		throws JSONEncodeError
+	{
+		boolean stepped = false;
+		try
+		{
+			while (buf.length() < chunk_size && step())
+				;
+			stepped = true;
+		}
+		finally
+		{
+			// Only after an error: discard the frames of the arrays and objects which were not finished
+			if (!stepped)
+			{
+				while (!encoder.stack.isEmpty())
+					encoder.discard_frame();
+				buf.setLength(0);
+			}
+		}
+		if (buf.length() == 0)
+			return null;
+		String chunk = buf.toString();
+		buf.setLength(0);
+		return chunk;
+	}
+
+	public PyObject __iternext__ ( )
+	{
+		try
+		{
+			String chunk = next_chunk();
+			if (chunk == null)
+				return null;
+			return new PyUnicode(chunk);
+		}
+		catch (JSONEncodeError jee)
+			{ throw Py.JavaError(jee); }
+	}
+
+}
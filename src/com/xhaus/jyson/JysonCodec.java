@@ -1,118 +1,1036 @@
-/*
- * Copyright 2009-2012 Alan Kennedy
- *
- * Licensed under the Apache License, Version 2.0 (the "License"); 
- * you may not use this file except in compliance with the License. 
- * You may obtain a copy of the License at 
- *
- *    http://www.apache.org/licenses/LICENSE-2.0 
- *
- * Unless required by applicable law or agreed to in writing, software 
- * distributed under the License is distributed on an "AS IS" BASIS, 
- * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
- * See the License for the specific language governing permissions and 
- * limitations under the License. 
- *
- */
-
-package com.xhaus.jyson;
-
-import org.python.core.*;
-
-public class JysonCodec
-{
-
-	public boolean strict_mode = true;
-
-	/**
-	* Decode the given JSON string, and return the corresponding Jython object (hierarchy)
-	*
-	* The behaviour of the decoder in relation to the incoming JSON expression is controlled by
-	* several JysonCodec options. These options are exposed as public boolean attributes, which can be set
-	* individually to <b>true</b> or <b>false</b>, or can be controlled as a group by the use of the 
-	* <b>strict_mode()</b> and <b>permissive_mode()</b> methods.
-	*
-	* @param json_text A java.lang.String containing the JSON text to be decoded
-	* @return The Jython object (hierarchy) corresponding to the JSON text
-	* @throws JSONDecodeError If an error occurred while decoding the JSON text
-	*
-	*/
-
-	public static PyObject loads ( PyObject[] args, String[] keywords )
-		throws JSONDecodeError
-	{
-		String json_text = ((PyString)args[0]).toString();
-		JysonDecoder decoder = new JysonDecoder(json_text);
-	
-		boolean strict_mode_arg;
-		for (int kix = 0 ; kix < keywords.length ; kix++)
-		{
-			String keyword = keywords[kix];
-			PyObject value = args[args.length-keywords.length+kix];
-			if ("strict_mode".compareTo(keyword) == 0)
-			{
-				strict_mode_arg = value.__nonzero__();
-				if (strict_mode_arg)
-					decoder.strict_mode();
-				else
-					decoder.permissive_mode();
-			}
-			if ("accept_any_primary_datum".compareTo(keyword) == 0)
-				decoder.accept_any_primary_datum = value.__nonzero__();
-			if ("accept_dangling_commas".compareTo(keyword) == 0)
-				decoder.accept_dangling_commas = value.__nonzero__();
-			if ("accept_shell_style_comments".compareTo(keyword) == 0)
-				decoder.accept_shell_style_comments = value.__nonzero__();
-			if ("accept_single_quoted_strings".compareTo(keyword) == 0)
-				decoder.accept_single_quoted_strings = value.__nonzero__();
-			if ("accept_hex_char_escapes".compareTo(keyword) == 0)
-				decoder.accept_hex_char_escapes = value.__nonzero__();
-			if ("accept_hexadecimal_integers".compareTo(keyword) == 0)
-				decoder.accept_hexadecimal_integers = value.__nonzero__();
-			if ("accept_octal_integers".compareTo(keyword) == 0)
-				decoder.accept_octal_integers = value.__nonzero__();
-			if ("accept_junk_after_data".compareTo(keyword) == 0)
-				decoder.accept_junk_after_data = value.__nonzero__();
-		}
-		return decoder.get_top_level_object();
-	}
-
-	/**
-	* Encode the given Jython object into JSON, returning the corresponding JSON string.
-	* <br/><br/>
-	* There is a single option which controls the generated JSON string: <b>emit_ascii</b>.
-	* <br/>
-	* <ul>
-	* <li>If the option is <b>false</b>, then a full Unicode string will be generated.</li>
-	* <li>If the option is <b>true</b>, then any characters whose value is above 127 will be represented in 
-	* the generated string as a Unicode escape (for example "&#xe1;" will be emiited as "&#x5c;u00E1").</li>
-	* </ul>
-	* <br/>
-	* The following are notes about the encoding process
-	* <br/>
-	* <ol>
-	* 	<li>Strings will always be emitted enclosed in double quotes (")</li>
-	* 	<li>If the passed Jython object has a <b>__json__()</b> method, it will be called to generate the JSON corresponding to the object: It is the method implementers responsibility to ensure that the returned string is valid JSON: The return value is <b>not</b> checked for correctness.</li>
-	* </ol>
-	* <br/>
-	* @param py_obj The org.python.core.PyObject to be encoded as JSON.
-	* @return The JSON text corresponding to the Jython object (hierarchy) 
-	* @throws JSONEncodeError If an error occurred while encoding the Jython object (hierarchy) 
-	*/
-
-	public static String dumps ( PyObject[] args, String[] keywords )
-		throws JSONEncodeError
-	{
-		PyObject obj_to_encode = args[0];
-		JysonEncoder encoder = new JysonEncoder();
-		for (int kix = 0 ; kix < keywords.length ; kix++)
-		{
-			String keyword = keywords[kix];
-			PyObject value = args[args.length-keywords.length+kix];
-			if ("emit_ascii".compareTo(keyword) == 0)
-				encoder.emit_ascii = value.__nonzero__();
-		}
-		return encoder.json_repr(obj_to_encode);
-	}
-
-}
+/*
+ * Copyright 2009-2012 Alan Kennedy
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License"); 
+ * you may not use this file except in compliance with the License. 
+ * You may obtain a copy of the License at 
+ *
+ *    http://www.apache.org/licenses/LICENSE-2.0 
+ *
+ * Unless required by applicable law or agreed to in writing, software 
+ * distributed under the License is distributed on an "AS IS" BASIS, 
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+ * See the License for the specific language governing permissions and 
+ * limitations under the License. 
+ *
+ */
+
+package com.xhaus.jyson;
+
+import org.python.core.*;
+
+public class JysonCodec
+{
+
+	/** If false, the decoder accepts everything listed under JysonDecoder.permissive_mode(), regardless of the individual options */
+	public boolean strict_mode = true;
+
+	public boolean accept_any_primary_datum = false;
+
+	public boolean accept_dangling_commas = false;
+
+	public boolean accept_shell_style_comments = false;
+
+	public boolean accept_single_quoted_strings = false;
+
+	public boolean accept_hex_char_escapes = false;
+
+	public boolean accept_hexadecimal_integers = false;
+
+	public boolean accept_octal_integers = false;
+
+	public boolean accept_junk_after_data = false;
+
+	public int key_cache_size = JysonDecoder.DEFAULT_KEY_CACHE_SIZE;
+
+	/** The maximum nesting depth of arrays and objects, when decoding and encoding, or 0 for no limit */
+	public int max_depth = 0;
+
+	/** If not None, called with the text of every JSON float to construct its value (for example decimal.Decimal) */
+	public PyObject parse_float = Py.None;
+
+	/** If not None, called with the text of every JSON integer to construct its value */
+	public PyObject parse_int = Py.None;
+
+	/** The objects built by the decoder: "python" (the default), "java", or a JysonBuilder */
+	public PyObject target = Py.None;
+
+	/** If true, objects and arrays are decoded lazily, as their values are accessed (see JysonLazyBuilder) */
+	public boolean lazy = false;
+
+	/**
+	* The number of results kept by the result cache of this codec instance, or 0 (the default) for no cache.
+	* When set, <b>decode()</b> caches its results, keyed by the JSON text and the decoder options, and returns
+	* a copy of the cached result whenever the same JSON text is decoded again.
+	*/
+	public int result_cache_size = 0;
+
+	/** If true, the result cache returns the cached results themselves, rather than copies, so they must not be modified */
+	public boolean result_cache_shared = false;
+
+	/** Read without locking on every decode(), and only replaced, under the lock, when the cache options change */
+	protected volatile JysonResultCache result_cache = null;
+
+	public boolean emit_ascii = false;
+
+	/** If not None, called with every object which is not otherwise encodable, returning an encodable object in its place */
+	public PyObject default_encoder = Py.None;
+
+	/**
+	* The number of fragments of JSON text kept by the fragment cache of this codec instance, or 0 (the default) for no cache.
+	* When set, <b>encode()</b> caches the JSON text of immutable objects (tuples, long strings, and the objects of classes
+	* which declare a true <b>__json_immutable__</b> attribute) by identity, and reuses it whenever the same object is encoded again.
+	*/
+	public int fragment_cache_size = 0;
+
+	/** Read without locking on every encode(), and only replaced, under the lock, when fragment_cache_size changes */
+	protected volatile JysonFragmentCache fragment_cache = null;
+
+	/** The largest encoding buffer kept for reuse by a thread, in characters */
+	protected static final int MAX_RETAINED_BUFFER_SIZE = 65536;
+
+	protected ThreadLocal<JysonDecoder> decoders = new ThreadLocal<JysonDecoder>();
+
+	protected ThreadLocal<JysonEncoder> encoders = new ThreadLocal<JysonEncoder>();
+
+	protected ThreadLocal<StringBuilder> buffers = new ThreadLocal<StringBuilder>();
+
+	/**
+	* Configure a decoder with the options of this codec instance
+	*/
+
+	protected void configure_decoder ( JysonDecoder decoder )
+	{
+		if (strict_mode)
+			decoder.strict_mode();
+		else
+			decoder.permissive_mode();
+		decoder.accept_any_primary_datum |= accept_any_primary_datum;
+		decoder.accept_dangling_commas |= accept_dangling_commas;
+		decoder.accept_shell_style_comments |= accept_shell_style_comments;
+		decoder.accept_single_quoted_strings |= accept_single_quoted_strings;
+		decoder.accept_hex_char_escapes |= accept_hex_char_escapes;
+		decoder.accept_hexadecimal_integers |= accept_hexadecimal_integers;
+		decoder.accept_octal_integers |= accept_octal_integers;
+		decoder.accept_junk_after_data |= accept_junk_after_data;
+		decoder.key_cache_size = key_cache_size;
+		decoder.max_depth = max_depth;
+		decoder.parse_float = parse_float == Py.None ? null : parse_float;
+		decoder.parse_int = parse_int == Py.None ? null : parse_int;
+		decoder.builder = get_builder(target);
+		decoder.selection = null;
+	}
+
+	/**
+	* Return the fragment cache shared by the encoders of this codec instance, creating it when fragment_cache_size is first set or changed.
+	* The codec is only locked when the cache is created, replaced or dropped, not on every call.
+	*/
+
+	protected JysonFragmentCache get_fragment_cache ( )
+	{
+		int size = fragment_cache_size;
+		JysonFragmentCache cache = fragment_cache;
+		if (size <= 0)
+		{
+			if (cache != null)
+				synchronized (this) { fragment_cache = null; }
+			return null;
+		}
+		if (cache != null && cache.capacity == size)
+			return cache;
+		synchronized (this)
+		{
+			cache = fragment_cache;
+			if (cache == null || cache.capacity != size)
+				fragment_cache = cache = new JysonFragmentCache(size);
+			return cache;
+		}
+	}
+
+	/**
+	* Return the counters of the fragment cache of this codec instance, or None if it has no fragment cache
+	*
+	* @return A dictionary of the number of hits, misses and evictions, and the number and total length of the cached fragments
+	*/
+
+	public PyObject fragment_cache_stats ( )
+	{
+		JysonFragmentCache cache = get_fragment_cache();
+		if (cache == null)
+			return Py.None;
+		return cache.stats();
+	}
+
+	/**
+	* Return the result cache shared by the decoders of this codec instance, creating it when result_cache_size is first set or changed.
+	* The codec is only locked when the cache is created, replaced or dropped, not on every call.
+	*/
+
+	protected JysonResultCache get_result_cache ( )
+	{
+		int size = result_cache_size;
+		boolean shared = result_cache_shared;
+		JysonResultCache cache = result_cache;
+		if (size <= 0)
+		{
+			if (cache != null)
+				synchronized (this) { result_cache = null; }
+			return null;
+		}
+		if (cache != null && cache.capacity == size && cache.shared == shared)
+			return cache;
+		synchronized (this)
+		{
+			cache = result_cache;
+			if (cache == null || cache.capacity != size || cache.shared != shared)
+				result_cache = cache = new JysonResultCache(size, shared);
+			return cache;
+		}
+	}
+
+	/**
+	* Return the counters of the result cache of this codec instance, or None if it has no result cache
+	*
+	* @return A dictionary of the number of hits, misses and evictions, and the number of cached results
+	*/
+
+	public PyObject result_cache_stats ( )
+	{
+		JysonResultCache cache = get_result_cache();
+		if (cache == null)
+			return Py.None;
+		return cache.stats();
+	}
+
+	/**
+	* Decode the given JSON text with a decoder configured for this codec instance, through the result cache if there is one
+	*/
+
+	protected Object decode_cached ( JysonDecoder decoder, String json_text )
+		throws JSONDecodeError
+	{
+		JysonResultCache cache = get_result_cache();
+		JysonResultCache.Key key = cache == null ? null : cache.key(json_text, decoder);
+		if (key != null)
+		{
+			Object result = cache.get_result(key);
+			if (result != null)
+				return result;
+		}
+		Object result;
+		decoder.reset(json_text);
+		try
+			{ result = decoder.get_top_level_object(); }
+		finally
+			{ decoder.reset(null); }
+		return key == null ? result : cache.put_result(key, result);
+	}
+
+	/**
+	* Compile a schema for decoding JSON objects of a fixed shape into instances of a record class, whose fields are
+	* given by its <b>__slots__</b>. The <b>decode()</b> method of the compiled schema decodes a JSON object directly
+	* into a record, by calling the record class with the values of its fields as positional arguments, in the order
+	* of the slots, without building a dictionary for the object. The type of every value is checked as it is decoded,
+	* members which are not fields of the record are skipped, and missing fields are None, if their type accepts null.
+	* The other options of this codec instance, such as <b>strict_mode</b> and <b>max_depth</b>, apply as for <b>decode()</b>.
+	* <br/>
+	* @param fields A dictionary of the types of the fields, by name, as described for JysonSchema: fields which are not in it accept any value
+	* @param record_class The record class, which must define <b>__slots__</b>
+	* @return A JysonSchema, which can also be used as the type of a field of another record, or of the elements of an array
+	*/
+
+	public JysonSchema compile ( PyObject fields, PyObject record_class )
+	{
+		return JysonSchema.compile_record(this, fields, record_class);
+	}
+
+	/**
+	* Decode the given JSON string with the options of this codec instance, and return the corresponding Jython object (hierarchy)
+	*
+	* Unlike the static <b>loads()</b>, this uses the option attributes of the codec instance, for example
+	* <b>JysonCodec(strict_mode=False).decode(text)</b>. Each thread reuses a single decoder (and its key cache)
+	* for all calls on the same codec instance. Keyword options passed to the call override those of the instance.
+	* If <b>result_cache_size</b> is set, the results are cached, and shared by every thread.
+	*
+	* @param json_text A java.lang.String containing the JSON text to be decoded
+	* @return The Jython object (hierarchy) corresponding to the JSON text
+	* @throws JSONDecodeError If an error occurred while decoding the JSON text
+	*
+	*/
+
+	public PyObject decode ( PyObject[] args, String[] keywords )
+		throws JSONDecodeError
+	{
+		JysonDecoder decoder = decoders.get();
+		if (decoder == null)
+		{
+			decoder = new JysonDecoder(null);
+			decoders.set(decoder);
+		}
+		configure_decoder(decoder);
+		if (keywords.length > 0)
+			set_decoder_options(decoder, args, keywords);
+		long start = JysonMetrics.start();
+		try
+		{
+			String json_text = ((PyString)args[0]).toString();
+			PyObject result;
+			PyObject lazy_arg = get_keyword_arg(args, keywords, "lazy");
+			if (lazy_arg == null ? lazy : lazy_arg.__nonzero__())
+				result = decode_lazily(decoder, json_text);
+			else
+				result = Py.java2py(decode_cached(decoder, json_text));
+			JysonMetrics.DECODE.completed(start, json_text.length());
+			return result;
+		}
+		catch (JSONDecodeError jde)
+		{
+			JysonMetrics.DECODE.failed(start, jde);
+			throw jde;
+		}
+		catch (RuntimeException rex)
+		{
+			JysonMetrics.DECODE.failed(start, rex);
+			throw rex;
+		}
+	}
+
+	/**
+	* Encode the given Jython object into JSON with the options of this codec instance, returning the corresponding JSON string.
+	*
+	* Unlike the static <b>dumps()</b>, this uses the <b>emit_ascii</b>, <b>default_encoder</b> and <b>max_depth</b> attributes of the codec instance.
+	* Each thread reuses a single encoder and buffer for all calls on the same codec instance.
+	* If <b>fragment_cache_size</b> is set, the JSON text of immutable objects is cached, and shared by every thread.
+	* Keyword options passed to the call override those of the instance.
+	*
+	* @param py_obj The org.python.core.PyObject to be encoded as JSON.
+	* @return The JSON text corresponding to the Jython object (hierarchy)
+	* @throws JSONEncodeError If an error occurred while encoding the Jython object (hierarchy)
+	*/
+
+	public String encode ( PyObject[] args, String[] keywords )
+		throws JSONEncodeError
+	{
+		JysonEncoder encoder = encoders.get();
+		StringBuilder buf = buffers.get();
+		if (encoder == null)
+		{
+			encoder = new JysonEncoder();
+			encoders.set(encoder);
+		}
+		if (buf == null)
+		{
+			buf = new StringBuilder();
+			buffers.set(buf);
+		}
+		encoder.emit_ascii = emit_ascii;
+		encoder.max_depth = max_depth;
+		encoder.default_encoder = default_encoder == Py.None ? null : default_encoder;
+		encoder.fragment_cache = get_fragment_cache();
+		if (keywords.length > 0)
+			set_encoder_options(encoder, args, keywords);
+		buf.setLength(0);
+		long start = JysonMetrics.start();
+		try
+		{
+			encoder.append_json_repr(buf, args[0]);
+			JysonMetrics.ENCODE.completed(start, buf.length());
+			return buf.toString();
+		}
+		catch (JSONEncodeError jee)
+		{
+			JysonMetrics.ENCODE.failed(start, jee);
+			throw jee;
+		}
+		catch (RuntimeException rex)
+		{
+			JysonMetrics.ENCODE.failed(start, rex);
+			throw rex;
+		}
+		finally
+		{
+			if (buf.capacity() > MAX_RETAINED_BUFFER_SIZE)
+				buffers.remove();
+		}
+	}
+
+	/**
+	* Decode the given JSON string, and return the corresponding Jython object (hierarchy)
+	*
+	* The behaviour of the decoder in relation to the incoming JSON expression is controlled by
+	* several JysonCodec options. These options are exposed as public boolean attributes, which can be set
+	* individually to <b>true</b> or <b>false</b>, or can be controlled as a group by the use of the 
+	* <b>strict_mode()</b> and <b>permissive_mode()</b> methods.
+	*
+	* The <b>select</b> option takes a list of JSON Pointers, such as ["/meta/id", "/items/&#42;/price"]. Only the
+	* values at those paths (and the objects and arrays containing them) are decoded: everything else is skipped
+	* without being decoded, and is left out of the result.
+	*
+	* The <b>parse_float</b> and <b>parse_int</b> options take a callable (such as decimal.Decimal or long), which
+	* is called with the text of every JSON float or integer respectively, and returns the decoded value.
+	*
+	* The <b>target</b> option chooses the objects built by the decoder. With <b>"python"</b> (the default),
+	* objects are decoded to Jython dictionaries, lists, unicode strings, ints, longs and floats. With <b>"java"</b>,
+	* they are decoded directly to java.util.HashMaps, java.util.ArrayLists, Strings, Longs and Doubles, for
+	* consumers written in Java. Any other representation can be built by passing an instance of a JysonBuilder subclass.
+	*
+	* If the <b>lazy</b> option is <b>true</b>, objects and arrays are returned as read-only java.util.Map and
+	* java.util.List proxies, whose values are only decoded when they are first accessed: see JysonLazyBuilder.
+	*
+	* Nested arrays and objects are decoded without recursion, so deeply nested texts do not exhaust the thread's stack.
+	* The <b>max_depth</b> option limits the depth of nesting accepted: by default, there is no limit.
+	*
+	* @param json_text A java.lang.String containing the JSON text to be decoded
+	* @return The Jython object (hierarchy) corresponding to the JSON text
+	* @throws JSONDecodeError If an error occurred while decoding the JSON text
+	*
+	*/
+
+	public static PyObject loads ( PyObject[] args, String[] keywords )
+		throws JSONDecodeError
+	{
+		long start = JysonMetrics.start();
+		try
+		{
+			String json_text = ((PyString)args[0]).toString();
+			JysonDecoder decoder = new JysonDecoder(json_text);
+			set_decoder_options(decoder, args, keywords);
+			PyObject result;
+			PyObject lazy_arg = get_keyword_arg(args, keywords, "lazy");
+			if (lazy_arg != null && lazy_arg.__nonzero__())
+				result = decode_lazily(decoder, json_text);
+			else
+				result = Py.java2py(decoder.get_top_level_object());
+			JysonMetrics.DECODE.completed(start, json_text.length());
+			return result;
+		}
+		catch (JSONDecodeError jde)
+		{
+			JysonMetrics.DECODE.failed(start, jde);
+			throw jde;
+		}
+		catch (RuntimeException rex)
+		{
+			JysonMetrics.DECODE.failed(start, rex);
+			throw rex;
+		}
+	}
+
+	/**
+	* Decode the given JSON text lazily, with the options of the given decoder, returning proxies for the top level object or array
+	*/
+
+	protected static PyObject decode_lazily ( JysonDecoder template, String json_text )
+		throws JSONDecodeError
+	{
+		if (template.selection != null)
+			throw Py.ValueError("The select and lazy options cannot be combined");
+		return Py.java2py(new JysonLazyBuilder(template, json_text).decode());
+	}
+
+	/**
+	* Decode the given UTF-8 encoded JSON text, and return the corresponding Jython object (hierarchy)
+	*
+	* The bytes are decoded directly, without first being converted to a string: only the contents of
+	* JSON strings are transcoded. The decoder accepts the same options as <b>loads()</b>.
+	*
+	* If the <b>engine</b> option is <b>"index"</b>, the text is decoded in two stages: the bytes are first scanned
+	* eight at a time to index the structural characters and strings, and the objects are then built from
+	* that index, which is faster for large texts: see JysonIndexedDecoder. The default engine is <b>"stream"</b>.
+	*
+	* @param data A Java byte[] or java.nio.ByteBuffer, or a Jython str or bytearray, containing the UTF-8 encoded JSON text
+	* @return The Jython object (hierarchy) corresponding to the JSON text
+	* @throws JSONDecodeError If an error occurred while decoding the JSON text
+	*
+	*/
+
+	public static PyObject loads_bytes ( PyObject[] args, String[] keywords )
+		throws JSONDecodeError
+	{
+		long start = JysonMetrics.start();
+		try
+		{
+			java.nio.ByteBuffer bytes = as_byte_buffer(args[0]);
+			JysonDecoder decoder;
+			if (use_index_engine(args, keywords))
+				decoder = new JysonIndexedDecoder(bytes);
+			else
+				decoder = new JysonByteDecoder(bytes);
+			set_decoder_options(decoder, args, keywords);
+			PyObject result = Py.java2py(decoder.get_top_level_object());
+			JysonMetrics.DECODE.completed(start, bytes.remaining());
+			return result;
+		}
+		catch (JSONDecodeError jde)
+		{
+			JysonMetrics.DECODE.failed(start, jde);
+			throw jde;
+		}
+		catch (RuntimeException rex)
+		{
+			JysonMetrics.DECODE.failed(start, rex);
+			throw rex;
+		}
+	}
+
+	protected static boolean use_index_engine ( PyObject[] args, String[] keywords )
+	{
+		PyObject engine_arg = get_keyword_arg(args, keywords, "engine");
+		if (engine_arg == null || engine_arg == Py.None)
+			return false;
+		String engine = engine_arg.toString();
+		if ("index".compareTo(engine) == 0)
+			return true;
+		if ("stream".compareTo(engine) == 0)
+			return false;
+		throw Py.ValueError("Unknown decoding engine '"+engine+"': it must be 'stream' or 'index'");
+	}
+
+	protected static java.nio.ByteBuffer as_byte_buffer ( PyObject data )
+	{
+		Object java_obj = data.__tojava__(java.nio.ByteBuffer.class);
+		if (java_obj != Py.NoConversion)
+			return ((java.nio.ByteBuffer)java_obj).duplicate();
+		java_obj = data.__tojava__(byte[].class);
+		if (java_obj != Py.NoConversion)
+			return java.nio.ByteBuffer.wrap((byte[])java_obj);
+		if (data instanceof PyUnicode)
+			throw Py.TypeError("JSON bytes must be a str, bytearray, byte[] or ByteBuffer, not unicode: use loads() to decode unicode text");
+		// A Jython str holds one byte per character, as does the str of a bytearray
+		return java.nio.ByteBuffer.wrap(org.python.core.util.StringUtil.toBytes(data.__str__().toString()));
+	}
+
+	/**
+	* Decode a JSON text starting at the given position in a string, ignoring anything after it, and return the
+	* decoded Jython object with the position just after the text. The string is not copied, so a string holding
+	* several concatenated JSON texts can be decoded one text at a time. The decoder accepts the same options as <b>loads()</b>.
+	* <br/>
+	* @param json_text A java.lang.String containing the JSON text to be decoded
+	* @param start The position in the string at which to start decoding (by default 0): whitespace before the text is skipped
+	* @return A tuple of the decoded Jython object and the position in the string just after its JSON text
+	* @throws JSONDecodeError If an error occurred while decoding the JSON text
+	*/
+
+	public static PyTuple raw_decode ( PyObject[] args, String[] keywords )
+		throws JSONDecodeError
+	{
+		String json_text = ((PyString)args[0]).toString();
+		PyObject start_arg = get_keyword_arg(args, keywords, "start");
+		if (start_arg == null && args.length-keywords.length > 1)
+			start_arg = args[1];
+		int start = start_arg == null ? 0 : start_arg.asInt();
+		if (start < 0 || start > json_text.length())
+			throw Py.ValueError("The start position "+start+" is outside of the JSON text");
+		JysonDecoder decoder = new JysonDecoder(json_text);
+		set_decoder_options(decoder, args, keywords);
+		decoder.curr_pos = start;
+		Object result = decoder.get_document();
+		return new PyTuple(new PyObject[] {Py.java2py(result), Py.newInteger(decoder.curr_pos)});
+	}
+
+	/**
+	* Return an iterator over the concatenated JSON texts (documents) in a string or file, such as the back-to-back
+	* objects written to a log. The documents may be separated by whitespace, or not separated at all. A single
+	* decoder decodes every document, without splitting the text. The decoder accepts the same options as
+	* <b>loads()</b>, plus <b>buffer_size</b> for files, as for <b>load()</b>.
+	* <br/>
+	* @param source A string, or a java.io.Reader, a java.io.InputStream (which is read as UTF-8) or a Jython file-like object
+	* @return A Jython iterator over the decoded documents
+	*/
+
+	public static PyObject iter_documents ( PyObject[] args, String[] keywords )
+	{
+		JysonDecoder decoder;
+		if (args[0] instanceof PyString)
+			decoder = new JysonDecoder(args[0].toString());
+		else
+		{
+			int buffer_size = JysonReaderDecoder.DEFAULT_BUFFER_SIZE;
+			PyObject buffer_size_arg = get_keyword_arg(args, keywords, "buffer_size");
+			if (buffer_size_arg != null)
+				buffer_size = buffer_size_arg.asInt();
+			decoder = new JysonReaderDecoder(as_reader(args[0]), buffer_size);
+		}
+		set_decoder_options(decoder, args, keywords);
+		return new JysonDocumentIterator(decoder);
+	}
+
+	/**
+	* Return a decoder for a stream of JSON texts which arrives in chunks, such as those read from a non-blocking socket.
+	* <br/><br/>
+	* Each chunk is passed to the <b>feed()</b> method of the decoder, which returns a list of the top level values
+	* completed by the chunk, and <b>close()</b> is called at the end of the stream. A chunk may end anywhere, even in
+	* the middle of a string, an escape, a number or (for chunks of UTF-8 bytes) a character: see JysonFeedDecoder.
+	* The text of each value is buffered until the value is complete, and is then decoded as a whole, so this bounds
+	* memory by the size of the largest value, not of the stream, but does not decode any value incrementally.
+	* The decoder accepts the same options as <b>loads()</b>.
+	* <br/>
+	* @return A JysonFeedDecoder
+	*/
+
+	public static JysonFeedDecoder feed_decoder ( PyObject[] args, String[] keywords )
+	{
+		JysonDecoder decoder = new JysonDecoder(null);
+		set_decoder_options(decoder, args, keywords);
+		return new JysonFeedDecoder(decoder);
+	}
+
+	/**
+	* Decode the JSON text read from the given file, and return the corresponding Jython object (hierarchy)
+	*
+	* The text is read in fixed size chunks, so that the entire JSON text never needs to be held in memory.
+	* The decoder accepts the same options as <b>loads()</b>, plus <b>buffer_size</b>, which sets the number
+	* of characters read from the file at a time.
+	*
+	* @param fp A java.io.Reader, a java.io.InputStream (which is read as UTF-8), or a Jython file-like object with a read() method
+	* (whose byte strings, as from a file opened in binary mode, are also read as UTF-8)
+	* @return The Jython object (hierarchy) corresponding to the JSON text
+	* @throws JSONDecodeError If an error occurred while reading or decoding the JSON text
+	*
+	*/
+
+	public static PyObject load ( PyObject[] args, String[] keywords )
+		throws JSONDecodeError
+	{
+		int buffer_size = JysonReaderDecoder.DEFAULT_BUFFER_SIZE;
+		PyObject buffer_size_arg = get_keyword_arg(args, keywords, "buffer_size");
+		if (buffer_size_arg != null)
+			buffer_size = buffer_size_arg.asInt();
+		JysonDecoder decoder = new JysonReaderDecoder(as_reader(args[0]), buffer_size);
+		set_decoder_options(decoder, args, keywords);
+		return Py.java2py(decoder.get_top_level_object());
+	}
+
+	/**
+	* Decode newline delimited JSON (JSON Lines), returning a list of the Jython objects corresponding to the non-blank lines
+	*
+	* The lines are decoded in batches, in parallel, at most <b>workers</b> batches at once (by default, one per processor),
+	* on the pool of worker threads which is shared with the parallel encoder.
+	* The <b>batch_size</b> option sets the number of lines in each batch.
+	* The decoder accepts the same options as <b>loads()</b>, which apply to every line.
+	*
+	* @param source A string containing the lines, or a Jython iterable (such as a file) of lines
+	* @return A list of the decoded Jython objects, in the order of their lines
+	* @throws JSONDecodeError If an error occurred while decoding any of the lines
+	*
+	*/
+
+	public static PyList loads_lines ( PyObject[] args, String[] keywords )
+		throws JSONDecodeError
+	{
+		JysonDecoder template = new JysonDecoder(null);
+		set_decoder_options(template, args, keywords);
+		int workers = Runtime.getRuntime().availableProcessors();
+		PyObject workers_arg = get_keyword_arg(args, keywords, "workers");
+		if (workers_arg != null)
+			workers = workers_arg.asInt();
+		int batch_size = JysonLinesDecoder.DEFAULT_BATCH_SIZE;
+		PyObject batch_size_arg = get_keyword_arg(args, keywords, "batch_size");
+		if (batch_size_arg != null)
+			batch_size = batch_size_arg.asInt();
+		return new JysonLinesDecoder(template, workers, batch_size).decode(args[0]);
+	}
+
+	/**
+	* Parse the given JSON text, returning an iterator over the parse events, rather than the decoded Jython object (hierarchy)
+	*
+	* Each event is a tuple of <b>(event, value, path)</b>: see JysonEventParser for details.
+	* When reading from a file, only the arrays and objects which are currently open are held in memory.
+	* The parser accepts the same options as <b>loads()</b> and <b>load()</b>.
+	*
+	* @param source A string containing the JSON text, or any file accepted by <b>load()</b>
+	* @return A Jython iterator over the parse events
+	*
+	*/
+
+	public static PyObject parse_events ( PyObject[] args, String[] keywords )
+	{
+		JysonDecoder decoder;
+		if (args[0] instanceof PyString)
+			decoder = new JysonDecoder(args[0].toString());
+		else
+		{
+			int buffer_size = JysonReaderDecoder.DEFAULT_BUFFER_SIZE;
+			PyObject buffer_size_arg = get_keyword_arg(args, keywords, "buffer_size");
+			if (buffer_size_arg != null)
+				buffer_size = buffer_size_arg.asInt();
+			decoder = new JysonReaderDecoder(as_reader(args[0]), buffer_size);
+		}
+		set_decoder_options(decoder, args, keywords);
+		if (decoder.builder != JysonPythonBuilder.INSTANCE)
+			throw Py.ValueError("Parse events always contain Jython objects: the target option is not supported");
+		return new JysonEventParser(decoder);
+	}
+
+	/**
+	* Decode the UTF-8 encoded JSON text in the file with the given path, and return the corresponding Jython object (hierarchy)
+	*
+	* If the <b>mmap</b> option is <b>true</b> (the default), the file is memory mapped and decoded directly
+	* from the mapped bytes, which are held in the operating system's page cache rather than the Java heap;
+	* files larger than 2GB are mapped through successive windows of <b>window_size</b> bytes.
+	* Otherwise the file is read in chunks, as by <b>load()</b>.
+	* The decoder accepts the same options as <b>loads_bytes()</b>: the <b>"index"</b> engine maps the whole
+	* file at once, so it is limited to memory mapped files of up to 2GB.
+	*
+	* @param path The path of the file, as a string or a java.io.File
+	* @return The Jython object (hierarchy) corresponding to the JSON text
+	* @throws JSONDecodeError If an error occurred while decoding the JSON text
+	*
+	*/
+
+	public static PyObject load_path ( PyObject[] args, String[] keywords )
+		throws JSONDecodeError
+	{
+		java.io.File file;
+		Object java_obj = args[0].__tojava__(java.io.File.class);
+		if (java_obj != Py.NoConversion)
+			file = (java.io.File)java_obj;
+		else
+			file = new java.io.File(args[0].toString());
+		PyObject mmap_arg = get_keyword_arg(args, keywords, "mmap");
+		boolean use_mmap = mmap_arg == null || mmap_arg.__nonzero__();
+		long window_size = JysonMappedFileDecoder.DEFAULT_WINDOW_SIZE;
+		PyObject window_size_arg = get_keyword_arg(args, keywords, "window_size");
+		if (window_size_arg != null)
+			window_size = Py.py2long(window_size_arg);
+		java.io.FileInputStream stream = null;
+		try
+		{
+			stream = new java.io.FileInputStream(file);
+			JysonDecoder decoder;
+			if (use_index_engine(args, keywords))
+			{
+				long file_size = stream.getChannel().size();
+				if (!use_mmap || file_size > Integer.MAX_VALUE)
+					throw Py.ValueError("The index engine is only supported for memory mapped files of up to 2GB");
+				decoder = new JysonIndexedDecoder(JysonMappedFileDecoder.map(stream.getChannel(), 0, file_size));
+			}
+			else if (use_mmap)
+				decoder = new JysonMappedFileDecoder(stream.getChannel(), window_size);
+			else
+				decoder = new JysonReaderDecoder(new java.io.InputStreamReader(stream, "UTF-8"));
+			set_decoder_options(decoder, args, keywords);
+			return Py.java2py(decoder.get_top_level_object());
+		}
+		catch (java.io.IOException iox)
+			{ throw Py.IOError(iox); }
+		finally
+		{
+			try
+			{
+				if (stream != null)
+					stream.close();
+			}
+			catch (java.io.IOException iox)
+				{ }
+		}
+	}
+
+	protected static java.io.Reader as_reader ( PyObject fp )
+	{
+		Object java_obj = fp.__tojava__(java.io.Reader.class);
+		if (java_obj != Py.NoConversion)
+			return (java.io.Reader)java_obj;
+		java_obj = fp.__tojava__(java.io.InputStream.class);
+		if (java_obj != Py.NoConversion)
+		{
+			try
+				{ return new java.io.InputStreamReader((java.io.InputStream)java_obj, "UTF-8"); }
+			catch (java.io.UnsupportedEncodingException uex)
+				{ throw Py.JavaError(uex); }
+		}
+		if (fp.__findattr__("read") != null)
+			return new JysonFileReader(fp);
+		throw Py.TypeError("Cannot read JSON text from '"+fp.getType().fastGetName()+"' object");
+	}
+
+	protected static PyObject get_keyword_arg ( PyObject[] args, String[] keywords, String name )
+	{
+		for (int kix = 0 ; kix < keywords.length ; kix++)
+			if (name.compareTo(keywords[kix]) == 0)
+				return args[args.length-keywords.length+kix];
+		return null;
+	}
+
+	protected static JysonBuilder get_builder ( PyObject target )
+	{
+		if (target == Py.None)
+			return JysonPythonBuilder.INSTANCE;
+		Object java_obj = target.__tojava__(JysonBuilder.class);
+		if (java_obj != Py.NoConversion)
+			return (JysonBuilder)java_obj;
+		String target_name = target.toString();
+		if ("python".compareTo(target_name) == 0)
+			return JysonPythonBuilder.INSTANCE;
+		if ("java".compareTo(target_name) == 0)
+			return JysonJavaBuilder.INSTANCE;
+		throw Py.ValueError("Unknown decoding target '"+target_name+"': it must be 'python', 'java' or a JysonBuilder");
+	}
+
+	protected static void set_decoder_options ( JysonDecoder decoder, PyObject[] args, String[] keywords )
+	{
+		boolean strict_mode_arg;
+		for (int kix = 0 ; kix < keywords.length ; kix++)
+		{
+			String keyword = keywords[kix];
+			PyObject value = args[args.length-keywords.length+kix];
+			if ("strict_mode".compareTo(keyword) == 0)
+			{
+				strict_mode_arg = value.__nonzero__();
+				if (strict_mode_arg)
+					decoder.strict_mode();
+				else
+					decoder.permissive_mode();
+			}
+			if ("accept_any_primary_datum".compareTo(keyword) == 0)
+				decoder.accept_any_primary_datum = value.__nonzero__();
+			if ("accept_dangling_commas".compareTo(keyword) == 0)
+				decoder.accept_dangling_commas = value.__nonzero__();
+			if ("accept_shell_style_comments".compareTo(keyword) == 0)
+				decoder.accept_shell_style_comments = value.__nonzero__();
+			if ("accept_single_quoted_strings".compareTo(keyword) == 0)
+				decoder.accept_single_quoted_strings = value.__nonzero__();
+			if ("accept_hex_char_escapes".compareTo(keyword) == 0)
+				decoder.accept_hex_char_escapes = value.__nonzero__();
+			if ("accept_hexadecimal_integers".compareTo(keyword) == 0)
+				decoder.accept_hexadecimal_integers = value.__nonzero__();
+			if ("accept_octal_integers".compareTo(keyword) == 0)
+				decoder.accept_octal_integers = value.__nonzero__();
+			if ("accept_junk_after_data".compareTo(keyword) == 0)
+				decoder.accept_junk_after_data = value.__nonzero__();
+			if ("key_cache_size".compareTo(keyword) == 0)
+				decoder.key_cache_size = value.asInt();
+			if ("max_depth".compareTo(keyword) == 0)
+				decoder.max_depth = value.asInt();
+			if ("parse_float".compareTo(keyword) == 0)
+				decoder.parse_float = value == Py.None ? null : value;
+			if ("parse_int".compareTo(keyword) == 0)
+				decoder.parse_int = value == Py.None ? null : value;
+			if ("target".compareTo(keyword) == 0)
+				decoder.builder = get_builder(value);
+			if ("select".compareTo(keyword) == 0)
+			{
+				JysonPathFilter selection = value == Py.None ? null : JysonPathFilter.compile(value);
+				// The root pointer "" selects the whole document, which is decoded without a filter
+				decoder.selection = selection == null || selection.selected ? null : selection;
+			}
+		}
+	}
+
+	/**
+	* Encode the given Jython object into JSON, returning the corresponding JSON string.
+	* <br/><br/>
+	* There is a single option which controls the generated JSON string: <b>emit_ascii</b>.
+	* <br/>
+	* <ul>
+	* <li>If the option is <b>false</b>, then a full Unicode string will be generated.</li>
+	* <li>If the option is <b>true</b>, then any characters whose value is above 127 will be represented in 
+	* the generated string as a Unicode escape (for example "&#xe1;" will be emiited as "&#x5c;u00E1").</li>
+	* </ul>
+	* <br/>
+	* The following are notes about the encoding process
+	* <br/>
+	* <ol>
+	* 	<li>Strings will always be emitted enclosed in double quotes (")</li>
+	* 	<li>If the passed Jython object has a <b>__json__()</b> method, it will be called to generate the JSON corresponding to the object: It is the method implementers responsibility to ensure that the returned string is valid JSON: The return value is <b>not</b> checked for correctness.</li>
+	* 	<li>Otherwise, if an encoder function has been registered for the type of the object (see <b>register_encoder()</b>), or a <b>default</b> function has been passed, it is called with the object, and the object it returns is encoded in its place.</li>
+	* </ol>
+	* <br/>
+	* If the <b>parallel</b> option is <b>true</b>, arrays and objects with at least <b>threshold</b> elements are
+	* split into ranges which are encoded in parallel, on a ForkJoinPool. The generated string is identical.
+	* <br/>
+	* Nested arrays and objects are encoded without recursion, and the <b>max_depth</b> option limits the depth of nesting
+	* (by default, there is no limit). An array or object which contains itself raises a JSONEncodeError.
+	* <br/>
+	* @param py_obj The org.python.core.PyObject to be encoded as JSON.
+	* @return The JSON text corresponding to the Jython object (hierarchy) 
+	* @throws JSONEncodeError If an error occurred while encoding the Jython object (hierarchy) 
+	*/
+
+	public static String dumps ( PyObject[] args, String[] keywords )
+		throws JSONEncodeError
+	{
+		PyObject obj_to_encode = args[0];
+		JysonEncoder encoder;
+		PyObject parallel_arg = get_keyword_arg(args, keywords, "parallel");
+		if (parallel_arg != null && parallel_arg.__nonzero__())
+		{
+			int threshold = JysonParallelEncoder.DEFAULT_THRESHOLD;
+			PyObject threshold_arg = get_keyword_arg(args, keywords, "threshold");
+			if (threshold_arg != null)
+				threshold = threshold_arg.asInt();
+			encoder = new JysonParallelEncoder(threshold);
+		}
+		else
+			encoder = new JysonEncoder();
+		set_encoder_options(encoder, args, keywords);
+		long start = JysonMetrics.start();
+		try
+		{
+			String result = encoder.json_repr(obj_to_encode);
+			JysonMetrics.ENCODE.completed(start, result.length());
+			return result;
+		}
+		catch (JSONEncodeError jee)
+		{
+			JysonMetrics.ENCODE.failed(start, jee);
+			throw jee;
+		}
+		catch (RuntimeException rex)
+		{
+			JysonMetrics.ENCODE.failed(start, rex);
+			throw rex;
+		}
+	}
+
+	/**
+	* Register a function to encode the objects of a type, and of its subtypes, which are not otherwise encodable.
+	* <br/><br/>
+	* The function is called with the object, and returns an encodable object, which is encoded in its place:
+	* for example <b>register_encoder(datetime.date, lambda d: d.isoformat())</b>. Passing None as the function
+	* unregisters the type. Registrations apply to every encoder, in every thread.
+	* <br/>
+	* @param type The (new or old style) class of the objects to be encoded
+	* @param fn The function which converts an object of the type to an encodable object, or None
+	*/
+
+	public static void register_encoder ( PyObject type, PyObject fn )
+	{
+		if (!(type instanceof PyType || type instanceof PyClass))
+			throw Py.TypeError("Encoders can only be registered for classes, not '"+type.getType().fastGetName()+"' objects");
+		if (fn != Py.None && !fn.isCallable())
+			throw Py.TypeError("The encoder for a class must be callable");
+		JysonEncoder.register_encoder(type, fn);
+	}
+
+	/**
+	* Encode the given Jython object into JSON, writing the JSON text to the given file.
+	* <br/><br/>
+	* The JSON text is written in chunks, as it is generated, so the complete text is never held in memory.
+	* The encoder accepts the same options as <b>dumps()</b>, plus <b>chunk_size</b>, which sets the
+	* (minimum) number of characters written to the file at a time.
+	* <br/>
+	* @param py_obj The org.python.core.PyObject to be encoded as JSON.
+	* @param fp A java.io.Writer, a java.io.OutputStream (which is written as UTF-8), or a Jython file-like object with a write() method
+	* @throws JSONEncodeError If an error occurred while encoding the Jython object (hierarchy), or writing the JSON text
+	*/
+
+	public static void dump ( PyObject[] args, String[] keywords )
+		throws JSONEncodeError
+	{
+		JysonEncoder encoder = new JysonEncoder();
+		set_encoder_options(encoder, args, keywords);
+		JysonChunkIterator chunks = new JysonChunkIterator(encoder, args[0], get_chunk_size(args, keywords, 2));
+		java.io.Writer writer = as_writer(args[1]);
+		try
+		{
+			String chunk;
+			while ((chunk = chunks.next_chunk()) != null)
+				writer.write(chunk);
+			writer.flush();
+		}
+		catch (java.io.IOException iox)
+			{ throw new JSONEncodeError("Error writing JSON text: " + iox.getMessage()); }
+	}
+
+	/**
+	* Encode the given Jython object into JSON, returning an iterator over the JSON text.
+	* <br/><br/>
+	* Each item returned by the iterator is a string of at least <b>chunk_size</b> characters (apart
+	* from the last), and the JSON text for the rest of the object is not generated until it is requested.
+	* The encoder accepts the same options as <b>dumps()</b>.
+	* <br/>
+	* @param py_obj The org.python.core.PyObject to be encoded as JSON.
+	* @param chunk_size The (minimum) number of characters in each chunk
+	* @return A Jython iterator over the chunks of JSON text
+	*/
+
+	public static PyObject iterencode ( PyObject[] args, String[] keywords )
+	{
+		JysonEncoder encoder = new JysonEncoder();
+		set_encoder_options(encoder, args, keywords);
+		return new JysonChunkIterator(encoder, args[0], get_chunk_size(args, keywords, 1));
+	}
+
+	/**
+	* Enable or disable the recording of metrics for the decoding and encoding functions.
+	* <br/><br/>
+	* Recording is disabled by default, unless the <b>jyson.metrics</b> system property is true. The same metrics
+	* are published through JMX, as the MBean <b>com.xhaus.jyson:type=Metrics</b>, which can also enable recording.
+	* <br/>
+	* @param enabled Whether to record metrics
+	*/
+
+	public static void enable_stats ( boolean enabled )
+	{
+		JysonMetrics.enabled = enabled;
+	}
+
+	/**
+	* Return the metrics recorded for the decoding (loads, loads_bytes, decode) and encoding (dumps, encode) functions.
+	* <br/><br/>
+	* For each of "decode" and "encode", the dictionary holds the number of calls, the total size of the
+	* JSON texts (in characters, or bytes for loads_bytes), the number of errors by type, the mean latency
+	* in microseconds, and histograms of latencies and sizes, keyed by the (power of two) upper bound of each bucket.
+	* <br/>
+	* @return A dictionary of the metrics
+	*/
+
+	public static PyDictionary stats ( )
+	{
+		return JysonMetrics.snapshot();
+	}
+
+	/**
+	* Reset all of the recorded metrics to zero
+	*/
+
+	public static void reset_stats ( )
+	{
+		JysonMetrics.INSTANCE.reset();
+	}
+
+	protected static int get_chunk_size ( PyObject[] args, String[] keywords, int position )
+	{
+		PyObject chunk_size_arg = get_keyword_arg(args, keywords, "chunk_size");
+		if (chunk_size_arg == null && args.length-keywords.length > position)
+			chunk_size_arg = args[position];
+		if (chunk_size_arg == null)
+			return JysonChunkIterator.DEFAULT_CHUNK_SIZE;
+		return chunk_size_arg.asInt();
+	}
+
+	protected static java.io.Writer as_writer ( PyObject fp )
+	{
+		Object java_obj = fp.__tojava__(java.io.Writer.class);
+		if (java_obj != Py.NoConversion)
+			return (java.io.Writer)java_obj;
+		java_obj = fp.__tojava__(java.io.OutputStream.class);
+		if (java_obj != Py.NoConversion)
+		{
+			try
+				{ return new java.io.OutputStreamWriter((java.io.OutputStream)java_obj, "UTF-8"); }
+			catch (java.io.UnsupportedEncodingException uex)
+				{ throw Py.JavaError(uex); }
+		}
+		if (fp.__findattr__("write") != null)
+			return new JysonFileWriter(fp);
+		throw Py.TypeError("Cannot write JSON text to '"+fp.getType().fastGetName()+"' object");
+	}
+
+	protected static void set_encoder_options ( JysonEncoder encoder, PyObject[] args, String[] keywords )
+	{
+		for (int kix = 0 ; kix < keywords.length ; kix++)
+		{
+			String keyword = keywords[kix];
+			PyObject value = args[args.length-keywords.length+kix];
+			if ("emit_ascii".compareTo(keyword) == 0)
+				encoder.emit_ascii = value.__nonzero__();
+			if ("default".compareTo(keyword) == 0)
+				encoder.default_encoder = value == Py.None ? null : value;
+			if ("max_depth".compareTo(keyword) == 0)
+				encoder.max_depth = value.asInt();
+		}
+	}
+
+}
@@ -17,6 +17,8 @@
 
 package com.xhaus.jyson;
 
+import java.util.ArrayList;
+
 import org.python.core.*;
 
 public class JysonDecoder
@@ -47,16 +49,125 @@ public class JysonDecoder
 	/** Controls whether the Jyson decoder accepts extraneous data after primary expression */
 	public boolean accept_junk_after_data = false;
 
+	/** The default maximum number of distinct object keys shared by the Jyson decoder */
+	public static final int DEFAULT_KEY_CACHE_SIZE = 512;
+
+	/** The maximum number of distinct object keys for which the Jyson decoder shares a single key object, or 0 to share none */
+	public int key_cache_size = DEFAULT_KEY_CACHE_SIZE;
+
+	/** The maximum nesting depth of arrays and objects accepted by the Jyson decoder, or 0 for no limit */
+	public int max_depth = 0;
+
 	protected int curr_pos;
 
 	protected String json_text;
 
+	/** The JSON Pointers selecting the values to be decoded, or null if the entire text is decoded */
+	protected JysonPathFilter selection = null;
+
+	protected JysonKeyCache key_cache = null;
+
+	/** Builds the objects corresponding to the decoded JSON values: Jython objects, unless another target is chosen */
+	protected JysonBuilder builder = JysonPythonBuilder.INSTANCE;
+
+	/** If true, the values in objects and arrays are skipped, and their offsets passed to the builder (see JysonLazyBuilder) */
+	protected boolean lazy = false;
+
+	/** If not null, called with the text of every JSON float to construct its value (for example decimal.Decimal) */
+	public PyObject parse_float = null;
+
+	/** If not null, called with the text of every JSON integer to construct its value */
+	public PyObject parse_int = null;
+
+	/** The largest scratch buffer for strings kept by a decoder between JSON texts, in characters */
+	protected static final int MAX_RETAINED_STRING_BUFFER_SIZE = 65536;
+
+	/** A scratch buffer for strings containing escapes, reused for every such string */
+	protected StringBuilder string_buf = new StringBuilder();
+
+	/** The characters of the number being decoded, reused for every number */
+	protected char[] number_chars = new char[32];
+
+	protected int number_length;
+
+	/** The powers of ten which are exactly representable as doubles */
+	protected static final double[] EXACT_POWERS_OF_TEN = {
+		1e0, 1e1, 1e2, 1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9, 1e10, 1e11,
+		1e12, 1e13, 1e14, 1e15, 1e16, 1e17, 1e18, 1e19, 1e20, 1e21, 1e22,
+	};
+
+	/** The largest integer below which all integers are exactly representable as doubles */
+	protected static final long MAX_EXACT_MANTISSA = 1L << 53;
+
+	/** The maximum number of significant digits accumulated into the (long) mantissa of a number */
+	protected static final int MAX_MANTISSA_DIGITS = 18;
+
+	/** An array or object which has been opened, but not yet closed */
+	protected static class Frame
+	{
+		Object container;
+		boolean is_object;
+		String key; // of the member whose value is being decoded
+		int count;
+		JysonPathFilter selection;
+
+		Frame(Object c, boolean o, JysonPathFilter s)
+		{
+			container = c;
+			is_object = o;
+			key = null;
+			count = 0;
+			selection = s;
+		}
+	}
+
+	/** The arrays and objects which are open, innermost last: nested values are decoded from this stack, not by recursion */
+	protected ArrayList<Frame> stack = new ArrayList<Frame>();
+
+	/** Returned instead of a value when an array or object has been opened, and its frame pushed onto the stack */
+	protected static final Object OPENED = new Object();
+
 	protected JysonDecoder(String s)
 	{
 		curr_pos = 0;
 		json_text = s;
 	}
 
+	/**
+	* Start decoding a new JSON text, keeping the current option settings
+	*/
+
+	protected void reset ( String s )
+	{
+		curr_pos = 0;
+		json_text = s;
+		if (string_buf.capacity() > MAX_RETAINED_STRING_BUFFER_SIZE)
+			string_buf = new StringBuilder();
+	}
+
+	/**
+	* Copy the option settings of another decoder. Decoders are not thread-safe, but a decoder
+	* can be created for each thread, and configured with the options of a shared template decoder.
+	*/
+
+	protected void set_options ( JysonDecoder other )
+	{
+		accept_any_primary_datum = other.accept_any_primary_datum;
+		accept_dangling_commas = other.accept_dangling_commas;
+		accept_shell_style_comments = other.accept_shell_style_comments;
+		accept_single_quoted_strings = other.accept_single_quoted_strings;
+		accept_hex_char_escapes = other.accept_hex_char_escapes;
+		accept_hexadecimal_integers = other.accept_hexadecimal_integers;
+		accept_octal_integers = other.accept_octal_integers;
+		accept_junk_after_data = other.accept_junk_after_data;
+		selection = other.selection;
+		key_cache_size = other.key_cache_size;
+		max_depth = other.max_depth;
+		parse_float = other.parse_float;
+		parse_int = other.parse_int;
+		builder = other.builder;
+	}
+
 	private void reset_defaults()
 	{
 		accept_any_primary_datum = false;
@@ -125,6 +236,7 @@ public class JysonDecoder
 	}
 
 	protected char get_char ( )
+		throws JSONDecodeError
 	{
 		if (curr_pos < json_text.length())
 			return json_text.charAt(curr_pos++);
@@ -205,257 +317,514 @@ public class JysonDecoder
 		}
 	}
 
+	/**
+	* Decode the escape sequence following a backslash in a string
+	*/
+
+	protected char decode_escape ( )
+		throws JSONDecodeError
+	{
+		char c = get_char();
+		switch (c)
+		{
+			case 'b':
+				return '\b';
+			case 'f':
+				return '\f';
+			case 'n':
+				return '\n';
+			case 'r':
+				return '\r';
+			case 't':
+				return '\t';
+			case '\\':
+				return '\\';
+			case '"':
+				return '"';
+			case '/':
+				return '/';
+			case 'u':
+				String unichars = get_chars(4, "Unicode escape");
+				try
+					{ return (char)Integer.parseInt(unichars, 16); }
+				catch (NumberFormatException nfx)
+					{ throw decode_exception("Illegal character in unicode hex constant: " + unichars); }
+			case 'x' :
+				if (accept_hex_char_escapes)
+					return (char) Integer.parseInt(get_chars(2, "Hexadecimal escape"), 16);
+				else
+					throw decode_exception("Hexadecimal escapes for characters are not accepted");
+			default:
+				throw decode_exception("Illegal escape character: '"+c+"'");
+		}
+	}
+
+	/**
+	* Return the scratch buffer for a string, emptied
+	*/
+
+	protected StringBuilder get_string_buf ( )
+	{
+		string_buf.setLength(0);
+		return string_buf;
+	}
+
+	/**
+	* Return true if the character ends a run of plain characters in a string delimited by the given quote
+	*/
+
+	protected static boolean ends_string_run ( char c, char quote )
+	{
+		return c == quote || c == '\\' || c == '\n' || c == '\r' || c == 0;
+	}
+
+	/**
+	* Decode a string. The runs of characters between escapes are copied in bulk: a string without
+	* escapes is a single substring of the JSON text, and those with escapes are built in a scratch buffer.
+	*/
+
 	protected String get_string(char quote)
 		throws JSONDecodeError
 	{
-		char c;
-		StringBuffer buf = new StringBuffer();
+		StringBuilder buf = null;
+		int text_len = json_text.length();
 		while (true)
 		{
-			c = get_char();
-			switch (c)
+			int start = curr_pos;
+			int end = start;
+			while (end < text_len && !ends_string_run(json_text.charAt(end), quote))
+				end++;
+			if (end == text_len)
 			{
-				case '\\':
-					c = get_char();
-					switch (c)
-						{
-						case 'b':
-							buf.append('\b');
-							break;
-						case 'f':
-							buf.append('\f');
-							break;
-						case 'n':
-							buf.append('\n');
-							break;
-						case 'r':
-							buf.append('\r');
-							break;
-						case 't':
-							buf.append('\t');
-							break;
-						case '\\':
-							buf.append('\\');
-							break;
-						case '"':
-							buf.append('"');
-							break;
-						case '/':
-							buf.append('/');
-							break;
-						case 'u':
-							String unichars = get_chars(4, "Unicode escape");
-							try
-								{ buf.append((char)Integer.parseInt(unichars, 16)); }
-							catch (NumberFormatException nfx)
-								{ throw decode_exception("Illegal character in unicode hex constant: " + unichars); }
-							break;
-						case 'x' :
-							if (accept_hex_char_escapes)
-								buf.append((char) Integer.parseInt(get_chars(2, "Hexadecimal escape"), 16));
-							else
-								throw decode_exception("Hexadecimal escapes for characters are not accepted");
-							break;
-						default:
-							throw decode_exception("Illegal escape character: '"+c+"'");
-					}
-					break;
-				case 0:
-				case '\n':
-				case '\r':
-					throw decode_exception("Line terminators must be escaped inside strings");
-				case '\'':
-				case '"':
-					if (c == quote)
-						{ return buf.toString(); }
-					// else let it flow into the default case
-				default:
-					buf.append(c);
+				curr_pos = end;
+				throw decode_exception("Line terminators must be escaped inside strings");
 			}
+			char c = json_text.charAt(end);
+			curr_pos = end + 1;
+			if (c == quote)
+			{
+				if (buf == null)
+					return json_text.substring(start, end);
+				return buf.append(json_text, start, end).toString();
+			}
+			if (c != '\\')
+				throw decode_exception("Line terminators must be escaped inside strings");
+			if (buf == null)
+				buf = get_string_buf();
+			buf.append(json_text, start, end);
+			buf.append(decode_escape());
 		}
 	}
 
-	protected PyObject decode_constant ( String s )
+	protected Object decode_constant ( String s )
 		throws JSONDecodeError
 	{
 		if (s.compareTo("true") == 0)
-			{ return Py.True; }
+			{ return builder.new_boolean(true); }
 		if (s.compareTo("false") == 0)
-			{ return Py.False; }
+			{ return builder.new_boolean(false); }
 		if (s.compareTo("null") == 0)
-			{ return Py.None; }
+			{ return builder.new_null(); }
 		if (s.length() == 0)
 			{ throw decode_exception("No value specified"); }
-		return null;
+		throw decode_exception("Unable to decode '"+s+"'");
+	}
+
+	protected void append_number_char ( char c )
+	{
+		if (number_length == number_chars.length)
+			number_chars = java.util.Arrays.copyOf(number_chars, number_length * 2);
+		number_chars[number_length++] = c;
+	}
+
+	protected String get_number_text ( )
+	{
+		return new String(number_chars, 0, number_length);
+	}
+
+	/**
+	* Return whether a character ends the unquoted text of a number
+	*/
+
+	protected static boolean ends_number ( char c )
+	{
+		return c <= ' ' || ",:]}/\\[{#".indexOf(c) != -1;
 	}
 
-	protected PyObject decode_number ( String s )
+	/**
+	* Decode the unquoted text of a number which the single pass scanner does not accept, starting with the
+	* characters read so far and the given character, in the same way as all numbers were decoded before it:
+	* as a hexadecimal or octal integer if it starts with 0x or 0 (and is not 0.), or otherwise by Integer.parseInt(),
+	* BigInteger or Double.parseDouble(), which also accept forms such as -012, -Infinity and 1.5d
+	*/
+
+	protected Object get_other_number ( char c )
 		throws JSONDecodeError
 	{
-		char first = s.charAt(0);
-		if (Character.isDigit(first) || ".-+".indexOf(first) != -1)
+		while (c >= ' ' && ",:]}/\\[{#".indexOf(c) == -1)
 		{
-			if (first == '0' && s.length() > 1)
+			append_number_char(c);
+			c = get_char();
+		}
+		if (c != 0) push();
+		String s = get_number_text().trim();
+		if (s.length() > 1 && s.charAt(0) == '0')
+		{
+			if (s.charAt(1) == 'x' || s.charAt(1) == 'X')
 			{
-				if (s.charAt(1) == 'x' || s.charAt(1) == 'X')
-				{
-					if (accept_hexadecimal_integers)
-					{
-						String hexchars = s.substring(2);
-						try
-							{ return new PyInteger(Integer.parseInt(hexchars, 16)); }
-						catch (NumberFormatException nfx)
-							{ throw decode_exception("Format error in hexadecimal constant: " + hexchars); }
-					}
-					else
-						throw decode_exception("Hexadecimal integers are not accepted.");
-				}
-				if (s.charAt(1) != '.')
-				{
-					if (accept_octal_integers)
-						{
-						try
-							{ return new PyInteger(Integer.parseInt(s, 8)); }
-						catch (NumberFormatException nfx)
-							{ throw decode_exception("Format error in octal constant: " + s); }
-						}
-					else
-						{ throw decode_exception("Octal integers are not accepted."); }
-				}
+				if (!accept_hexadecimal_integers)
+					{ throw decode_exception("Hexadecimal integers are not accepted."); }
+				return decode_radix_integer(s.substring(2), 16, "hexadecimal");
+			}
+			if (s.charAt(1) != '.')
+			{
+				if (!accept_octal_integers)
+					{ throw decode_exception("Octal integers are not accepted."); }
+				return decode_radix_integer(s, 8, "octal");
 			}
-			String possible_number = s;
-			if (possible_number.charAt(0) == '+')
-				possible_number = possible_number.substring(1);
-			try
-				{ return new PyInteger(Integer.parseInt(possible_number));	}
-			catch (Exception e)
-				{}
-			try
-				{ return new PyLong(possible_number); }
-			catch (Exception e)
-				{}
-			try
-				{
-				double result = Double.parseDouble(possible_number);
-				return new PyFloat(result);
-				}
-			catch (NumberFormatException nfx)
-				{}
 		}
-		return null;
+		String possible_number = s.charAt(0) == '+' ? s.substring(1) : s;
+		try
+			{ return builder.new_integer(Integer.parseInt(possible_number)); }
+		catch (NumberFormatException nfx)
+			{}
+		try
+			{ return builder.new_big_integer(new java.math.BigInteger(possible_number)); }
+		catch (NumberFormatException nfx)
+			{}
+		try
+			{ return builder.new_float(Double.parseDouble(possible_number)); }
+		catch (NumberFormatException nfx)
+			{}
+		throw decode_exception("Unable to decode '"+s+"'");
 	}
 
-	protected PyStringMap get_json_object( )
+	protected Object decode_radix_integer ( String digits, int radix, String desc )
 		throws JSONDecodeError
 	{
-		char c;
-		String key;
+		try
+			{ return builder.new_integer(Integer.parseInt(digits, radix)); }
+		catch (NumberFormatException nfx)
+			{ throw decode_exception("Format error in "+desc+" constant: " + digits); }
+	}
 
-		PyStringMap json_object = new PyStringMap(); // PyStringMaps accept only string keys, like JSON
-		while (true)
+	/**
+	* Decode a number, starting with the given character, in a single pass over its characters.
+	* <br/><br/>
+	* The syntax of the number is validated as it is read, and its significant digits are accumulated into a
+	* long mantissa, so that integers and most floats are converted without reparsing the text. When the
+	* mantissa is below 2^53 and the decimal exponent is at most 22, the float is a single multiplication or
+	* division of two exactly representable doubles, and so is correctly rounded (Clinger's fast path): other
+	* floats are converted by Double.parseDouble().
+	* <br/><br/>
+	* Any other text, such as a hexadecimal or octal integer, is decoded by get_other_number(), so that the
+	* same numbers are accepted as when the text of every number was decoded by the Java parsers.
+	*/
+
+	protected Object get_number ( char c )
+		throws JSONDecodeError
+	{
+		number_length = 0;
+		boolean negative = c == '-';
+		boolean is_float = false;
+		if (c == '-' || c == '+')
 		{
-			c = get_data_char();
-			switch (c)
+			append_number_char(c);
+			c = get_char();
+		}
+		long mantissa = 0;
+		int significant_digits = 0;
+		int int_digits = 0;
+		int frac_digits = 0;
+		int exponent = 0;
+		for ( ; c >= '0' && c <= '9' ; c = get_char(), int_digits++)
+		{
+			append_number_char(c);
+			if (significant_digits > 0 || c != '0')
 			{
-				case 0:
-					throw decode_exception("A JSON object must end with '}'");
-				case '}':
-					return json_object;
-				case '\'':
-					if (accept_single_quoted_strings)
-						key = get_string('\'');
-					else
-						throw decode_exception("Single quoted strings are not acceptable in JSON");
-					break;
-				case '"':
-					key = get_string('"');
-					break;
-				default:
-					throw decode_exception("Only strings are acceptable as object keys in JSON");
+				if (++significant_digits <= MAX_MANTISSA_DIGITS)
+					mantissa = mantissa * 10 + (c - '0');
+			}
+		}
+		// Unsigned integers with a leading zero (other than 0 itself, and 0.) are hexadecimal or octal,
+		// but the leading zeros of signed integers are ignored
+		if (int_digits == number_length && number_chars[0] == '0' && (int_digits > 1 || (c != '.' && !ends_number(c))))
+			return get_other_number(c);
+		if (c == '.')
+		{
+			is_float = true;
+			append_number_char(c);
+			for (c = get_char() ; c >= '0' && c <= '9' ; c = get_char(), frac_digits++)
+			{
+				append_number_char(c);
+				if (significant_digits > 0 || c != '0')
+				{
+					if (++significant_digits <= MAX_MANTISSA_DIGITS)
+						mantissa = mantissa * 10 + (c - '0');
+				}
+			}
+		}
+		if (int_digits + frac_digits == 0)
+			return get_other_number(c);
+		if (c == 'e' || c == 'E')
+		{
+			is_float = true;
+			append_number_char(c);
+			c = get_char();
+			boolean negative_exponent = c == '-';
+			if (c == '-' || c == '+')
+			{
+				append_number_char(c);
+				c = get_char();
 			}
-			c = get_data_char();
-			if (c != ':')
-				{ throw decode_exception("Object keys and values must be separated by ':'"); }
-			PyObject value = get_object();
-			json_object.__setitem__(new PyUnicode(key), value);
+			int exp_digits = 0;
+			for ( ; c >= '0' && c <= '9' ; c = get_char(), exp_digits++)
+			{
+				append_number_char(c);
+				if (exponent < 100000)
+					exponent = exponent * 10 + (c - '0');
+			}
+			if (exp_digits == 0)
+				return get_other_number(c);
+			if (negative_exponent)
+				exponent = -exponent;
+		}
+		if (!ends_number(c))
+			return get_other_number(c);
+		if (c != 0) push();
+
+		if (!is_float)
+		{
+			if (parse_int != null)
+				return parse_int.__call__(new PyString(get_number_text()));
+			if (significant_digits > MAX_MANTISSA_DIGITS)
+				return builder.new_big_integer(new java.math.BigInteger(get_number_text()));
+			return builder.new_integer(negative ? -mantissa : mantissa);
+		}
+		if (parse_float != null)
+			return parse_float.__call__(new PyString(get_number_text()));
+		exponent -= frac_digits;
+		if (significant_digits <= MAX_MANTISSA_DIGITS && mantissa <= MAX_EXACT_MANTISSA &&
+			exponent >= -22 && exponent <= 22)
+		{
+			double value = mantissa;
+			if (exponent < 0)
+				value /= EXACT_POWERS_OF_TEN[-exponent];
+			else
+				value *= EXACT_POWERS_OF_TEN[exponent];
+			return builder.new_float(negative ? -value : value);
+		}
+		return builder.new_float(Double.parseDouble(get_number_text()));
+	}
+
+	/**
+	* Return the key object for an object key, shared with all other occurrences of the same key while it is cached
+	*/
+
+	protected Object decode_key ( String key )
+	{
+		if (key_cache_size <= 0)
+			return builder.new_key(key);
+		if (key_cache == null || key_cache.capacity != key_cache_size || key_cache.builder != builder)
+			key_cache = new JysonKeyCache(key_cache_size, builder);
+		return key_cache.get_key(key);
+	}
+
+	/**
+	* Push a frame for an array or object which has just been opened
+	*
+	* @return OPENED
+	*/
+
+	protected Object open_container ( Object container, boolean is_object )
+		throws JSONDecodeError
+	{
+		if (max_depth > 0 && stack.size() >= max_depth)
+			{ throw decode_exception("Arrays and objects may not be nested more than "+max_depth+" deep"); }
+		stack.add(new Frame(container, is_object, selection));
+		return OPENED;
+	}
+
+	/**
+	* Pop the frame of the innermost open array or object, and return the finished container
+	*/
+
+	protected Object close_container ( )
+		throws JSONDecodeError
+	{
+		Frame frame = stack.remove(stack.size()-1);
+		if (!stack.isEmpty())
+			selection = stack.get(stack.size()-1).selection;
+		return builder.end_container(frame.container);
+	}
+
+	/**
+	* Read the separator after a member of an array or object
+	*
+	* @return true if the container has ended
+	*/
+
+	protected boolean end_member ( Frame frame )
+		throws JSONDecodeError
+	{
+		if (frame.is_object)
+		{
 			switch (get_data_char())
 			{
 				case ',':
 					if (get_data_char() == '}')
 						{
 						if (accept_dangling_commas)
-							return json_object;
+							return true;
 						else
 							throw decode_exception("Commas after last entry of object not accepted");
 						}
 					push();
-					break;
+					return false;
 				case '}':
-					return json_object;
+					return true;
 				default:
 					throw decode_exception("Expected a ',' or '}'");
 			}
 		}
+		switch (get_data_char())
+		{
+			case 0:
+				{ throw decode_exception("Ran out of characters reading array"); }
+			case ',':
+				if (get_data_char() == ']')
+					{
+					if (accept_dangling_commas)
+						return true;
+					else
+						throw decode_exception("Commas after last element of array not accepted");
+					}
+				push();
+				return false;
+			case ']':
+				return true;
+			default:
+				throw decode_exception("Array elements must be followed by ',' or ']'");
+		}
 	}
 
-	protected PyList get_json_array ()
+	/**
+	* Read the next member of the innermost open array or object, up to the start of its value
+	*
+	* @return The value of the member, as returned by start_value(), or the finished container if it has ended instead
+	*/
+
+	protected Object next_member ( )
 		throws JSONDecodeError
 	{
-		char next = get_data_char();
-		if (next == 0)
-			{ throw decode_exception("Ran out of characters reading array"); }
-
-		PyList json_array = new PyList();
-		if ( next == ']')
-			{ return json_array; }
-			
-		push();
+		Frame frame = stack.get(stack.size()-1);
 		while (true)
 		{
-			if (get_data_char() == ',')
-				{ throw decode_exception("Arrays may not contain consecutive or dangling commas"); }
-			push();
-			json_array.append(get_object());
-			switch (get_data_char())
+			JysonPathFilter member_selection = null;
+			if (frame.is_object)
 			{
-				case 0:
-					{ throw decode_exception("Ran out of characters reading array"); }
-				case ',':
-					if (get_data_char() == ']')
-						{
-						if (accept_dangling_commas)
-							return json_array;
+				String key;
+				switch (get_data_char())
+				{
+					case 0:
+						throw decode_exception("A JSON object must end with '}'");
+					case '}':
+						return close_container();
+					case '\'':
+						if (accept_single_quoted_strings)
+							key = get_string('\'');
 						else
-							throw decode_exception("Commas after last element of array not accepted");
-						}
-					push();
-					break;
-				case ']':
-					return json_array;
-				default:
-					throw decode_exception("Array elements must be followed by ',' or ']'");
+							throw decode_exception("Single quoted strings are not acceptable in JSON");
+						break;
+					case '"':
+						key = get_string('"');
+						break;
+					default:
+						throw decode_exception("Only strings are acceptable as object keys in JSON");
+				}
+				if (get_data_char() != ':')
+					{ throw decode_exception("Object keys and values must be separated by ':'"); }
+				frame.key = key;
+				if (selection != null)
+					member_selection = selection.child(key);
+			}
+			else
+			{
+				if (get_data_char() == ',')
+					{ throw decode_exception("Arrays may not contain consecutive or dangling commas"); }
+				push();
+				if (selection != null)
+					member_selection = selection.child(frame.count);
 			}
+			if (selection == null)
+				return get_value();
+			if (member_selection != null)
+			{
+				selection = member_selection.selected ? null : member_selection;
+				Object value = start_value(get_data_char());
+				if (value != OPENED)
+					selection = frame.selection;
+				return value;
+			}
+			skip_value();
+			frame.count++;
+			if (end_member(frame))
+				return close_container();
 		}
 	}
 
-	protected PyObject get_object()
+	/**
+	* Add a decoded value to the innermost open array or object, and read its next member, as next_member()
+	*/
+
+	protected Object add_member ( Object value )
 		throws JSONDecodeError
 	{
-		char c = get_data_char();
+		Frame frame = stack.get(stack.size()-1);
+		if (frame.is_object)
+			builder.put(frame.container, decode_key(frame.key), value);
+		else
+			builder.append(frame.container, value);
+		frame.count++;
+		if (end_member(frame))
+			return close_container();
+		return next_member();
+	}
 
+	/**
+	* Decode the value starting with the given character: if it is a (non-empty) array or object, it is only
+	* opened, and OPENED is returned, so that its members are decoded from the stack by get_object()
+	*/
+
+	protected Object start_value ( char c )
+		throws JSONDecodeError
+	{
 		switch (c)
 		{
 			case '{':
-				return get_json_object();
+				return open_container(builder.new_object(), true);
 			case '[':
-				return get_json_array();
+				char next = get_data_char();
+				if (next == 0)
+					{ throw decode_exception("Ran out of characters reading array"); }
+				Object json_array = builder.new_array();
+				if (next == ']')
+					{ return builder.end_container(json_array); }
+				push();
+				return open_container(json_array, false);
 			case '"':
-				return new PyUnicode(get_string(c));
+				return builder.new_string(get_string(c));
 			case '\'':
 				if (accept_single_quoted_strings)
-					return new PyUnicode(get_string(c));
+					return builder.new_string(get_string(c));
 				else
 					throw decode_exception("Single quoted strings are not accepted");
+			case '-':
+			case '+':
+			case '.':
+			case '0': case '1': case '2': case '3': case '4':
+			case '5': case '6': case '7': case '8': case '9':
+				return get_number(c);
 		}
 
 		// OK, we have unquoted text. Try to figure out what to do with it
@@ -472,26 +841,168 @@ public class JysonDecoder
 		
 		// Check if it is one of the known constants
 		
-		PyObject result = decode_constant(s);
-		if (result != null)
-			return result;
+		return decode_constant(s);
+	}
 
-		// Try to convert it to a number
+	/**
+	* Decode the next value. Nested arrays and objects are decoded from an explicit stack of frames, rather
+	* than by recursion, so that the depth of nesting is not limited by the size of the thread's stack.
+	*/
 
-		result = decode_number(s);
-		if (result != null)
-			return result;
+	protected Object get_object()
+		throws JSONDecodeError
+	{
+		int base_depth = stack.size();
+		try
+		{
+			Object value = start_value(get_data_char());
+			while (true)
+			{
+				if (value == OPENED)
+					value = next_member();
+				else if (stack.size() == base_depth)
+					return value;
+				else
+					value = add_member(value);
+			}
+		}
+		finally
+		{
+			// Only after an error: discard the frames of the arrays and objects which were not finished
+			while (stack.size() > base_depth)
+				stack.remove(stack.size()-1);
+		}
+	}
 
-		throw decode_exception("Unable to decode '"+s+"'");
+	/**
+	* Start the value of the next member of an object or array, as start_value() or, when decoding lazily,
+	* skip over it and return its offset
+	*/
+
+	protected Object get_value ( )
+		throws JSONDecodeError
+	{
+		if (!lazy)
+			return start_value(get_data_char());
+		char c = get_data_char();
+		if (c != 0) push();
+		int offset = curr_pos;
+		skip_value();
+		return Integer.valueOf(offset);
+	}
+
+	protected void skip_string ( char quote )
+		throws JSONDecodeError
+	{
+		while (true)
+		{
+			char c = get_char();
+			if (c == quote)
+				return;
+			switch (c)
+			{
+				case '\\':
+					get_char();
+					break;
+				case 0:
+				case '\n':
+				case '\r':
+					throw decode_exception("Line terminators must be escaped inside strings");
+			}
+		}
 	}
 
-	protected PyObject get_top_level_object ( )
+	/**
+	* Skip over the next value, without decoding it. Only brackets and quotes are matched; nothing is allocated.
+	*/
+
+	protected void skip_value ( )
 		throws JSONDecodeError
 	{
-		PyObject result = get_object();
-		if (!(result instanceof  PyStringMap || result instanceof PyList) && 
-			!accept_any_primary_datum)
+		char c = get_data_char();
+		switch (c)
+		{
+			case 0:
+			case ',':
+			case ':':
+			case ']':
+			case '}':
+				throw decode_exception("No value specified");
+			case '\'':
+				if (!accept_single_quoted_strings)
+					throw decode_exception("Single quoted strings are not accepted");
+				// else let it flow into the double quoted case
+			case '"':
+				skip_string(c);
+				return;
+			case '{':
+			case '[':
+				break;
+			default:
+				while (c >= ' ' && ",:]}/\\[{#".indexOf(c) == -1)
+					c = get_char();
+				if (c != 0) push();
+				return;
+		}
+		int depth = 1;
+		while (depth > 0)
+		{
+			switch (get_data_char())
+			{
+				case 0:
+					throw decode_exception("Ran out of characters skipping value");
+				case '{':
+				case '[':
+					depth++;
+					break;
+				case '}':
+				case ']':
+					depth--;
+					break;
+				case '"':
+					skip_string('"');
+					break;
+				case '\'':
+					if (accept_single_quoted_strings)
+						skip_string('\'');
+					break;
+			}
+		}
+	}
+
+	/**
+	* Decode the JSON text (document) starting at the current position, leaving the position just after it,
+	* so that any documents which follow it can be decoded in turn by the same decoder.
+	*/
+
+	protected Object get_document ( )
+		throws JSONDecodeError
+	{
+		char first = get_data_char();
+		if (first != 0) push();
+		Object result = get_object();
+		if (!(first == '{' || first == '[') && !accept_any_primary_datum)
 			throw decode_exception("JSON expressions must strictly be either objects or lists");
+		return result;
+	}
+
+	/**
+	* Skip any whitespace (and comments) at the current position, returning whether there is nothing after it
+	*/
+
+	protected boolean at_end ( )
+		throws JSONDecodeError
+	{
+		if (get_data_char() == 0)
+			return true;
+		push();
+		return false;
+	}
+
+	protected Object get_top_level_object ( )
+		throws JSONDecodeError
+	{
+		Object result = get_document();
 		char ch = get_data_char();
 		if (ch != 0 && !accept_junk_after_data)
 			throw decode_exception("Only whitespace is permitted after the primary datum: not '"+ch+"'");
@@ -0,0 +1,54 @@
+/*
+ * Copyright 2009-2012 Alan Kennedy
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License"); 
+ * you may not use this file except in compliance with the License. 
+ * You may obtain a copy of the License at 
+ *
+ *    http://www.apache.org/licenses/LICENSE-2.0 
+ *
+ * Unless required by applicable law or agreed to in writing, software 
+ * distributed under the License is distributed on an "AS IS" BASIS, 
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+ * See the License for the specific language governing permissions and 
+ * limitations under the License. 
+ *
+ */
+
+package com.xhaus.jyson;
+
+import org.python.core.*;
+
+/**
+ * A Jython iterator over a sequence of concatenated JSON texts (documents), such as back-to-back objects
+ * written to a log. The documents may be separated by whitespace, or not separated at all, apart from
+ * top level numbers and constants, which must be separated from whatever follows them.
+ * <br/><br/>
+ * A single decoder decodes every document, from where the previous one ended, so the text is never split
+ * into a separate string for each document.
+ */
+
+public class JysonDocumentIterator extends PyIterator
+
+{
+
+	protected JysonDecoder decoder;
+
+	protected JysonDocumentIterator(JysonDecoder d)
+	{
+		decoder = d;
+	}
+
+	public PyObject __iternext__ ( )
+	{
+		try
+		{
+			if (decoder.at_end())
+				return null;
+			return Py.java2py(decoder.get_document());
+		}
+		catch (JSONDecodeError jde)
+			{ throw Py.JavaError(jde); }
+	}
+
+}
@@ -1,165 +1,681 @@
-/*
- * Copyright 2009-2012 Alan Kennedy
- *
- * Licensed under the Apache License, Version 2.0 (the "License"); 
- * you may not use this file except in compliance with the License. 
- * You may obtain a copy of the License at 
- *
- *    http://www.apache.org/licenses/LICENSE-2.0 
- *
- * Unless required by applicable law or agreed to in writing, software 
- * distributed under the License is distributed on an "AS IS" BASIS, 
- * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
- * See the License for the specific language governing permissions and 
- * limitations under the License. 
- *
- */
-
-package com.xhaus.jyson;
-
-import org.python.core.*;
-
-public class JysonEncoder
-{
-
-	/** Controls whether the Jyson encoder emits unicode or ascii strings */
-	public boolean emit_ascii = false;
-
-	protected JysonEncoder ( )
-	{
-	}
-
-	//
-	// This code has been pinched from the jython source base: org.core.python.PyString
-	// And modified to
-	// 1. Always use double quotes, never single
-	// 2. Output control characters as unicode escapes, not \x escapes
-	// 
-
-    private static char[] hexdigit = "0123456789ABCDEF".toCharArray();
-
-	protected void append_json_string_repr ( StringBuffer buf, String str )
-	{
-		int size = str.length();
-		StringBuffer v = new StringBuffer(str.length());
-		char quote = '"';
-
-		buf.append(quote);
-		for (int i = 0; size-- > 0; )
-		{
-			int ch = str.charAt(i++);
-			/* Escape quotes */
-			if (ch == quote || ch == '\\')
-			{
-				buf.append('\\');
-				buf.append((char) ch);
-			}
-			else if (ch == '\n') buf.append("\\n");
-			else if (ch == '\t') buf.append("\\t");
-			else if (ch == '\b') buf.append("\\b");
-			else if (ch == '\f') buf.append("\\f");
-			else if (ch == '\r') buf.append("\\r");
-			else if (ch < ' ' || (ch >= 127 && emit_ascii) || 
-			        (ch >= Character.MIN_SURROGATE && ch <= Character.MAX_SURROGATE))
-			{
-				/* Map control and non ascii characters to '\\uxxxx' */
-				buf.append("\\u");
-				buf.append(hexdigit[(ch >> 12) & 0xf]);
-				buf.append(hexdigit[(ch >> 8) & 0xf]);
-				buf.append(hexdigit[(ch >> 4) & 0xf]);
-				buf.append(hexdigit[ch & 15]);
-			}
-			/* Copy everything else as-is */
-			else
-				buf.append((char) ch);
-		}
-		buf.append(quote);
-	}
-
-	protected void append_json_map_repr ( StringBuffer buf, PyObject map, PyList keys )
-		throws JSONEncodeError
-	{
-		int num_keys = keys.__len__();
-		buf.append('{');
-		for (int ix = 0 ; ix < num_keys ; ix++)
-		{
-			PyObject k = keys.__getitem__(ix);
-			if (!(k instanceof PyString))
-				throw new JSONEncodeError(((PyType)k.fastGetClass()).fastGetName()+" objects are not permitted as JSON object keys.");
-			append_json_string_repr(buf, ((PyString)k).toString());
-			buf.append(':');
-			buf.append(json_repr(map.__finditem__(k)));
-			if (ix < num_keys-1)
-				buf.append(',');
-		}
-		buf.append('}');
-	}
-
-	protected void append_json_string_map_repr ( StringBuffer buf, PyStringMap map )
-		throws JSONEncodeError
-	{
-		append_json_map_repr(buf, map, map.keys());
-	}
-
-	protected void append_json_dictionary_repr ( StringBuffer buf, PyDictionary map )
-		throws JSONEncodeError
-	{
-		append_json_map_repr(buf, map, map.keys());
-	}
-
-	protected void append_json_sequence_repr ( StringBuffer buf, PySequence sequence )
-		throws JSONEncodeError
-	{
-		int num_items = sequence.__len__();
-		buf.append('[');
-		for (int ix = 0 ; ix < num_items ; ix++)
-		{
-			buf.append(json_repr(sequence.__getitem__(ix)));
-			if (ix < num_items-1)
-				buf.append(',');
-		}
-		buf.append(']');
-	}
-
-	public void append_json_repr ( StringBuffer buf, PyObject py_obj )
-		throws JSONEncodeError
-	{
-		if (py_obj instanceof PyString)
-			append_json_string_repr(buf, ((PyString)py_obj).toString());
-		// Must test for PyBoolean before PyInteger because former is a subclass of latter.
-		else if (py_obj instanceof PyBoolean)
-			buf.append(((PyBoolean)py_obj).getBooleanValue() ? "true" : "false");
-		else if (py_obj instanceof PyInteger)
-			 buf.append(Integer.toString(((PyInteger)py_obj).getValue()));
-		else if (py_obj instanceof PyLong)
-			{
-			String repr = ((PyLong)py_obj).__repr__().toString();
-			buf.append(repr.substring(0, repr.length()-1));
-			}
-		else if (py_obj instanceof PyFloat)
-			buf.append(Double.toString(((PyFloat)py_obj).getValue()));
-		else if (py_obj instanceof PyStringMap)
-			append_json_string_map_repr(buf, (PyStringMap)py_obj);
-		else if (py_obj instanceof PyDictionary)
-			append_json_dictionary_repr(buf, (PyDictionary)py_obj);
-		else if (py_obj instanceof PySequence)
-			append_json_sequence_repr(buf, (PySequence)py_obj);
-		else if (py_obj instanceof PyNone)
-			buf.append("null");
-		else if (py_obj.__findattr__("__json__") != null &&
-			py_obj.__findattr__("__json__").isCallable())
-				buf.append(((PyMethod)py_obj.__findattr__("__json__")).__call__().toString());
-		else
-			throw new JSONEncodeError("Python '"+((PyType)py_obj.fastGetClass()).fastGetName()
-				+"' object '"+py_obj.__repr__()+"' is not encodable in JSON");
-	}
-
-	public String json_repr ( PyObject py_obj )
-		throws JSONEncodeError
-	{
-		StringBuffer buf = new StringBuffer();
-		append_json_repr(buf, py_obj);
-		return buf.toString();
-	}
-
-}
+/*
+ * Copyright 2009-2012 Alan Kennedy
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License"); 
+ * you may not use this file except in compliance with the License. 
+ * You may obtain a copy of the License at 
+ *
+ *    http://www.apache.org/licenses/LICENSE-2.0 
+ *
+ * Unless required by applicable law or agreed to in writing, software 
+ * distributed under the License is distributed on an "AS IS" BASIS, 
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+ * See the License for the specific language governing permissions and 
+ * limitations under the License. 
+ *
+ */
+
+package com.xhaus.jyson;
+
+import java.util.ArrayList;
+import java.util.IdentityHashMap;
+import java.util.Iterator;
+import java.util.LinkedHashMap;
+import java.util.Map;
+
+import org.python.core.*;
+
+public class JysonEncoder
+{
+
+	/** Controls whether the Jyson encoder emits unicode or ascii strings */
+	public boolean emit_ascii = false;
+
+	/** If not null, called with every object which is not otherwise encodable, returning an encodable object in its place */
+	public PyObject default_encoder = null;
+
+	/** The maximum nesting depth of arrays and objects generated by the Jyson encoder, or 0 for no limit */
+	public int max_depth = 0;
+
+	/** The ways in which the objects of a type are encoded, as resolved by resolve_dispatch() */
+	protected static final int KIND_STRING = 0;
+	protected static final int KIND_BOOLEAN = 1;
+	protected static final int KIND_INTEGER = 2;
+	protected static final int KIND_LONG = 3;
+	protected static final int KIND_FLOAT = 4;
+	protected static final int KIND_STRING_MAP = 5;
+	protected static final int KIND_DICTIONARY = 6;
+	protected static final int KIND_SEQUENCE = 7;
+	protected static final int KIND_NONE = 8;
+	protected static final int KIND_JSON_METHOD = 9;
+	protected static final int KIND_REGISTERED = 10;
+	protected static final int KIND_JAVA_MAP = 11;
+	protected static final int KIND_JAVA_LIST = 12;
+	protected static final int KIND_OTHER = 13;
+
+	/** How the objects of one type are encoded */
+	protected static class Dispatch
+	{
+		int kind;
+		PyObject encoder_fn; // for KIND_REGISTERED
+		boolean immutable; // whether the JSON text of an object of the type can be cached
+
+		Dispatch(int k, PyObject f)
+		{
+			kind = k;
+			encoder_fn = f;
+		}
+	}
+
+	/** The encoder functions registered with register_encoder(), by type, in order of registration */
+	protected static Map<PyObject, PyObject> registered_encoders = new LinkedHashMap<PyObject, PyObject>();
+
+	/** Incremented by every registration, so that encoders can discard dispatch tables resolved before it */
+	protected static volatile int registry_version = 0;
+
+	/** How the objects of each type seen by this encoder are encoded, filled in when a type is first seen */
+	protected Map<PyObject, Dispatch> dispatch_table = new IdentityHashMap<PyObject, Dispatch>();
+
+	protected int dispatch_version = -1;
+
+	/** If not null, the JSON text of immutable objects is cached here, and appended when the same object is encoded again */
+	protected JysonFragmentCache fragment_cache = null;
+
+	/** True while the JSON text of an object is being generated for the fragment cache */
+	protected boolean capturing = false;
+
+	/** An array or object which has been opened, but not yet closed, in the JSON text */
+	protected static class Frame
+	{
+		Object container;
+		PyList keys; // for Jython objects; null for arrays
+		Iterator<?> iterator; // for Java maps and lists
+		boolean is_object;
+		int ix;
+		int len;
+		int converted; // the number of objects whose encoder functions returned this array or object, or a value which did
+
+		Frame(Object c, PyList k, Iterator<?> i, boolean o, int l)
+		{
+			container = c;
+			keys = k;
+			iterator = i;
+			is_object = o;
+			ix = 0;
+			len = l;
+		}
+	}
+
+	/** The arrays and objects which are open, innermost last: nested values are encoded from this stack, not by recursion */
+	protected ArrayList<Frame> stack = new ArrayList<Frame>();
+
+	/** The containers of all open arrays and objects, including those of any enclosing encoder, to detect containers which contain themselves */
+	protected Map<Object, Object> open_containers = new IdentityHashMap<Object, Object>();
+
+	/**
+	* The objects being converted by encoder functions, outermost first, to detect conversions which return an object
+	* being converted, or an object of the type of one: an object stays here until the array or object which its
+	* encoder function returned (if any) is closed
+	*/
+	protected ArrayList<PyObject> converting = new ArrayList<PyObject>();
+
+	protected JysonEncoder ( )
+	{
+	}
+
+	/**
+	* Copy the option settings of another encoder
+	*/
+
+	protected void set_options ( JysonEncoder other )
+	{
+		emit_ascii = other.emit_ascii;
+		default_encoder = other.default_encoder;
+		max_depth = other.max_depth;
+		fragment_cache = other.fragment_cache;
+	}
+
+	/**
+	* Register a function to encode the objects of a type (and its subtypes), or unregister it if the function is None.
+	* The function is called with the object, and returns an encodable object in its place.
+	*/
+
+	protected static void register_encoder ( PyObject type, PyObject fn )
+	{
+		synchronized (registered_encoders)
+		{
+			if (fn == Py.None)
+				registered_encoders.remove(type);
+			else
+				registered_encoders.put(type, fn);
+			registry_version++;
+		}
+	}
+
+	protected static PyObject find_registered_encoder ( PyObject type )
+	{
+		synchronized (registered_encoders)
+		{
+			PyObject fn = registered_encoders.get(type);
+			if (fn != null)
+				return fn;
+			for (Map.Entry<PyObject, PyObject> entry : registered_encoders.entrySet())
+				if (Py.isSubClass(type, entry.getKey()))
+					return entry.getValue();
+			return null;
+		}
+	}
+
+	/**
+	* Work out how to encode the objects of the type of the given object
+	*/
+
+	protected Dispatch resolve_dispatch ( PyObject py_obj, PyObject type )
+	{
+		if (py_obj instanceof PyString)
+			return new Dispatch(KIND_STRING, null);
+		// Must test for PyBoolean before PyInteger because former is a subclass of latter.
+		if (py_obj instanceof PyBoolean)
+			return new Dispatch(KIND_BOOLEAN, null);
+		if (py_obj instanceof PyInteger)
+			return new Dispatch(KIND_INTEGER, null);
+		if (py_obj instanceof PyLong)
+			return new Dispatch(KIND_LONG, null);
+		if (py_obj instanceof PyFloat)
+			return new Dispatch(KIND_FLOAT, null);
+		if (py_obj instanceof PyStringMap)
+			return new Dispatch(KIND_STRING_MAP, null);
+		if (py_obj instanceof PyDictionary)
+			return new Dispatch(KIND_DICTIONARY, null);
+		if (py_obj instanceof PySequence)
+			return new Dispatch(KIND_SEQUENCE, null);
+		if (py_obj instanceof PyNone)
+			return new Dispatch(KIND_NONE, null);
+		PyObject json_method = type.__findattr__("__json__");
+		if (json_method != null && json_method.isCallable())
+			return new Dispatch(KIND_JSON_METHOD, null);
+		PyObject fn = find_registered_encoder(type);
+		if (fn != null)
+			return new Dispatch(KIND_REGISTERED, fn);
+		// Such as the lazily decoded JysonLazyObjects and JysonLazyArrays, or the collections decoded with target="java"
+		if (py_obj.__tojava__(java.util.Map.class) != Py.NoConversion)
+			return new Dispatch(KIND_JAVA_MAP, null);
+		if (py_obj.__tojava__(java.util.List.class) != Py.NoConversion)
+			return new Dispatch(KIND_JAVA_LIST, null);
+		return new Dispatch(KIND_OTHER, null);
+	}
+
+	/**
+	* Return how to encode the given object, resolving it from its type the first time the type is seen
+	*/
+
+	protected Dispatch get_dispatch ( PyObject py_obj )
+	{
+		if (dispatch_version != registry_version)
+		{
+			dispatch_table.clear();
+			dispatch_version = registry_version;
+		}
+		PyObject type = py_obj.fastGetClass();
+		Dispatch dispatch = dispatch_table.get(type);
+		if (dispatch == null)
+		{
+			dispatch = resolve_dispatch(py_obj, type);
+			dispatch.immutable = is_immutable_type(py_obj, type);
+			dispatch_table.put(type, dispatch);
+		}
+		return dispatch;
+	}
+
+	/**
+	* Return whether the objects of a type are immutable: strings, numbers, None, tuples (whose elements are
+	* checked separately), and the objects of classes which declare a true <b>__json_immutable__</b> attribute
+	*/
+
+	protected static boolean is_immutable_type ( PyObject py_obj, PyObject type )
+	{
+		if (py_obj instanceof PyString || py_obj instanceof PyInteger || py_obj instanceof PyLong ||
+			py_obj instanceof PyFloat || py_obj instanceof PyNone || py_obj instanceof PyTuple)
+			return true;
+		PyObject declared = type.__findattr__("__json_immutable__");
+		return declared != null && declared.__nonzero__();
+	}
+
+	/**
+	* Return whether the JSON text of an object is worth looking up in the fragment cache
+	*/
+
+	protected static boolean is_cacheable ( PyObject py_obj, Dispatch dispatch )
+	{
+		if (!dispatch.immutable)
+			return false;
+		switch (dispatch.kind)
+		{
+			case KIND_STRING:
+				return py_obj.__len__() >= JysonFragmentCache.MIN_STRING_LENGTH;
+			case KIND_BOOLEAN:
+			case KIND_INTEGER:
+			case KIND_LONG:
+			case KIND_FLOAT:
+			case KIND_NONE:
+				return false;
+			default:
+				return true;
+		}
+	}
+
+	/**
+	* Return whether an object, and every element of it if it is a tuple, is immutable
+	*/
+
+	protected boolean is_deeply_immutable ( PyObject py_obj )
+	{
+		ArrayList<PyObject> pending = new ArrayList<PyObject>();
+		pending.add(py_obj);
+		while (!pending.isEmpty())
+		{
+			PyObject item = pending.remove(pending.size()-1);
+			if (!get_dispatch(item).immutable)
+				return false;
+			if (item instanceof PyTuple)
+			{
+				PyObject[] elements = ((PyTuple)item).getArray();
+				for (int ix = 0 ; ix < elements.length ; ix++)
+					pending.add(elements[ix]);
+			}
+		}
+		return true;
+	}
+
+	/**
+	* Append the cached JSON text of an immutable object, generating and caching it if it is not in the cache.
+	* Objects nested within an object whose text is being generated are not looked up separately.
+	*
+	* @return false if the object was not appended, because it contains mutable elements
+	*/
+
+	protected boolean append_json_fragment ( StringBuilder buf, PyObject py_obj )
+		throws JSONEncodeError
+	{
+		String fragment = fragment_cache.get_fragment(py_obj, this);
+		if (fragment != null)
+		{
+			buf.append(fragment);
+			return true;
+		}
+		if (!is_deeply_immutable(py_obj))
+			return false;
+		int start = buf.length();
+		capturing = true;
+		try
+			{ append_json_repr(buf, py_obj); }
+		finally
+			{ capturing = false; }
+		fragment_cache.put_fragment(py_obj, this, buf.substring(start));
+		return true;
+	}
+
+	private static char[] hexdigit = "0123456789ABCDEF".toCharArray();
+
+	/**
+	* How each Latin-1 character is written in a JSON string: 0 if it is copied as-is, 'u' if it is written as
+	* a unicode escape, or otherwise the character which follows the backslash of its escape. Characters above
+	* Latin-1 are copied as-is, apart from surrogates, and every non-ascii character when emit_ascii is set.
+	*/
+	protected static final char[] UNICODE_ESCAPES = new char[256];
+
+	protected static final char[] ASCII_ESCAPES = new char[256];
+
+	static
+	{
+		for (int ch = 0 ; ch < ' ' ; ch++)
+			UNICODE_ESCAPES[ch] = 'u';
+		UNICODE_ESCAPES['"'] = '"';
+		UNICODE_ESCAPES['\\'] = '\\';
+		UNICODE_ESCAPES['\n'] = 'n';
+		UNICODE_ESCAPES['\t'] = 't';
+		UNICODE_ESCAPES['\b'] = 'b';
+		UNICODE_ESCAPES['\f'] = 'f';
+		UNICODE_ESCAPES['\r'] = 'r';
+		System.arraycopy(UNICODE_ESCAPES, 0, ASCII_ESCAPES, 0, 127);
+		for (int ch = 127 ; ch < ASCII_ESCAPES.length ; ch++)
+			ASCII_ESCAPES[ch] = 'u';
+	}
+
+	/**
+	* Append a string as a (double quoted) JSON string. The runs of characters between those which must be
+	* escaped are appended in bulk, rather than a character at a time.
+	*/
+
+	protected void append_json_string_repr ( StringBuilder buf, String str )
+	{
+		int size = str.length();
+		char[] escapes = emit_ascii ? ASCII_ESCAPES : UNICODE_ESCAPES;
+		int run_start = 0;
+
+		buf.append('"');
+		for (int ix = 0 ; ix < size ; ix++)
+		{
+			char ch = str.charAt(ix);
+			char escape;
+			if (ch < 256)
+			{
+				escape = escapes[ch];
+				if (escape == 0)
+					continue;
+			}
+			else if (emit_ascii || (ch >= Character.MIN_SURROGATE && ch <= Character.MAX_SURROGATE))
+				escape = 'u';
+			else
+				continue;
+			buf.append(str, run_start, ix);
+			run_start = ix + 1;
+			buf.append('\\');
+			buf.append(escape);
+			if (escape == 'u')
+			{
+				/* Map control and non ascii characters to '\\uxxxx' */
+				buf.append(hexdigit[(ch >> 12) & 0xf]);
+				buf.append(hexdigit[(ch >> 8) & 0xf]);
+				buf.append(hexdigit[(ch >> 4) & 0xf]);
+				buf.append(hexdigit[ch & 15]);
+			}
+		}
+		buf.append(str, run_start, size);
+		buf.append('"');
+	}
+
+	protected void append_json_key_repr ( StringBuilder buf, PyObject k )
+		throws JSONEncodeError
+	{
+		if (!(k instanceof PyString))
+			throw new JSONEncodeError(((PyType)k.fastGetClass()).fastGetName()+" objects are not permitted as JSON object keys.");
+		append_json_string_repr(buf, ((PyString)k).toString());
+		buf.append(':');
+	}
+
+	/**
+	* Record that an array or object is being encoded, checking that it is not already being encoded, i.e. that it does not contain itself
+	*/
+
+	protected void begin_container ( Object container, PyObject py_obj )
+		throws JSONEncodeError
+	{
+		if (max_depth > 0 && open_containers.size() >= max_depth)
+			throw new JSONEncodeError("Arrays and objects may not be nested more than "+max_depth+" deep");
+		if (open_containers.containsKey(container))
+			throw new JSONEncodeError("Circular reference: a Python '"+get_type_name(py_obj)+"' object contains itself");
+		open_containers.put(container, container);
+	}
+
+	protected void end_container ( Object container )
+	{
+		open_containers.remove(container);
+	}
+
+	/**
+	* Open an array or object: append its opening bracket, and push the frame from which its elements are encoded
+	*/
+
+	protected Frame push_frame ( StringBuilder buf, PyObject py_obj, Object container, PyList keys, Iterator<?> iterator, boolean is_object, int len )
+		throws JSONEncodeError
+	{
+		begin_container(container, py_obj);
+		buf.append(is_object ? '{' : '[');
+		Frame frame = new Frame(container, keys, iterator, is_object, len);
+		stack.add(frame);
+		return frame;
+	}
+
+	protected void pop_frame ( StringBuilder buf )
+	{
+		Frame frame = discard_frame();
+		buf.append(frame.is_object ? '}' : ']');
+	}
+
+	/**
+	* Remove the innermost frame, without closing its array or object in the JSON text (as after an error)
+	*/
+
+	protected Frame discard_frame ( )
+	{
+		Frame frame = stack.remove(stack.size()-1);
+		end_container(frame.container);
+		for (int ix = 0 ; ix < frame.converted ; ix++)
+			converting.remove(converting.size()-1);
+		return frame;
+	}
+
+	/**
+	* Append the separator and (for objects) the key of the next element of an array or object
+	*
+	* @return The next element, or null if all of the elements have been encoded
+	*/
+
+	protected PyObject next_element ( StringBuilder buf, Frame frame )
+		throws JSONEncodeError
+	{
+		if (frame.iterator != null)
+		{
+			if (!frame.iterator.hasNext())
+				return null;
+			if (frame.ix++ > 0)
+				buf.append(',');
+			Object element = frame.iterator.next();
+			if (!frame.is_object)
+				return Py.java2py(element);
+			java.util.Map.Entry<?, ?> entry = (java.util.Map.Entry<?, ?>)element;
+			Object k = entry.getKey();
+			if (!(k instanceof String || k instanceof PyString))
+				throw new JSONEncodeError(k.getClass().getName()+" objects are not permitted as JSON object keys.");
+			append_json_string_repr(buf, k.toString());
+			buf.append(':');
+			return Py.java2py(entry.getValue());
+		}
+		if (frame.ix == frame.len)
+			return null;
+		if (frame.ix > 0)
+			buf.append(',');
+		PyObject container = (PyObject)frame.container;
+		if (frame.keys == null)
+			return container.__getitem__(frame.ix++);
+		PyObject k = frame.keys.__getitem__(frame.ix++);
+		append_json_key_repr(buf, k);
+		return container.__getitem__(k);
+	}
+
+	protected void append_json_map_repr ( StringBuilder buf, PyObject map, PyList keys )
+		throws JSONEncodeError
+	{
+		push_frame(buf, map, map, keys, null, true, keys.__len__());
+	}
+
+	protected void append_json_string_map_repr ( StringBuilder buf, PyStringMap map )
+		throws JSONEncodeError
+	{
+		append_json_map_repr(buf, map, map.keys());
+	}
+
+	protected void append_json_dictionary_repr ( StringBuilder buf, PyDictionary map )
+		throws JSONEncodeError
+	{
+		append_json_map_repr(buf, map, map.keys());
+	}
+
+	protected void append_json_sequence_repr ( StringBuilder buf, PySequence sequence )
+		throws JSONEncodeError
+	{
+		push_frame(buf, sequence, sequence, null, null, false, sequence.__len__());
+	}
+
+	protected void append_json_java_map_repr ( StringBuilder buf, PyObject py_obj, java.util.Map<?, ?> map )
+		throws JSONEncodeError
+	{
+		push_frame(buf, py_obj, map, null, map.entrySet().iterator(), true, -1);
+	}
+
+	protected void append_json_java_list_repr ( StringBuilder buf, PyObject py_obj, java.util.List<?> list )
+		throws JSONEncodeError
+	{
+		push_frame(buf, py_obj, list, null, list.iterator(), false, -1);
+	}
+
+	/**
+	* Append the JSON representation of the object returned by a registered or default encoder function in place of another object
+	*/
+
+	protected void append_json_converted_repr ( StringBuilder buf, PyObject py_obj, PyObject converted )
+		throws JSONEncodeError
+	{
+		PyObject converted_type = converted.fastGetClass();
+		if (converted_type == py_obj.fastGetClass())
+			throw new JSONEncodeError("The encoder function for Python '"+get_type_name(py_obj)
+				+"' objects returned another '"+get_type_name(converted)+"' object");
+		for (int ix = 0 ; ix < converting.size() ; ix++)
+		{
+			PyObject source = converting.get(ix);
+			if (source == py_obj)
+				throw new JSONEncodeError("Circular reference: the encoder function for a Python '"+get_type_name(py_obj)
+					+"' object returned a value which contains it");
+			if (source.fastGetClass() == converted_type)
+				throw new JSONEncodeError("The encoder function for Python '"+get_type_name(py_obj)
+					+"' objects returned another '"+get_type_name(converted)+"' object");
+		}
+		converting.add(py_obj);
+		int depth = stack.size();
+		boolean opened = false;
+		try
+		{
+			append_json_value(buf, converted);
+			opened = stack.size() > depth;
+		}
+		finally
+		{
+			// The object stays on the path until the array or object which it was converted to is closed
+			if (opened)
+				stack.get(stack.size()-1).converted++;
+			else
+				converting.remove(converting.size()-1);
+		}
+	}
+
+	protected void append_json_other_repr ( StringBuilder buf, PyObject py_obj )
+		throws JSONEncodeError
+	{
+		// A __json__ method may have been set on the object itself, rather than its class
+		PyObject json_method = py_obj.__findattr__("__json__");
+		if (json_method != null && json_method.isCallable())
+			buf.append(json_method.__call__().toString());
+		else if (default_encoder != null)
+			append_json_converted_repr(buf, py_obj, default_encoder.__call__(py_obj));
+		else
+			throw new JSONEncodeError("Python '"+get_type_name(py_obj)
+				+"' object '"+py_obj.__repr__()+"' is not encodable in JSON");
+	}
+
+	protected static String get_type_name ( PyObject py_obj )
+	{
+		PyObject type = py_obj.fastGetClass();
+		if (type instanceof PyType)
+			return ((PyType)type).fastGetName();
+		return type.__findattr__("__name__").toString();
+	}
+
+	/**
+	* Append the JSON representation of the given object: if it is an array or object, it is only opened, and
+	* its elements are appended by append_json_repr()
+	*/
+
+	protected void append_json_value ( StringBuilder buf, PyObject py_obj )
+		throws JSONEncodeError
+	{
+		Dispatch dispatch = get_dispatch(py_obj);
+		// The depth of a cached fragment is not known, so fragments are not used when the depth is limited
+		if (fragment_cache != null && !capturing && max_depth == 0 && is_cacheable(py_obj, dispatch) &&
+			append_json_fragment(buf, py_obj))
+			return;
+		switch (dispatch.kind)
+		{
+			case KIND_STRING:
+				append_json_string_repr(buf, ((PyString)py_obj).toString());
+				break;
+			case KIND_BOOLEAN:
+				buf.append(((PyBoolean)py_obj).getBooleanValue() ? "true" : "false");
+				break;
+			case KIND_INTEGER:
+				buf.append(((PyInteger)py_obj).getValue());
+				break;
+			case KIND_LONG:
+				buf.append(((PyLong)py_obj).getValue().toString());
+				break;
+			case KIND_FLOAT:
+				buf.append(((PyFloat)py_obj).getValue());
+				break;
+			case KIND_STRING_MAP:
+				append_json_string_map_repr(buf, (PyStringMap)py_obj);
+				break;
+			case KIND_DICTIONARY:
+				append_json_dictionary_repr(buf, (PyDictionary)py_obj);
+				break;
+			case KIND_SEQUENCE:
+				append_json_sequence_repr(buf, (PySequence)py_obj);
+				break;
+			case KIND_NONE:
+				buf.append("null");
+				break;
+			case KIND_JSON_METHOD:
+				buf.append(py_obj.invoke("__json__").toString());
+				break;
+			case KIND_REGISTERED:
+				append_json_converted_repr(buf, py_obj, dispatch.encoder_fn.__call__(py_obj));
+				break;
+			case KIND_JAVA_MAP:
+				append_json_java_map_repr(buf, py_obj, (java.util.Map<?, ?>)py_obj.__tojava__(java.util.Map.class));
+				break;
+			case KIND_JAVA_LIST:
+				append_json_java_list_repr(buf, py_obj, (java.util.List<?>)py_obj.__tojava__(java.util.List.class));
+				break;
+			default:
+				append_json_other_repr(buf, py_obj);
+		}
+	}
+
+	/**
+	* Append the JSON representation of the given object (hierarchy). Nested arrays and objects are encoded from an
+	* explicit stack of frames, rather than by recursion, so that the depth of nesting is not limited by the size of
+	* the thread's stack. An array or object which contains itself raises a JSONEncodeError.
+	*/
+
+	public void append_json_repr ( StringBuilder buf, PyObject py_obj )
+		throws JSONEncodeError
+	{
+		int base_depth = stack.size();
+		try
+		{
+			append_json_value(buf, py_obj);
+			while (stack.size() > base_depth)
+			{
+				PyObject element = next_element(buf, stack.get(stack.size()-1));
+				if (element == null)
+					pop_frame(buf);
+				else
+					append_json_value(buf, element);
+			}
+		}
+		finally
+		{
+			// Only after an error: discard the frames of the arrays and objects which were not finished
+			while (stack.size() > base_depth)
+				discard_frame();
+		}
+	}
+
+	public String json_repr ( PyObject py_obj )
+		throws JSONEncodeError
+	{
+		StringBuilder buf = new StringBuilder();
+		append_json_repr(buf, py_obj);
+		return buf.toString();
+	}
+
+}
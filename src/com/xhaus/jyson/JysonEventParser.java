@@ -0,0 +1,280 @@
+/*
+ * Copyright 2009-2012 Alan Kennedy
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License"); 
+ * you may not use this file except in compliance with the License. 
+ * You may obtain a copy of the License at 
+ *
+ *    http://www.apache.org/licenses/LICENSE-2.0 
+ *
+ * Unless required by applicable law or agreed to in writing, software 
+ * distributed under the License is distributed on an "AS IS" BASIS, 
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+ * See the License for the specific language governing permissions and 
+ * limitations under the License. 
+ *
+ */
+
+package com.xhaus.jyson;
+
+import java.util.ArrayList;
+
+import org.python.core.*;
+
+/**
+ * A Jython iterator which parses JSON text into a stream of <b>(event, value, path)</b> tuples,
+ * without building the corresponding Jython object hierarchy.
+ * <br/><br/>
+ * The events are
+ * <ul>
+ * <li><b>start_map</b>, <b>end_map</b>, <b>start_array</b>, <b>end_array</b>: value is None</li>
+ * <li><b>map_key</b>: value is the key</li>
+ * <li><b>string</b>, <b>number</b>, <b>boolean</b>, <b>null</b>: value is the decoded value</li>
+ * </ul>
+ * The path is a tuple of the object keys and array indices leading to the value the event refers to;
+ * for <b>map_key</b> events, that is the object containing the key.
+ * <br/><br/>
+ * Only the arrays and objects which are currently open are held in memory, so documents of any size
+ * can be processed, if read from a file.
+ */
+
+public class JysonEventParser extends PyIterator
+
+{
+
+	public static final PyString START_MAP = Py.newString("start_map");
+	public static final PyString MAP_KEY = Py.newString("map_key");
+	public static final PyString END_MAP = Py.newString("end_map");
+	public static final PyString START_ARRAY = Py.newString("start_array");
+	public static final PyString END_ARRAY = Py.newString("end_array");
+	public static final PyString STRING = Py.newString("string");
+	public static final PyString NUMBER = Py.newString("number");
+	public static final PyString BOOLEAN = Py.newString("boolean");
+	public static final PyString NULL = Py.newString("null");
+
+	// The parse states of an open array or object
+	protected static final int EXPECT_FIRST = 0;
+	protected static final int EXPECT_NEXT = 1;
+	protected static final int EXPECT_VALUE = 2;
+	protected static final int EXPECT_COMMA = 3;
+
+	/** An array or object which has been started, but not yet ended */
+	protected static class Frame
+	{
+		boolean is_map;
+		int state;
+		PyObject key;
+		int index;
+
+		Frame(boolean m)
+		{
+			is_map = m;
+			state = EXPECT_FIRST;
+			key = Py.None;
+			index = 0;
+		}
+
+		PyObject position()
+		{
+			return is_map ? key : Py.newInteger(index);
+		}
+	}
+
+	protected JysonDecoder decoder;
+
+	protected ArrayList<Frame> stack;
+
+	protected boolean started;
+
+	protected boolean finished;
+
+	protected JysonEventParser(JysonDecoder d)
+	{
+		decoder = d;
+		stack = new ArrayList<Frame>();
+		started = false;
+		finished = false;
+	}
+
+	protected PyTuple path ( int depth )
+	{
+		PyObject[] positions = new PyObject[depth];
+		for (int ix = 0 ; ix < depth ; ix++)
+			positions[ix] = stack.get(ix).position();
+		return new PyTuple(positions);
+	}
+
+	protected PyTuple event ( PyString name, PyObject value, PyTuple path )
+	{
+		return new PyTuple(new PyObject[] {name, value, path});
+	}
+
+	protected PyTuple read_value ( )
+		throws JSONDecodeError
+	{
+		char c = decoder.get_data_char();
+		PyTuple path = path(stack.size());
+		if ((c == '{' || c == '[') && decoder.max_depth > 0 && stack.size() >= decoder.max_depth)
+			throw decoder.decode_exception("Arrays and objects may not be nested more than "+decoder.max_depth+" deep");
+		switch (c)
+		{
+			case '{':
+				stack.add(new Frame(true));
+				return event(START_MAP, Py.None, path);
+			case '[':
+				stack.add(new Frame(false));
+				return event(START_ARRAY, Py.None, path);
+			case 0:
+				throw decoder.decode_exception("No value specified");
+		}
+		if (stack.isEmpty() && !decoder.accept_any_primary_datum)
+			throw decoder.decode_exception("JSON expressions must strictly be either objects or lists");
+		decoder.push();
+		PyObject value = (PyObject)decoder.get_object();
+		if (value instanceof PyString)
+			return event(STRING, value, path);
+		if (value instanceof PyBoolean)
+			return event(BOOLEAN, value, path);
+		if (value == Py.None)
+			return event(NULL, value, path);
+		return event(NUMBER, value, path);
+	}
+
+	protected PyTuple read_map_event ( Frame frame )
+		throws JSONDecodeError
+	{
+		char c;
+		String key;
+		while (true)
+		{
+			switch (frame.state)
+			{
+				case EXPECT_FIRST:
+				case EXPECT_NEXT:
+					c = decoder.get_data_char();
+					switch (c)
+					{
+						case 0:
+							throw decoder.decode_exception("A JSON object must end with '}'");
+						case '}':
+							if (frame.state == EXPECT_NEXT && !decoder.accept_dangling_commas)
+								throw decoder.decode_exception("Commas after last entry of object not accepted");
+							stack.remove(stack.size()-1);
+							return event(END_MAP, Py.None, path(stack.size()));
+						case '\'':
+							if (decoder.accept_single_quoted_strings)
+								key = decoder.get_string('\'');
+							else
+								throw decoder.decode_exception("Single quoted strings are not acceptable in JSON");
+							break;
+						case '"':
+							key = decoder.get_string('"');
+							break;
+						default:
+							throw decoder.decode_exception("Only strings are acceptable as object keys in JSON");
+					}
+					if (decoder.get_data_char() != ':')
+						{ throw decoder.decode_exception("Object keys and values must be separated by ':'"); }
+					frame.key = (PyObject)decoder.decode_key(key);
+					frame.state = EXPECT_VALUE;
+					return event(MAP_KEY, frame.key, path(stack.size()-1));
+				case EXPECT_VALUE:
+					frame.state = EXPECT_COMMA;
+					return read_value();
+				default:
+					switch (decoder.get_data_char())
+					{
+						case ',':
+							frame.state = EXPECT_NEXT;
+							break;
+						case '}':
+							stack.remove(stack.size()-1);
+							return event(END_MAP, Py.None, path(stack.size()));
+						default:
+							throw decoder.decode_exception("Expected a ',' or '}'");
+					}
+			}
+		}
+	}
+
+	protected PyTuple read_array_event ( Frame frame )
+		throws JSONDecodeError
+	{
+		while (true)
+		{
+			switch (frame.state)
+			{
+				case EXPECT_FIRST:
+				case EXPECT_NEXT:
+					switch (decoder.get_data_char())
+					{
+						case 0:
+							throw decoder.decode_exception("Ran out of characters reading array");
+						case ',':
+							throw decoder.decode_exception("Arrays may not contain consecutive or dangling commas");
+						case ']':
+							if (frame.state == EXPECT_NEXT && !decoder.accept_dangling_commas)
+								throw decoder.decode_exception("Commas after last element of array not accepted");
+							stack.remove(stack.size()-1);
+							return event(END_ARRAY, Py.None, path(stack.size()));
+					}
+					decoder.push();
+					if (frame.state == EXPECT_NEXT)
+						frame.index++;
+					frame.state = EXPECT_COMMA;
+					return read_value();
+				default:
+					switch (decoder.get_data_char())
+					{
+						case 0:
+							throw decoder.decode_exception("Ran out of characters reading array");
+						case ',':
+							frame.state = EXPECT_NEXT;
+							break;
+						case ']':
+							stack.remove(stack.size()-1);
+							return event(END_ARRAY, Py.None, path(stack.size()));
+						default:
+							throw decoder.decode_exception("Array elements must be followed by ',' or ']'");
+					}
+			}
+		}
+	}
+
+	/**
+	* Return the next event tuple, or null when the end of the JSON text has been reached
+	*/
+
+	public PyTuple next_event ( )
+		throws JSONDecodeError
+	{
+		if (finished)
+			return null;
+		if (stack.isEmpty())
+		{
+			if (!started)
+			{
+				started = true;
+				return read_value();
+			}
+			finished = true;
+			char ch = decoder.get_data_char();
+			if (ch != 0 && !decoder.accept_junk_after_data)
+				throw decoder.decode_exception("Only whitespace is permitted after the primary datum: not '"+ch+"'");
+			return null;
+		}
+		Frame frame = stack.get(stack.size()-1);
+		if (frame.is_map)
+			return read_map_event(frame);
+		return read_array_event(frame);
+	}
+
+	public PyObject __iternext__ ( )
+	{
+		try
+			{ return next_event(); }
+		catch (JSONDecodeError jde)
+			{ throw Py.JavaError(jde); }
+	}
+
+}
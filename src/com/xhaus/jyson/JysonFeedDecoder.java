@@ -0,0 +1,355 @@
+/*
+ * Copyright 2009-2012 Alan Kennedy
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License"); 
+ * you may not use this file except in compliance with the License. 
+ * You may obtain a copy of the License at 
+ *
+ *    http://www.apache.org/licenses/LICENSE-2.0 
+ *
+ * Unless required by applicable law or agreed to in writing, software 
+ * distributed under the License is distributed on an "AS IS" BASIS, 
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+ * See the License for the specific language governing permissions and 
+ * limitations under the License. 
+ *
+ */
+
+package com.xhaus.jyson;
+
+import java.nio.ByteBuffer;
+import java.nio.CharBuffer;
+import java.nio.charset.CharsetDecoder;
+import java.nio.charset.CoderResult;
+
+import org.python.core.*;
+
+/**
+ * Decodes a stream of JSON texts which arrives in chunks of arbitrary size, such as those read from a
+ * non-blocking socket. Each chunk is passed to <b>feed()</b>, which returns the top level values completed
+ * by it, and <b>close()</b> is called at the end of the stream.
+ * <br/><br/>
+ * The chunks are scanned as they arrive, keeping the state of the scan (the depth of nesting, and whether
+ * it is inside a string, an escape or a comment) between chunks, so that a chunk may end anywhere: in the
+ * middle of a string, an escape or a number. Chunks of bytes are decoded as UTF-8, and may also end in the
+ * middle of a character.
+ * <br/><br/>
+ * This is not an incremental parser: the scan only finds where each top level value ends. The whole text of
+ * the value which is not yet complete is buffered, and when it is complete it is copied out and parsed from the
+ * start by a JysonDecoder, so the text of every value is scanned twice. The memory used is bounded by the size
+ * of the largest single value, rather than of the whole stream, and each value is returned as soon as its last
+ * chunk arrives, but a large value is neither parsed nor released until all of it has arrived.
+ * <br/><br/>
+ * Top level values may be separated by whitespace, or not separated at all, apart from numbers and constants,
+ * which are only complete when they are followed by whitespace, another value, or the end of the stream.
+ * After a JSONDecodeError, the stream cannot be decoded any further.
+ */
+
+public class JysonFeedDecoder
+
+{
+
+	protected JysonDecoder decoder;
+
+	/** The text of the value which is not yet complete, and any text after it which has not yet been scanned */
+	protected StringBuilder pending = new StringBuilder();
+
+	/** The number of characters of the stream which were discarded before the pending text */
+	protected long discarded = 0;
+
+	/** The index in the pending text of the next character to be scanned */
+	protected int scan_pos = 0;
+
+	/** The index in the pending text of the start of the current top level value, or -1 if it is between values */
+	protected int value_start = -1;
+
+	protected int depth = 0;
+
+	/** The quote character of the string being scanned, or 0 if it is not in a string */
+	protected char quote = 0;
+
+	protected boolean escaped = false;
+
+	/** The kind of comment being scanned, or NO_COMMENT if it is not in a comment */
+	protected int comment = NO_COMMENT;
+
+	protected static final int NO_COMMENT = 0;
+	protected static final int LINE_COMMENT = 1;
+	protected static final int BLOCK_COMMENT = 2;
+
+	/** True after a '/' which may start a comment, until the character after it is scanned */
+	protected boolean slash = false;
+
+	/** True after a '*' in a block comment, which may end it */
+	protected boolean star = false;
+
+	/** True while scanning a top level number or constant, which is completed by the character after it */
+	protected boolean in_scalar = false;
+
+	protected boolean closed = false;
+
+	/** Decodes chunks of bytes, keeping any incomplete UTF-8 sequence at the end of a chunk for the next one */
+	protected CharsetDecoder utf8 = null;
+
+	protected ByteBuffer leftover = null;
+
+	protected JysonFeedDecoder(JysonDecoder d)
+	{
+		decoder = d;
+	}
+
+	protected static boolean is_whitespace ( char c )
+	{
+		// The same rule as JysonDecoder.get_data_char()
+		return c <= ' ';
+	}
+
+	/**
+	* Return whether a character ends a top level number or constant
+	*/
+
+	protected boolean ends_scalar ( char c )
+	{
+		switch (c)
+		{
+			case '[':
+			case ']':
+			case '{':
+			case '}':
+			case '"':
+			case ',':
+			case '/':
+				return true;
+			case '\'':
+				return decoder.accept_single_quoted_strings;
+			case '#':
+				return decoder.accept_shell_style_comments;
+			default:
+				return is_whitespace(c);
+		}
+	}
+
+	protected JSONDecodeError feed_exception ( String message )
+	{
+		closed = true;
+		return new JSONDecodeError(message+": offset="+(discarded+scan_pos));
+	}
+
+	/**
+	* Decode the text of the current top level value, ending at the given index in the pending text, and append it to the results
+	*/
+
+	protected void complete_value ( int end, PyList results )
+		throws JSONDecodeError
+	{
+		long offset = discarded+value_start;
+		decoder.reset(pending.substring(value_start, end));
+		value_start = -1;
+		try
+			{ results.append(Py.java2py(decoder.get_top_level_object())); }
+		catch (JSONDecodeError jde)
+		{
+			closed = true;
+			throw new JSONDecodeError(jde.getMessage()+": offset="+offset);
+		}
+		finally
+			{ decoder.reset(null); }
+	}
+
+	/**
+	* Scan the pending text from where the last scan stopped, decoding every top level value which it completes
+	*/
+
+	protected void scan ( PyList results )
+		throws JSONDecodeError
+	{
+		for ( ; scan_pos < pending.length() ; scan_pos++)
+		{
+			char c = pending.charAt(scan_pos);
+			if (comment == LINE_COMMENT)
+			{
+				if (c == '\n' || c == '\r')
+					comment = NO_COMMENT;
+				continue;
+			}
+			if (comment == BLOCK_COMMENT)
+			{
+				if (star && c == '/')
+					comment = NO_COMMENT;
+				star = c == '*';
+				continue;
+			}
+			if (quote != 0)
+			{
+				if (escaped)
+					escaped = false;
+				else if (c == '\\')
+					escaped = true;
+				else if (c == quote)
+				{
+					quote = 0;
+					if (depth == 0)
+						complete_value(scan_pos+1, results);
+				}
+				continue;
+			}
+			if (slash)
+			{
+				slash = false;
+				if (c == '/' || c == '*')
+				{
+					comment = c == '/' ? LINE_COMMENT : BLOCK_COMMENT;
+					star = false;
+					continue;
+				}
+				// The '/' did not start a comment, so the decoder will reject it as the start of a value
+				if (depth == 0)
+				{
+					value_start = scan_pos-1;
+					in_scalar = true;
+				}
+			}
+			if (in_scalar)
+			{
+				if (!ends_scalar(c))
+					continue;
+				in_scalar = false;
+				complete_value(scan_pos, results);
+			}
+			if (is_whitespace(c))
+				continue;
+			switch (c)
+			{
+				case '/':
+					slash = true;
+					break;
+				case '#':
+					if (!decoder.accept_shell_style_comments)
+						{ throw feed_exception("Shell style comments are not accepted"); }
+					comment = LINE_COMMENT;
+					break;
+				case '\'':
+					if (!decoder.accept_single_quoted_strings)
+						{ throw feed_exception("Single quoted strings are not accepted"); }
+					// else let it flow into the '"' case
+				case '"':
+					if (depth == 0)
+						value_start = scan_pos;
+					quote = c;
+					break;
+				case '[':
+				case '{':
+					if (depth == 0)
+						value_start = scan_pos;
+					depth++;
+					break;
+				case ']':
+				case '}':
+					if (depth == 0)
+						{ throw feed_exception("Unexpected '"+c+"' outside of an array or object"); }
+					if (--depth == 0)
+						complete_value(scan_pos+1, results);
+					break;
+				default:
+					if (depth == 0)
+					{
+						value_start = scan_pos;
+						in_scalar = true;
+					}
+			}
+		}
+		// Discard the text before the current value, or all of it between values, apart from a '/' which may start one
+		int keep_from = value_start >= 0 ? value_start : slash && depth == 0 ? scan_pos-1 : scan_pos;
+		pending.delete(0, keep_from);
+		discarded += keep_from;
+		scan_pos -= keep_from;
+		if (value_start >= 0)
+			value_start = 0;
+	}
+
+	/**
+	* Decode a chunk of UTF-8 bytes, keeping any incomplete sequence at its end for the next chunk
+	*/
+
+	protected void append_bytes ( ByteBuffer bytes )
+		throws JSONDecodeError
+	{
+		if (utf8 == null)
+			utf8 = java.nio.charset.Charset.forName("UTF-8").newDecoder();
+		if (leftover != null)
+		{
+			ByteBuffer joined = ByteBuffer.allocate(leftover.remaining()+bytes.remaining());
+			joined.put(leftover).put(bytes).flip();
+			bytes = joined;
+		}
+		CharBuffer chars = CharBuffer.allocate(bytes.remaining()+1);
+		CoderResult result = utf8.decode(bytes, chars, false);
+		if (result.isError())
+			{ throw feed_exception("Invalid UTF-8 sequence"); }
+		chars.flip();
+		pending.append(chars);
+		// Copy the incomplete sequence, rather than keeping a view of the caller's bytes
+		leftover = null;
+		if (bytes.hasRemaining())
+		{
+			leftover = ByteBuffer.allocate(bytes.remaining());
+			leftover.put(bytes).flip();
+		}
+	}
+
+	/**
+	* Decode the next chunk of the stream
+	*
+	* @param chunk A string of JSON text, or a byte[] or ByteBuffer of UTF-8 encoded JSON text
+	* @return A list of the top level values completed by the chunk, in order, which may be empty
+	* @throws JSONDecodeError If an error occurred while decoding any of the values
+	*/
+
+	public PyList feed ( PyObject chunk )
+		throws JSONDecodeError
+	{
+		if (closed)
+			throw Py.ValueError("The decoder has been closed, or failed");
+		if (chunk instanceof PyString)
+			pending.append(chunk.toString());
+		else
+			append_bytes(JysonCodec.as_byte_buffer(chunk));
+		PyList results = new PyList();
+		scan(results);
+		return results;
+	}
+
+	/**
+	* End the stream, decoding the last value if it is a number or constant
+	*
+	* @return A list of the top level values completed by the end of the stream, which may be empty
+	* @throws JSONDecodeError If the stream ended in the middle of a value
+	*/
+
+	public PyList close ( )
+		throws JSONDecodeError
+	{
+		if (closed)
+			throw Py.ValueError("The decoder has been closed, or failed");
+		PyList results = new PyList();
+		if (leftover != null)
+			{ throw feed_exception("Ran out of bytes reading UTF-8 sequence"); }
+		if (comment == BLOCK_COMMENT)
+			{ throw feed_exception("Unclosed comment."); }
+		if (slash && depth == 0)
+		{
+			value_start = scan_pos-1;
+			in_scalar = true;
+		}
+		if (in_scalar)
+		{
+			in_scalar = false;
+			complete_value(scan_pos, results);
+		}
+		else if (value_start >= 0)
+			{ throw feed_exception("Ran out of characters reading "+(quote != 0 ? "string" : "array or object")); }
+		closed = true;
+		return results;
+	}
+
+}
@@ -0,0 +1,117 @@
+/*
+ * Copyright 2009-2012 Alan Kennedy
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License"); 
+ * you may not use this file except in compliance with the License. 
+ * You may obtain a copy of the License at 
+ *
+ *    http://www.apache.org/licenses/LICENSE-2.0 
+ *
+ * Unless required by applicable law or agreed to in writing, software 
+ * distributed under the License is distributed on an "AS IS" BASIS, 
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+ * See the License for the specific language governing permissions and 
+ * limitations under the License. 
+ *
+ */
+
+package com.xhaus.jyson;
+
+import java.io.IOException;
+import java.io.Reader;
+import java.nio.ByteBuffer;
+import java.nio.CharBuffer;
+import java.nio.charset.CharsetDecoder;
+import java.nio.charset.CoderResult;
+
+import org.python.core.*;
+
+/**
+ * A java.io.Reader which reads its characters from a Jython file-like object, i.e. any object with a <b>read(size)</b> method.
+ *
+ * Unicode strings returned by <b>read()</b> are used as they are. Byte strings, as returned by files opened in binary
+ * mode, are decoded as UTF-8, as for a java.io.InputStream, keeping any incomplete sequence at the end of one for the next.
+ */
+
+public class JysonFileReader extends Reader
+
+{
+
+	protected PyObject file;
+
+	protected String pending;
+
+	protected int pending_pos;
+
+	protected CharsetDecoder utf8 = null;
+
+	/** The bytes of an incomplete UTF-8 sequence at the end of the last byte string read */
+	protected ByteBuffer leftover = null;
+
+	public JysonFileReader(PyObject f)
+	{
+		file = f;
+		pending = "";
+		pending_pos = 0;
+	}
+
+	public int read ( char[] cbuf, int off, int len )
+		throws IOException
+	{
+		if (len == 0)
+			return 0;
+		while (pending_pos == pending.length())
+		{
+			PyObject data;
+			try
+				{ data = file.invoke("read", Py.newInteger(len)); }
+			catch (PyException px)
+				{ throw new IOException(px.toString()); }
+			pending_pos = 0;
+			if (data instanceof PyUnicode)
+				pending = data.toString();
+			else
+				pending = decode_utf8(data.toString());
+			if (data.__len__() == 0)
+			{
+				if (leftover != null)
+					throw new IOException("Ran out of bytes reading UTF-8 sequence");
+				return -1;
+			}
+		}
+		int n = Math.min(len, pending.length() - pending_pos);
+		pending.getChars(pending_pos, pending_pos+n, cbuf, off);
+		pending_pos += n;
+		return n;
+	}
+
+	/**
+	* Decode a byte string (one byte per character) as UTF-8, keeping any incomplete sequence at its end for the next one
+	*/
+
+	protected String decode_utf8 ( String data )
+		throws IOException
+	{
+		if (utf8 == null)
+			utf8 = java.nio.charset.Charset.forName("UTF-8").newDecoder();
+		ByteBuffer bytes = ByteBuffer.allocate((leftover == null ? 0 : leftover.remaining())+data.length());
+		if (leftover != null)
+			bytes.put(leftover);
+		for (int ix = 0 ; ix < data.length() ; ix++)
+			bytes.put((byte)data.charAt(ix));
+		bytes.flip();
+		CharBuffer chars = CharBuffer.allocate(bytes.remaining()+1);
+		CoderResult result = utf8.decode(bytes, chars, false);
+		if (result.isError())
+			throw new IOException("Invalid UTF-8 sequence");
+		leftover = bytes.hasRemaining() ? bytes : null;
+		chars.flip();
+		return chars.toString();
+	}
+
+	public void close ( )
+	{
+		// The file belongs to the caller, who is responsible for closing it
+	}
+
+}
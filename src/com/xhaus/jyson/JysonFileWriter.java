@@ -0,0 +1,72 @@
+/*
+ * Copyright 2009-2012 Alan Kennedy
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License"); 
+ * you may not use this file except in compliance with the License. 
+ * You may obtain a copy of the License at 
+ *
+ *    http://www.apache.org/licenses/LICENSE-2.0 
+ *
+ * Unless required by applicable law or agreed to in writing, software 
+ * distributed under the License is distributed on an "AS IS" BASIS, 
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+ * See the License for the specific language governing permissions and 
+ * limitations under the License. 
+ *
+ */
+
+package com.xhaus.jyson;
+
+import java.io.IOException;
+import java.io.Writer;
+
+import org.python.core.*;
+
+/**
+ * A java.io.Writer which writes its characters to a Jython file-like object, i.e. any object with a <b>write(text)</b> method.
+ */
+
+public class JysonFileWriter extends Writer
+
+{
+
+	protected PyObject file;
+
+	public JysonFileWriter(PyObject f)
+	{
+		file = f;
+	}
+
+	public void write ( char[] cbuf, int off, int len )
+		throws IOException
+	{
+		write(new String(cbuf, off, len));
+	}
+
+	public void write ( String str )
+		throws IOException
+	{
+		try
+			{ file.invoke("write", new PyUnicode(str)); }
+		catch (PyException px)
+			{ throw new IOException(px.toString()); }
+	}
+
+	public void flush ( )
+		throws IOException
+	{
+		PyObject flush_method = file.__findattr__("flush");
+		if (flush_method == null)
+			return;
+		try
+			{ flush_method.__call__(); }
+		catch (PyException px)
+			{ throw new IOException(px.toString()); }
+	}
+
+	public void close ( )
+	{
+		// The file belongs to the caller, who is responsible for closing it
+	}
+
+}
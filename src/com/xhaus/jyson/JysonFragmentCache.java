@@ -0,0 +1,158 @@
+/*
+ * Copyright 2009-2012 Alan Kennedy
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License"); 
+ * you may not use this file except in compliance with the License. 
+ * You may obtain a copy of the License at 
+ *
+ *    http://www.apache.org/licenses/LICENSE-2.0 
+ *
+ * Unless required by applicable law or agreed to in writing, software 
+ * distributed under the License is distributed on an "AS IS" BASIS, 
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+ * See the License for the specific language governing permissions and 
+ * limitations under the License. 
+ *
+ */
+
+package com.xhaus.jyson;
+
+import java.util.LinkedHashMap;
+import java.util.Map;
+
+import org.python.core.*;
+
+/**
+ * A bounded cache of the JSON text of immutable objects, keyed by the identity of the objects, so that an
+ * encoder which meets the same object again appends its cached text rather than encoding it again.
+ * When the cache is full, the least recently used fragment is evicted.
+ * <br/><br/>
+ * Only immutable objects are cached: tuples whose elements are all immutable, long strings, and the objects
+ * of classes which declare themselves immutable with a true <b>__json_immutable__</b> attribute. Each fragment
+ * holds a reference to its object, so an object's identity cannot be reused by another object while it is cached.
+ * The cache is shared by the encoders of every thread using a codec instance, so all access is synchronized.
+ */
+
+public class JysonFragmentCache
+
+{
+
+	/** The shortest string for which a fragment is cached: shorter strings are quicker to encode than to look up */
+	public static final int MIN_STRING_LENGTH = 64;
+
+	/** The JSON text of one object, and the encoder options with which it was generated */
+	protected static class Fragment
+	{
+		PyObject py_obj;
+		String text;
+		boolean emit_ascii;
+		PyObject default_encoder;
+		int registry_version;
+
+		Fragment(PyObject o, String t, JysonEncoder encoder)
+		{
+			py_obj = o;
+			text = t;
+			emit_ascii = encoder.emit_ascii;
+			default_encoder = encoder.default_encoder;
+			registry_version = JysonEncoder.registry_version;
+		}
+
+		boolean matches ( JysonEncoder encoder )
+		{
+			return emit_ascii == encoder.emit_ascii && default_encoder == encoder.default_encoder
+				&& registry_version == JysonEncoder.registry_version;
+		}
+	}
+
+	/** Compares the objects by identity, rather than by (Jython) equality */
+	protected static class IdentityKey
+	{
+		PyObject py_obj;
+
+		IdentityKey(PyObject o)
+		{
+			py_obj = o;
+		}
+
+		public int hashCode ( )
+		{
+			return System.identityHashCode(py_obj);
+		}
+
+		public boolean equals ( Object other )
+		{
+			return other instanceof IdentityKey && ((IdentityKey)other).py_obj == py_obj;
+		}
+	}
+
+	protected int capacity;
+
+	protected long hits = 0;
+
+	protected long misses = 0;
+
+	protected long evictions = 0;
+
+	protected Map<IdentityKey, Fragment> fragments;
+
+	public JysonFragmentCache(int c)
+	{
+		capacity = c;
+		fragments = new LinkedHashMap<IdentityKey, Fragment>(16, 0.75f, true)
+		{
+			protected boolean removeEldestEntry ( Map.Entry<IdentityKey, Fragment> eldest )
+			{
+				if (size() <= capacity)
+					return false;
+				evictions++;
+				return true;
+			}
+		};
+	}
+
+	/**
+	* Return the cached JSON text of the given object, if it was generated with the options of the given encoder, or null
+	*/
+
+	public synchronized String get_fragment ( PyObject py_obj, JysonEncoder encoder )
+	{
+		Fragment fragment = fragments.get(new IdentityKey(py_obj));
+		if (fragment == null || !fragment.matches(encoder))
+		{
+			misses++;
+			return null;
+		}
+		hits++;
+		return fragment.text;
+	}
+
+	public synchronized void put_fragment ( PyObject py_obj, JysonEncoder encoder, String text )
+	{
+		fragments.put(new IdentityKey(py_obj), new Fragment(py_obj, text, encoder));
+	}
+
+	public synchronized void clear ( )
+	{
+		fragments.clear();
+	}
+
+	/**
+	* Return a dictionary of the number of hits, misses and evictions, and the number and total length of the cached fragments
+	*/
+
+	public synchronized PyDictionary stats ( )
+	{
+		long length = 0;
+		for (Fragment fragment : fragments.values())
+			length += fragment.text.length();
+		PyDictionary result = new PyDictionary();
+		result.__setitem__("hits", Py.newLong(hits));
+		result.__setitem__("misses", Py.newLong(misses));
+		result.__setitem__("evictions", Py.newLong(evictions));
+		result.__setitem__("size", Py.newInteger(fragments.size()));
+		result.__setitem__("length", Py.newLong(length));
+		return result;
+	}
+
+}
@@ -0,0 +1,421 @@
+/*
+ * Copyright 2009-2012 Alan Kennedy
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License"); 
+ * you may not use this file except in compliance with the License. 
+ * You may obtain a copy of the License at 
+ *
+ *    http://www.apache.org/licenses/LICENSE-2.0 
+ *
+ * Unless required by applicable law or agreed to in writing, software 
+ * distributed under the License is distributed on an "AS IS" BASIS, 
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+ * See the License for the specific language governing permissions and 
+ * limitations under the License. 
+ *
+ */
+
+package com.xhaus.jyson;
+
+import java.nio.ByteBuffer;
+import java.nio.ByteOrder;
+import java.nio.charset.Charset;
+
+/**
+ * A JysonByteDecoder which decodes UTF-8 encoded JSON text in two stages, after the manner of simdjson.
+ * <br/><br/>
+ * Stage 1 reads the text eight bytes at a time, as a single long, and uses SWAR (SIMD within a register)
+ * arithmetic to find the bytes which might be significant: structural characters, quotes, backslashes,
+ * comment and control characters. Only those bytes are examined individually, to build an index of the
+ * positions of the structural characters and string quotes. Stage 2 walks that index to build the decoded
+ * objects, copying strings which are plain ASCII directly from the bytes between their quotes, and decoding
+ * numbers and constants from the gaps between the entries of the index.
+ * <br/><br/>
+ * Anything which the index does not describe simply (comments, single quoted strings, or any error) is
+ * decoded by the character at a time JysonByteDecoder instead, so the options and error messages are
+ * exactly those of the other decoders.
+ */
+
+public class JysonIndexedDecoder extends JysonByteDecoder
+
+{
+
+	protected static final long ONES = 0x0101010101010101L;
+
+	protected static final long LOW_BITS = 0x7F7F7F7F7F7F7F7FL;
+
+	protected static final long HIGH_BITS = 0x8080808080808080L;
+
+	protected static final long CASE_BITS = 0x2020202020202020L;
+
+	protected static final long CONTROL_BITS = 0xE0E0E0E0E0E0E0E0L;
+
+	protected static final Charset ISO_8859_1 = Charset.forName("ISO-8859-1");
+
+	/**
+	 * The positions of the structural characters and string quotes, in order. The opening quote of a
+	 * string which contains escapes, control characters or non-ASCII characters is stored complemented.
+	 */
+	protected int[] index = new int[1024];
+
+	protected int index_length;
+
+	/** The next entry in the index to be consumed by stage 2 */
+	protected int next_entry;
+
+	/** The position of the start of the JSON text, after any byte order mark */
+	protected int start_pos;
+
+	protected byte[] ascii_buf = new byte[256];
+
+	/**
+	 * Thrown when stage 2 finds text which does not match the index. It carries no information:
+	 * the text is decoded again by the character at a time decoder, which reports the error.
+	 */
+	protected static class IndexMismatch extends RuntimeException
+	{
+		public Throwable fillInStackTrace()
+		{
+			return this;
+		}
+	}
+
+	protected static final IndexMismatch MISMATCH = new IndexMismatch();
+
+	protected JysonIndexedDecoder(ByteBuffer b)
+	{
+		super(b);
+		start_pos = curr_pos;
+	}
+
+	/**
+	* Return a word with the high bit of each byte set if the corresponding byte of the given word is zero
+	*/
+
+	protected static long zero_bytes ( long w )
+	{
+		return ~(((w & LOW_BITS) + LOW_BITS) | w | LOW_BITS);
+	}
+
+	protected static long equal_bytes ( long w, char c )
+	{
+		return zero_bytes(w ^ (c * ONES));
+	}
+
+	/**
+	* Return a word with the high bit of each byte set if that byte is significant to stage 1
+	*/
+
+	protected static long significant_bytes ( long w )
+	{
+		long folded = w | CASE_BITS; // folds '[' onto '{', and ']' onto '}'
+		return equal_bytes(folded, '{') | equal_bytes(folded, '}') | equal_bytes(w, ':') | equal_bytes(w, ',')
+			| equal_bytes(w, '"') | equal_bytes(w, '\\') | equal_bytes(w, '/') | equal_bytes(w, '#')
+			| equal_bytes(w, '\'') | zero_bytes(w & CONTROL_BITS) | (w & HIGH_BITS);
+	}
+
+	protected void add_entry ( int pos )
+	{
+		if (index_length == index.length)
+			index = java.util.Arrays.copyOf(index, index_length * 2);
+		index[index_length++] = pos;
+	}
+
+	/**
+	* Stage 1: build the index of the structural characters and string quotes
+	*
+	* @return false if the text contains anything that must be decoded a character at a time
+	*/
+
+	protected boolean build_index ( )
+	{
+		ByteBuffer words = bytes.duplicate().order(ByteOrder.LITTLE_ENDIAN);
+		index_length = 0;
+		boolean in_string = false;
+		int open_entry = 0;
+		int escaped_pos = -1;
+		for (int base = start_pos ; base < limit ; base += 8)
+		{
+			long candidates;
+			if (limit - base >= 8)
+				candidates = significant_bytes(words.getLong(base));
+			else
+			{
+				long w = 0;
+				for (int pos = limit - 1 ; pos >= base ; pos--)
+					w = (w << 8) | (bytes.get(pos) & 0xff);
+				candidates = significant_bytes(w) & ((1L << ((limit - base) * 8)) - 1);
+			}
+			while (candidates != 0)
+			{
+				int pos = base + (Long.numberOfTrailingZeros(candidates) >>> 3);
+				candidates &= candidates - 1;
+				if (pos == escaped_pos)
+					continue;
+				int b = bytes.get(pos);
+				if (in_string)
+				{
+					if (b == '"')
+					{
+						add_entry(pos);
+						in_string = false;
+					}
+					else if (b == '\\' || b < ' ')
+					{
+						if (b == '\\')
+							escaped_pos = pos + 1;
+						if (index[open_entry] >= 0)
+							index[open_entry] = ~index[open_entry];
+					}
+					continue;
+				}
+				switch (b)
+				{
+					case '"':
+						open_entry = index_length;
+						in_string = true;
+						// and let it flow into the structural case
+					case '{':
+					case '}':
+					case '[':
+					case ']':
+					case ':':
+					case ',':
+						add_entry(pos);
+						break;
+					default:
+						// Control characters are whitespace; comments, quotes, NULs and non-ASCII characters are not simple
+						if (b <= 0 || b > ' ')
+							return false;
+				}
+			}
+		}
+		return !in_string;
+	}
+
+	/**
+	* Return the position of the next entry in the index, or the limit if there are no more entries
+	*/
+
+	protected int entry_pos ( )
+	{
+		if (next_entry == index_length)
+			return limit;
+		int pos = index[next_entry];
+		return pos < 0 ? ~pos : pos;
+	}
+
+	protected boolean is_blank ( int from, int to )
+	{
+		for (int pos = from ; pos < to ; pos++)
+		{
+			int b = bytes.get(pos);
+			if (b > ' ' || b < 0)
+				return false;
+		}
+		return true;
+	}
+
+	/**
+	* Move past the next entry in the index, which must be preceded only by whitespace, and return its character
+	*/
+
+	protected char next_token ( )
+	{
+		int pos = entry_pos();
+		if (!is_blank(curr_pos, pos))
+			throw MISMATCH;
+		if (pos == limit)
+			return 0;
+		next_entry++;
+		curr_pos = pos + 1;
+		return (char)bytes.get(pos);
+	}
+
+	/**
+	* If the next entry in the index is the given character, preceded only by whitespace, move past it and return true
+	*/
+
+	protected boolean next_token_is ( char c )
+	{
+		int pos = entry_pos();
+		if (pos == limit || bytes.get(pos) != c || !is_blank(curr_pos, pos))
+			return false;
+		next_entry++;
+		curr_pos = pos + 1;
+		return true;
+	}
+
+	protected String ascii_string ( int from, int to )
+	{
+		int length = to - from;
+		if (bytes.hasArray())
+			return new String(bytes.array(), bytes.arrayOffset() + from, length, ISO_8859_1);
+		if (ascii_buf.length < length)
+			ascii_buf = new byte[Math.max(length, ascii_buf.length * 2)];
+		for (int ix = 0 ; ix < length ; ix++)
+			ascii_buf[ix] = bytes.get(from + ix);
+		return new String(ascii_buf, 0, length, ISO_8859_1);
+	}
+
+	/**
+	* Decode the string whose opening quote was the last entry consumed from the index
+	*/
+
+	protected String walk_string ( )
+		throws JSONDecodeError
+	{
+		int open = index[next_entry - 1];
+		int close = index[next_entry++];
+		if (open < 0)
+		{
+			String s = get_string('"');
+			if (curr_pos != close + 1)
+				throw MISMATCH;
+			return s;
+		}
+		curr_pos = close + 1;
+		return ascii_string(open + 1, close);
+	}
+
+	/**
+	* Read the separator after a member of the given array or object
+	*
+	* @return true if the container has ended
+	*/
+
+	protected boolean walk_end_member ( Frame frame )
+	{
+		char close = frame.is_object ? '}' : ']';
+		char c = next_token();
+		if (c == ',')
+		{
+			if (!next_token_is(close))
+				return false;
+			if (!accept_dangling_commas)
+				throw MISMATCH;
+			return true;
+		}
+		if (c != close)
+			throw MISMATCH;
+		return true;
+	}
+
+	/**
+	* Read the next member of the innermost open array or object, as JysonDecoder.next_member()
+	*/
+
+	protected Object walk_next_member ( )
+		throws JSONDecodeError
+	{
+		Frame frame = stack.get(stack.size()-1);
+		if (frame.is_object)
+		{
+			char c = next_token();
+			if (c == '}' && frame.count == 0)
+				return close_container();
+			if (c != '"')
+				throw MISMATCH;
+			frame.key = walk_string();
+			if (next_token() != ':')
+				throw MISMATCH;
+		}
+		return walk_value();
+	}
+
+	/**
+	* Add a decoded value to the innermost open array or object, and read its next member
+	*/
+
+	protected Object walk_add_member ( Object value )
+		throws JSONDecodeError
+	{
+		Frame frame = stack.get(stack.size()-1);
+		if (frame.is_object)
+			builder.put(frame.container, decode_key(frame.key), value);
+		else
+			builder.append(frame.container, value);
+		frame.count++;
+		if (walk_end_member(frame))
+			return close_container();
+		return walk_next_member();
+	}
+
+	/**
+	* Stage 2: decode the next value, which is either at the next entry in the index, or a number or constant before it.
+	* A (non-empty) array or object is only opened, as by JysonDecoder.start_value().
+	*/
+
+	protected Object walk_value ( )
+		throws JSONDecodeError
+	{
+		int pos = entry_pos();
+		if (!is_blank(curr_pos, pos))
+		{
+			// A number or constant, which is decoded by the character at a time decoder
+			Object value = get_object();
+			if (curr_pos > pos)
+				throw MISMATCH;
+			return value;
+		}
+		switch (next_token())
+		{
+			case '{':
+				return open_container(builder.new_object(), true);
+			case '[':
+				Object json_array = builder.new_array();
+				if (next_token_is(']'))
+					return builder.end_container(json_array);
+				return open_container(json_array, false);
+			case '"':
+				return builder.new_string(walk_string());
+			default:
+				throw MISMATCH;
+		}
+	}
+
+	protected Object walk_top_level_object ( )
+		throws JSONDecodeError
+	{
+		next_entry = 0;
+		curr_pos = start_pos;
+		if (!accept_any_primary_datum)
+		{
+			int pos = entry_pos();
+			if (pos == limit || !is_blank(curr_pos, pos) || (bytes.get(pos) != '{' && bytes.get(pos) != '['))
+				throw MISMATCH;
+		}
+		Object value = walk_value();
+		while (true)
+		{
+			if (value == OPENED)
+				value = walk_next_member();
+			else if (stack.isEmpty())
+				break;
+			else
+				value = walk_add_member(value);
+		}
+		if (!accept_junk_after_data && (next_entry != index_length || !is_blank(curr_pos, limit)))
+			throw MISMATCH;
+		return value;
+	}
+
+	protected Object get_top_level_object ( )
+		throws JSONDecodeError
+	{
+		if (selection == null && build_index())
+		{
+			try
+				{ return walk_top_level_object(); }
+			catch (IndexMismatch im)
+				{ }
+			catch (JSONDecodeError jde)
+				{ }
+			// Decode the text again a character at a time, to report the error
+			stack.clear();
+			curr_pos = start_pos;
+		}
+		return super.get_top_level_object();
+	}
+
+}
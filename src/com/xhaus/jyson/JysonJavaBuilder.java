@@ -0,0 +1,98 @@
+/*
+ * Copyright 2009-2012 Alan Kennedy
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License"); 
+ * you may not use this file except in compliance with the License. 
+ * You may obtain a copy of the License at 
+ *
+ *    http://www.apache.org/licenses/LICENSE-2.0 
+ *
+ * Unless required by applicable law or agreed to in writing, software 
+ * distributed under the License is distributed on an "AS IS" BASIS, 
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+ * See the License for the specific language governing permissions and 
+ * limitations under the License. 
+ *
+ */
+
+package com.xhaus.jyson;
+
+import java.math.BigInteger;
+import java.util.ArrayList;
+import java.util.HashMap;
+import java.util.List;
+import java.util.Map;
+
+/**
+ * A JysonBuilder which builds plain Java objects, for consumers written in Java: objects are HashMaps,
+ * arrays are ArrayLists, strings are Strings, integers are Longs (or BigIntegers, if too large for a long),
+ * floats are Doubles, booleans are Booleans, and null is null.
+ */
+
+public class JysonJavaBuilder extends JysonBuilder
+
+{
+
+	/** The builder is stateless, so a single instance is shared by all decoders */
+	public static final JysonJavaBuilder INSTANCE = new JysonJavaBuilder();
+
+	public Object new_object ( )
+	{
+		return new HashMap<String, Object>();
+	}
+
+	public Object new_key ( String key )
+	{
+		return key;
+	}
+
+	@SuppressWarnings("unchecked")
+	public void put ( Object json_object, Object key, Object value )
+	{
+		((Map<String, Object>)json_object).put((String)key, value);
+	}
+
+	public Object new_array ( )
+	{
+		return new ArrayList<Object>();
+	}
+
+	@SuppressWarnings("unchecked")
+	public void append ( Object json_array, Object value )
+	{
+		((List<Object>)json_array).add(value);
+	}
+
+	public Object new_string ( String s )
+	{
+		return s;
+	}
+
+	public Object new_integer ( long value )
+	{
+		return Long.valueOf(value);
+	}
+
+	public Object new_big_integer ( BigInteger value )
+	{
+		if (value.bitLength() < 64)
+			return Long.valueOf(value.longValue());
+		return value;
+	}
+
+	public Object new_float ( double value )
+	{
+		return Double.valueOf(value);
+	}
+
+	public Object new_boolean ( boolean value )
+	{
+		return Boolean.valueOf(value);
+	}
+
+	public Object new_null ( )
+	{
+		return null;
+	}
+
+}
@@ -0,0 +1,63 @@
+/*
+ * Copyright 2009-2012 Alan Kennedy
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License"); 
+ * you may not use this file except in compliance with the License. 
+ * You may obtain a copy of the License at 
+ *
+ *    http://www.apache.org/licenses/LICENSE-2.0 
+ *
+ * Unless required by applicable law or agreed to in writing, software 
+ * distributed under the License is distributed on an "AS IS" BASIS, 
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+ * See the License for the specific language governing permissions and 
+ * limitations under the License. 
+ *
+ */
+
+package com.xhaus.jyson;
+
+import java.util.LinkedHashMap;
+import java.util.Map;
+
+/**
+ * A bounded cache of decoded object keys, so that every occurrence of the same key in a JSON text
+ * shares a single key object, as built by a JysonBuilder. When the cache is full, the least recently used key is evicted.
+ */
+
+public class JysonKeyCache extends LinkedHashMap<String, Object>
+
+{
+
+	protected int capacity;
+
+	protected JysonBuilder builder;
+
+	public JysonKeyCache(int c, JysonBuilder b)
+	{
+		super(16, 0.75f, true);
+		capacity = c;
+		builder = b;
+	}
+
+	protected boolean removeEldestEntry ( Map.Entry<String, Object> eldest )
+	{
+		return size() > capacity;
+	}
+
+	/**
+	* Return the shared key object for the given key, creating it if the key is not in the cache
+	*/
+
+	public Object get_key ( String key )
+	{
+		Object result = get(key);
+		if (result == null)
+		{
+			result = builder.new_key(key);
+			put(key, result);
+		}
+		return result;
+	}
+
+}
@@ -0,0 +1,52 @@
+/*
+ * Copyright 2009-2012 Alan Kennedy
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License"); 
+ * you may not use this file except in compliance with the License. 
+ * You may obtain a copy of the License at 
+ *
+ *    http://www.apache.org/licenses/LICENSE-2.0 
+ *
+ * Unless required by applicable law or agreed to in writing, software 
+ * distributed under the License is distributed on an "AS IS" BASIS, 
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+ * See the License for the specific language governing permissions and 
+ * limitations under the License. 
+ *
+ */
+
+package com.xhaus.jyson;
+
+import java.util.AbstractList;
+import java.util.ArrayList;
+
+/**
+ * A read-only java.util.List proxy for a JSON array, whose elements are decoded when they are first accessed.
+ * See JysonLazyBuilder.
+ */
+
+public class JysonLazyArray extends AbstractList<Object>
+
+{
+
+	protected JysonLazyBuilder source;
+
+	protected ArrayList<JysonLazyBuilder.Slot> slots;
+
+	protected JysonLazyArray ( JysonLazyBuilder s )
+	{
+		source = s;
+		slots = new ArrayList<JysonLazyBuilder.Slot>();
+	}
+
+	public int size ( )
+	{
+		return slots.size();
+	}
+
+	public Object get ( int index )
+	{
+		return source.get_value(slots.get(index));
+	}
+
+}
@@ -0,0 +1,165 @@
+/*
+ * Copyright 2009-2012 Alan Kennedy
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License"); 
+ * you may not use this file except in compliance with the License. 
+ * You may obtain a copy of the License at 
+ *
+ *    http://www.apache.org/licenses/LICENSE-2.0 
+ *
+ * Unless required by applicable law or agreed to in writing, software 
+ * distributed under the License is distributed on an "AS IS" BASIS, 
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+ * See the License for the specific language governing permissions and 
+ * limitations under the License. 
+ *
+ */
+
+package com.xhaus.jyson;
+
+import org.python.core.*;
+
+/**
+ * A JysonBuilder which decodes JSON objects and arrays lazily, for callers which only read a few of their values.
+ * <br/><br/>
+ * Objects and arrays are built as JysonLazyObjects and JysonLazyArrays, which hold only the offsets in the JSON
+ * text of their values: the values themselves are skipped, without being decoded. A value is decoded when it
+ * is first accessed, and is then cached, so that it is decoded at most once. If the value is itself an object or
+ * an array, it is again a lazy proxy, which holds only the offsets of its own values. Strings, numbers and
+ * constants are built by the builder of the decoder's target.
+ * <br/><br/>
+ * Values are decoded on access by a decoder of its own, with the same options as the template decoder,
+ * through the same get_object() as eager decoding. Since only the structure of skipped values is checked,
+ * syntax errors inside them are not reported until they are accessed.
+ */
+
+public class JysonLazyBuilder extends JysonBuilder
+
+{
+
+	/** The value of a slot whose value has not yet been decoded */
+	protected static final Object UNDECODED = new Object();
+
+	/** The offset in the JSON text of a value in an object or array, and its value, once decoded */
+	protected static class Slot
+	{
+		int offset;
+		Object value;
+
+		Slot(int o)
+		{
+			offset = o;
+			value = UNDECODED;
+		}
+	}
+
+	/** Builds the values of strings, numbers and constants */
+	protected JysonBuilder value_builder;
+
+	protected JysonDecoder decoder;
+
+	protected JysonLazyBuilder ( JysonDecoder template, String json_text )
+	{
+		value_builder = template.builder;
+		decoder = new JysonDecoder(json_text);
+		decoder.set_options(template);
+		decoder.builder = this;
+		decoder.selection = null;
+		decoder.lazy = true;
+	}
+
+	/**
+	* Decode the top level value of the JSON text
+	*/
+
+	protected Object decode ( )
+		throws JSONDecodeError
+	{
+		synchronized (decoder)
+		{
+			decoder.curr_pos = 0;
+			return decoder.get_top_level_object();
+		}
+	}
+
+	/**
+	* Return the value of a slot, decoding it if it has not already been decoded
+	*/
+
+	protected Object get_value ( Slot slot )
+	{
+		synchronized (slot)
+		{
+			if (slot.value == UNDECODED)
+			{
+				synchronized (decoder)
+				{
+					decoder.curr_pos = slot.offset;
+					try
+						{ slot.value = decoder.get_object(); }
+					catch (JSONDecodeError jde)
+						{ throw Py.JavaError(jde); }
+				}
+			}
+			return slot.value;
+		}
+	}
+
+	public Object new_object ( )
+	{
+		return new JysonLazyObject(this);
+	}
+
+	public Object new_key ( String key )
+	{
+		return key;
+	}
+
+	/** The value of an entry is its offset, as returned by JysonDecoder.get_value() */
+	public void put ( Object json_object, Object key, Object value )
+	{
+		((JysonLazyObject)json_object).slots.put((String)key, new Slot(((Integer)value).intValue()));
+	}
+
+	public Object new_array ( )
+	{
+		return new JysonLazyArray(this);
+	}
+
+	/** The value of an element is its offset, as returned by JysonDecoder.get_value() */
+	public void append ( Object json_array, Object value )
+	{
+		((JysonLazyArray)json_array).slots.add(new Slot(((Integer)value).intValue()));
+	}
+
+	public Object new_string ( String s )
+	{
+		return value_builder.new_string(s);
+	}
+
+	public Object new_integer ( long value )
+	{
+		return value_builder.new_integer(value);
+	}
+
+	public Object new_big_integer ( java.math.BigInteger value )
+	{
+		return value_builder.new_big_integer(value);
+	}
+
+	public Object new_float ( double value )
+	{
+		return value_builder.new_float(value);
+	}
+
+	public Object new_boolean ( boolean value )
+	{
+		return value_builder.new_boolean(value);
+	}
+
+	public Object new_null ( )
+	{
+		return value_builder.new_null();
+	}
+
+}
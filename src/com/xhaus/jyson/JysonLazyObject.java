@@ -0,0 +1,104 @@
+/*
+ * Copyright 2009-2012 Alan Kennedy
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License"); 
+ * you may not use this file except in compliance with the License. 
+ * You may obtain a copy of the License at 
+ *
+ *    http://www.apache.org/licenses/LICENSE-2.0 
+ *
+ * Unless required by applicable law or agreed to in writing, software 
+ * distributed under the License is distributed on an "AS IS" BASIS, 
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+ * See the License for the specific language governing permissions and 
+ * limitations under the License. 
+ *
+ */
+
+package com.xhaus.jyson;
+
+import java.util.AbstractMap;
+import java.util.AbstractSet;
+import java.util.Collections;
+import java.util.Iterator;
+import java.util.LinkedHashMap;
+import java.util.Map;
+import java.util.Set;
+
+/**
+ * A read-only java.util.Map proxy for a JSON object, whose values are decoded when they are first accessed.
+ * The entries are in the order of the JSON text. See JysonLazyBuilder.
+ */
+
+public class JysonLazyObject extends AbstractMap<String, Object>
+
+{
+
+	protected JysonLazyBuilder source;
+
+	protected LinkedHashMap<String, JysonLazyBuilder.Slot> slots;
+
+	protected JysonLazyObject ( JysonLazyBuilder s )
+	{
+		source = s;
+		slots = new LinkedHashMap<String, JysonLazyBuilder.Slot>();
+	}
+
+	public int size ( )
+	{
+		return slots.size();
+	}
+
+	public boolean containsKey ( Object key )
+	{
+		return slots.containsKey(key);
+	}
+
+	public Object get ( Object key )
+	{
+		JysonLazyBuilder.Slot slot = slots.get(key);
+		if (slot == null)
+			return null;
+		return source.get_value(slot);
+	}
+
+	public Set<String> keySet ( )
+	{
+		return Collections.unmodifiableSet(slots.keySet());
+	}
+
+	public Set<Map.Entry<String, Object>> entrySet ( )
+	{
+		return new AbstractSet<Map.Entry<String, Object>>()
+		{
+			public int size ( )
+			{
+				return slots.size();
+			}
+
+			public Iterator<Map.Entry<String, Object>> iterator ( )
+			{
+				final Iterator<Map.Entry<String, JysonLazyBuilder.Slot>> slot_iterator = slots.entrySet().iterator();
+				return new Iterator<Map.Entry<String, Object>>()
+				{
+					public boolean hasNext ( )
+					{
+						return slot_iterator.hasNext();
+					}
+
+					public Map.Entry<String, Object> next ( )
+					{
+						Map.Entry<String, JysonLazyBuilder.Slot> entry = slot_iterator.next();
+						return new AbstractMap.SimpleImmutableEntry<String, Object>(entry.getKey(), source.get_value(entry.getValue()));
+					}
+
+					public void remove ( )
+					{
+						throw new UnsupportedOperationException("Lazily decoded JSON objects are read-only");
+					}
+				};
+			}
+		};
+	}
+
+}
@@ -0,0 +1,216 @@
+/*
+ * Copyright 2009-2012 Alan Kennedy
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License"); 
+ * you may not use this file except in compliance with the License. 
+ * You may obtain a copy of the License at 
+ *
+ *    http://www.apache.org/licenses/LICENSE-2.0 
+ *
+ * Unless required by applicable law or agreed to in writing, software 
+ * distributed under the License is distributed on an "AS IS" BASIS, 
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+ * See the License for the specific language governing permissions and 
+ * limitations under the License. 
+ *
+ */
+
+package com.xhaus.jyson;
+
+import java.util.ArrayList;
+import java.util.List;
+import java.util.concurrent.Callable;
+import java.util.concurrent.ExecutionException;
+import java.util.concurrent.ExecutorService;
+import java.util.concurrent.Future;
+
+import org.python.core.*;
+
+/**
+ * Decodes newline delimited JSON (JSON Lines), where every non-blank line is a separate JSON text.
+ * <br/><br/>
+ * The lines are decoded in batches on the pool of worker threads shared with JysonParallelEncoder, each batch
+ * with its own JysonDecoder, configured with the options of a template decoder. At most <b>workers</b> batches
+ * are decoded at once, and the results are returned in the original order.
+ */
+
+public class JysonLinesDecoder
+
+{
+
+	/** The default number of lines decoded by a worker thread in one task */
+	public static final int DEFAULT_BATCH_SIZE = 256;
+
+	protected JysonDecoder template;
+
+	protected int workers;
+
+	protected int batch_size;
+
+	protected ExecutorService executor;
+
+	protected List<Future<Object[]>> futures;
+
+	/** The results of the batches which have been decoded, and the number of those batches */
+	protected PyList results;
+
+	protected int collected;
+
+	/** The non-blank lines read since the last batch was submitted, and the line number of each of them */
+	protected List<String> pending;
+
+	protected int[] pending_line_numbers;
+
+	/** A batch of lines, which are decoded together on one worker thread */
+	protected class Batch implements Callable<Object[]>
+	{
+		List<String> lines;
+		int[] line_numbers; // blank lines are skipped, so the lines of a batch need not be consecutive
+
+		Batch(List<String> l, int[] n)
+		{
+			lines = l;
+			line_numbers = n;
+		}
+
+		public Object[] call()
+			throws JSONDecodeError
+		{
+			JysonDecoder decoder = new JysonDecoder(null);
+			decoder.set_options(template);
+			Object[] results = new Object[lines.size()];
+			for (int ix = 0 ; ix < results.length ; ix++)
+			{
+				decoder.reset(lines.get(ix));
+				try
+					{ results[ix] = decoder.get_top_level_object(); }
+				catch (JSONDecodeError jde)
+					{ throw new JSONDecodeError(jde.getMessage()+": line="+(line_numbers[ix]+1)); }
+			}
+			return results;
+		}
+	}
+
+	protected JysonLinesDecoder(JysonDecoder t, int w, int b)
+	{
+		template = t;
+		workers = Math.max(w, 1);
+		batch_size = Math.max(b, 1);
+	}
+
+	protected static boolean is_blank ( String line )
+	{
+		for (int ix = 0 ; ix < line.length() ; ix++)
+			if (line.charAt(ix) > ' ')
+				return false;
+		return true;
+	}
+
+	/**
+	* Wait for the oldest batches which are being decoded, until at most the given number are left, and append their results
+	*/
+
+	protected void collect ( int limit )
+		throws ExecutionException, InterruptedException
+	{
+		while (futures.size() - collected > limit)
+		{
+			Object[] batch_results = futures.get(collected).get();
+			futures.set(collected++, null);
+			for (int ix = 0 ; ix < batch_results.length ; ix++)
+				results.append(Py.java2py(batch_results[ix]));
+		}
+	}
+
+	protected void submit_pending ( )
+		throws ExecutionException, InterruptedException
+	{
+		if (pending.isEmpty())
+			return;
+		collect(workers-1);
+		futures.add(executor.submit(new Batch(pending, pending_line_numbers)));
+		pending = new ArrayList<String>(batch_size);
+		pending_line_numbers = new int[batch_size];
+	}
+
+	protected void add_line ( String line, int line_number )
+		throws ExecutionException, InterruptedException
+	{
+		if (is_blank(line))
+			return;
+		pending_line_numbers[pending.size()] = line_number;
+		pending.add(line);
+		if (pending.size() == batch_size)
+			submit_pending();
+	}
+
+	/**
+	* Decode every non-blank line of the source
+	*
+	* @param source A string containing the lines, or a Jython iterable (such as a file) of lines
+	* @return A list of the decoded Jython objects, in the order of their lines
+	* @throws JSONDecodeError If an error occurred while decoding any of the lines
+	*/
+
+	public PyList decode ( PyObject source )
+		throws JSONDecodeError
+	{
+		executor = JysonParallelEncoder.get_shared_pool();
+		futures = new ArrayList<Future<Object[]>>();
+		pending = new ArrayList<String>(batch_size);
+		pending_line_numbers = new int[batch_size];
+		results = new PyList();
+		collected = 0;
+		try
+		{
+			int line_number = 0;
+			if (source instanceof PyString)
+			{
+				String text = source.toString();
+				for (int start = 0 ; start < text.length() ; line_number++)
+				{
+					int end = text.indexOf('\n', start);
+					if (end == -1)
+						end = text.length();
+					add_line(text.substring(start, end), line_number);
+					start = end + 1;
+				}
+			}
+			else
+			{
+				PyObject iter = source.__iter__();
+				for (PyObject item ; (item = iter.__iternext__()) != null ; line_number++)
+					add_line(item.toString(), line_number);
+			}
+			submit_pending();
+			collect(0);
+			return results;
+		}
+		catch (ExecutionException ex)
+		{
+			Throwable cause = ex.getCause();
+			if (cause instanceof JSONDecodeError)
+				throw (JSONDecodeError)cause;
+			if (cause instanceof RuntimeException)
+				throw (RuntimeException)cause;
+			throw Py.JavaError(cause);
+		}
+		catch (InterruptedException iex)
+		{
+			Thread.currentThread().interrupt();
+			throw Py.JavaError(iex);
+		}
+		finally
+		{
+			// The pool is shared, so only the batches of this call which are still waiting are cancelled
+			for (int ix = collected ; ix < futures.size() ; ix++)
+				futures.get(ix).cancel(false);
+			executor = null;
+			futures = null;
+			pending = null;
+			pending_line_numbers = null;
+			results = null;
+		}
+	}
+
+}
@@ -0,0 +1,92 @@
+/*
+ * Copyright 2009-2012 Alan Kennedy
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License"); 
+ * you may not use this file except in compliance with the License. 
+ * You may obtain a copy of the License at 
+ *
+ *    http://www.apache.org/licenses/LICENSE-2.0 
+ *
+ * Unless required by applicable law or agreed to in writing, software 
+ * distributed under the License is distributed on an "AS IS" BASIS, 
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+ * See the License for the specific language governing permissions and 
+ * limitations under the License. 
+ *
+ */
+
+package com.xhaus.jyson;
+
+import java.io.IOException;
+import java.nio.ByteBuffer;
+import java.nio.channels.FileChannel;
+
+/**
+ * A JysonByteDecoder which decodes a UTF-8 encoded file through memory mapped windows onto the file.
+ * <br/><br/>
+ * The bytes of the file stay in the operating system's page cache, rather than on the Java heap. Since
+ * a single mapping is limited to 2GB, larger files are decoded through a succession of windows.
+ * Positions in error messages are byte offsets from the start of the file.
+ */
+
+public class JysonMappedFileDecoder extends JysonByteDecoder
+
+{
+
+	/** The default size of the windows mapped onto the file */
+	public static final long DEFAULT_WINDOW_SIZE = 1L << 30;
+
+	protected FileChannel channel;
+
+	protected long file_size;
+
+	/** The offset in the file of the start of the current window */
+	protected long window_offset;
+
+	protected long window_size;
+
+	protected JysonMappedFileDecoder(FileChannel c, long size)
+		throws IOException
+	{
+		super(map(c, 0, Math.min(c.size(), clamp_window_size(size))));
+		channel = c;
+		file_size = c.size();
+		window_offset = 0;
+		window_size = clamp_window_size(size);
+	}
+
+	protected static long clamp_window_size ( long size )
+	{
+		return Math.min(Math.max(size, 2), Integer.MAX_VALUE);
+	}
+
+	protected static ByteBuffer map ( FileChannel c, long offset, long size )
+		throws IOException
+	{
+		return c.map(FileChannel.MapMode.READ_ONLY, offset, size);
+	}
+
+	protected boolean next_window ( )
+		throws JSONDecodeError
+	{
+		long window_end = window_offset + limit;
+		if (window_end >= file_size)
+			return false;
+		// Start the new window on the last byte read, so that it can still be pushed back
+		long start = window_offset + curr_pos - 1;
+		try
+			{ bytes = map(channel, start, Math.min(file_size - start, window_size)); }
+		catch (IOException iox)
+			{ throw decode_exception("Error mapping JSON file: " + iox.getMessage()); }
+		window_offset = start;
+		curr_pos = 1;
+		limit = bytes.limit();
+		return true;
+	}
+
+	protected JSONDecodeError decode_exception(String message)
+	{
+		return new JSONDecodeError(message+": position="+(window_offset+curr_pos));
+	}
+
+}
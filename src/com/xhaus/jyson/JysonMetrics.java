@@ -0,0 +1,300 @@
+/*
+ * Copyright 2009-2012 Alan Kennedy
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License"); 
+ * you may not use this file except in compliance with the License. 
+ * You may obtain a copy of the License at 
+ *
+ *    http://www.apache.org/licenses/LICENSE-2.0 
+ *
+ * Unless required by applicable law or agreed to in writing, software 
+ * distributed under the License is distributed on an "AS IS" BASIS, 
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+ * See the License for the specific language governing permissions and 
+ * limitations under the License. 
+ *
+ */
+
+package com.xhaus.jyson;
+
+import java.util.concurrent.atomic.AtomicLong;
+import java.util.concurrent.atomic.AtomicLongArray;
+
+import org.python.core.*;
+
+/**
+ * Counts the calls of the codec's loads(), loads_bytes(), dumps(), decode() and encode(), with the sizes of
+ * the JSON texts decoded and encoded, the errors raised, and histograms of latency and size.
+ * <br/><br/>
+ * Recording is disabled by default: it is enabled by JysonCodec.enable_stats(), through JMX, or by
+ * starting the JVM with <b>-Djyson.metrics=true</b>. While disabled, each call only reads the <b>enabled</b> flag.
+ * The metrics are read through JysonCodec.stats(), or the JMX MBean registered when this class is loaded, which
+ * can also enable and disable recording.
+ */
+
+public class JysonMetrics implements JysonMetricsMBean
+
+{
+
+	public static final String OBJECT_NAME = "com.xhaus.jyson:type=Metrics";
+
+	/** The number of buckets in each histogram */
+	public static final int BUCKETS = 32;
+
+	/** Returned by start() when recording is disabled */
+	protected static final long DISABLED = Long.MIN_VALUE;
+
+	protected static volatile boolean enabled = Boolean.getBoolean("jyson.metrics");
+
+	/** The metrics of one kind of call: decoding or encoding */
+	public static class Operation
+	{
+		String error_name;
+		AtomicLong calls = new AtomicLong();
+		AtomicLong errors = new AtomicLong();
+		AtomicLong other_errors = new AtomicLong();
+		AtomicLong size = new AtomicLong();
+		AtomicLong nanos = new AtomicLong();
+		AtomicLongArray latency_histogram = new AtomicLongArray(BUCKETS);
+		AtomicLongArray size_histogram = new AtomicLongArray(BUCKETS);
+
+		Operation(String e)
+		{
+			error_name = e;
+		}
+
+		/**
+		* Record a call, started at the given time, which decoded or encoded a JSON text of the given size
+		*/
+
+		public void completed ( long start, long text_size )
+		{
+			if (start == DISABLED)
+				return;
+			long elapsed = System.nanoTime() - start;
+			calls.incrementAndGet();
+			size.addAndGet(text_size);
+			nanos.addAndGet(elapsed);
+			latency_histogram.incrementAndGet(bucket(elapsed / 1000));
+			size_histogram.incrementAndGet(bucket(text_size));
+		}
+
+		/**
+		* Record a call, started at the given time, which raised the given exception
+		*/
+
+		public void failed ( long start, Throwable t )
+		{
+			if (start == DISABLED)
+				return;
+			calls.incrementAndGet();
+			if (t instanceof JSONError)
+				errors.incrementAndGet();
+			else
+				other_errors.incrementAndGet();
+		}
+
+		protected void reset ( )
+		{
+			calls.set(0);
+			errors.set(0);
+			other_errors.set(0);
+			size.set(0);
+			nanos.set(0);
+			for (int ix = 0 ; ix < BUCKETS ; ix++)
+			{
+				latency_histogram.set(ix, 0);
+				size_histogram.set(ix, 0);
+			}
+		}
+
+		protected double mean_latency_micros ( )
+		{
+			long completed_calls = calls.get() - errors.get() - other_errors.get();
+			return completed_calls <= 0 ? 0.0 : nanos.get() / 1000.0 / completed_calls;
+		}
+
+		protected static long[] to_array ( AtomicLongArray histogram )
+		{
+			long[] counts = new long[BUCKETS];
+			for (int ix = 0 ; ix < BUCKETS ; ix++)
+				counts[ix] = histogram.get(ix);
+			return counts;
+		}
+
+		/**
+		* Return the non-empty buckets of a histogram as a dictionary, keyed by the upper bound of each bucket
+		*/
+
+		protected static PyDictionary histogram_dict ( AtomicLongArray histogram )
+		{
+			PyDictionary result = new PyDictionary();
+			for (int ix = 0 ; ix < BUCKETS ; ix++)
+			{
+				long count = histogram.get(ix);
+				if (count > 0)
+					result.__setitem__(Py.newLong(1L << ix), Py.newLong(count));
+			}
+			return result;
+		}
+
+		protected PyDictionary snapshot ( )
+		{
+			PyDictionary errors_dict = new PyDictionary();
+			errors_dict.__setitem__(error_name, Py.newLong(errors.get()));
+			errors_dict.__setitem__("other", Py.newLong(other_errors.get()));
+			PyDictionary result = new PyDictionary();
+			result.__setitem__("calls", Py.newLong(calls.get()));
+			result.__setitem__("size", Py.newLong(size.get()));
+			result.__setitem__("errors", errors_dict);
+			result.__setitem__("mean_latency_us", Py.newFloat(mean_latency_micros()));
+			result.__setitem__("latency_us", histogram_dict(latency_histogram));
+			result.__setitem__("sizes", histogram_dict(size_histogram));
+			return result;
+		}
+	}
+
+	public static final Operation DECODE = new Operation("JSONDecodeError");
+
+	public static final Operation ENCODE = new Operation("JSONEncodeError");
+
+	public static final JysonMetrics INSTANCE = new JysonMetrics();
+
+	static
+	{
+		try
+		{
+			java.lang.management.ManagementFactory.getPlatformMBeanServer().registerMBean(INSTANCE,
+				new javax.management.ObjectName(OBJECT_NAME));
+		}
+		catch (Exception x)
+		{
+			// Already registered by another class loader, or JMX is not available: the metrics are still readable through stats()
+		}
+	}
+
+
+	protected JysonMetrics ( )
+	{
+	}
+
+	/**
+	* Return the start time of a call, or DISABLED if recording is disabled
+	*/
+
+	public static long start ( )
+	{
+		return enabled ? System.nanoTime() : DISABLED;
+	}
+
+	/**
+	* Return the bucket of a histogram which counts the given value
+	*/
+
+	protected static int bucket ( long value )
+	{
+		if (value <= 0)
+			return 0;
+		return Math.min(64 - Long.numberOfLeadingZeros(value), BUCKETS - 1);
+	}
+
+	/**
+	* Return a dictionary of the current metrics
+	*/
+
+	public static PyDictionary snapshot ( )
+	{
+		PyDictionary result = new PyDictionary();
+		result.__setitem__("enabled", Py.newBoolean(enabled));
+		result.__setitem__("decode", DECODE.snapshot());
+		result.__setitem__("encode", ENCODE.snapshot());
+		return result;
+	}
+
+	public boolean isEnabled ( )
+	{
+		return enabled;
+	}
+
+	public void setEnabled ( boolean e )
+	{
+		enabled = e;
+	}
+
+	public void reset ( )
+	{
+		DECODE.reset();
+		ENCODE.reset();
+	}
+
+	public long getDecodeCalls ( )
+	{
+		return DECODE.calls.get();
+	}
+
+	public long getDecodeErrors ( )
+	{
+		return DECODE.errors.get();
+	}
+
+	public long getDecodeOtherErrors ( )
+	{
+		return DECODE.other_errors.get();
+	}
+
+	public long getDecodeSize ( )
+	{
+		return DECODE.size.get();
+	}
+
+	public double getDecodeMeanLatencyMicros ( )
+	{
+		return DECODE.mean_latency_micros();
+	}
+
+	public long[] getDecodeLatencyHistogram ( )
+	{
+		return Operation.to_array(DECODE.latency_histogram);
+	}
+
+	public long[] getDecodeSizeHistogram ( )
+	{
+		return Operation.to_array(DECODE.size_histogram);
+	}
+
+	public long getEncodeCalls ( )
+	{
+		return ENCODE.calls.get();
+	}
+
+	public long getEncodeErrors ( )
+	{
+		return ENCODE.errors.get();
+	}
+
+	public long getEncodeOtherErrors ( )
+	{
+		return ENCODE.other_errors.get();
+	}
+
+	public long getEncodeSize ( )
+	{
+		return ENCODE.size.get();
+	}
+
+	public double getEncodeMeanLatencyMicros ( )
+	{
+		return ENCODE.mean_latency_micros();
+	}
+
+	public long[] getEncodeLatencyHistogram ( )
+	{
+		return Operation.to_array(ENCODE.latency_histogram);
+	}
+
+	public long[] getEncodeSizeHistogram ( )
+	{
+		return Operation.to_array(ENCODE.size_histogram);
+	}
+
+}
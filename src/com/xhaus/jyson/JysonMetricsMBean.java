@@ -0,0 +1,66 @@
+/*
+ * Copyright 2009-2012 Alan Kennedy
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License"); 
+ * you may not use this file except in compliance with the License. 
+ * You may obtain a copy of the License at 
+ *
+ *    http://www.apache.org/licenses/LICENSE-2.0 
+ *
+ * Unless required by applicable law or agreed to in writing, software 
+ * distributed under the License is distributed on an "AS IS" BASIS, 
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+ * See the License for the specific language governing permissions and 
+ * limitations under the License. 
+ *
+ */
+
+package com.xhaus.jyson;
+
+/**
+ * The JMX management interface of JysonMetrics, registered as <b>com.xhaus.jyson:type=Metrics</b>.
+ * <br/><br/>
+ * Sizes are in characters of JSON text (or bytes, for loads_bytes()). Bucket <b>i</b> of a histogram
+ * counts the values from 2^(i-1) up to 2^i, except bucket 0, which counts zeros; the last bucket also
+ * counts all larger values. Latencies are in microseconds.
+ */
+
+public interface JysonMetricsMBean
+
+{
+
+	public boolean isEnabled ( );
+
+	public void setEnabled ( boolean enabled );
+
+	public void reset ( );
+
+	public long getDecodeCalls ( );
+
+	public long getDecodeErrors ( );
+
+	public long getDecodeOtherErrors ( );
+
+	public long getDecodeSize ( );
+
+	public double getDecodeMeanLatencyMicros ( );
+
+	public long[] getDecodeLatencyHistogram ( );
+
+	public long[] getDecodeSizeHistogram ( );
+
+	public long getEncodeCalls ( );
+
+	public long getEncodeErrors ( );
+
+	public long getEncodeOtherErrors ( );
+
+	public long getEncodeSize ( );
+
+	public double getEncodeMeanLatencyMicros ( );
+
+	public long[] getEncodeLatencyHistogram ( );
+
+	public long[] getEncodeSizeHistogram ( );
+
+}
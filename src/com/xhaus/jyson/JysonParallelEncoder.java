@@ -0,0 +1,169 @@
+/*
+ * Copyright 2009-2012 Alan Kennedy
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License"); 
+ * you may not use this file except in compliance with the License. 
+ * You may obtain a copy of the License at 
+ *
+ *    http://www.apache.org/licenses/LICENSE-2.0 
+ *
+ * Unless required by applicable law or agreed to in writing, software 
+ * distributed under the License is distributed on an "AS IS" BASIS, 
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+ * See the License for the specific language governing permissions and 
+ * limitations under the License. 
+ *
+ */
+
+package com.xhaus.jyson;
+
+import java.util.ArrayList;
+import java.util.List;
+import java.util.concurrent.ForkJoinPool;
+import java.util.concurrent.RecursiveAction;
+
+import org.python.core.*;
+
+/**
+ * A JysonEncoder which encodes large arrays and objects in parallel.
+ * <br/><br/>
+ * Arrays and objects with at least <b>threshold</b> elements are split into ranges, which are encoded
+ * into separate buffers on a ForkJoinPool, using ordinary (serial) JysonEncoders. The buffers are
+ * then appended in order, so the JSON text is identical to that generated by a serial encoder.
+ */
+
+public class JysonParallelEncoder extends JysonEncoder
+
+{
+
+	/** The default minimum number of elements in an array or object for it to be encoded in parallel */
+	public static final int DEFAULT_THRESHOLD = 10000;
+
+	protected static ForkJoinPool shared_pool;
+
+	protected int threshold;
+
+	protected ForkJoinPool pool;
+
+	/** A range of the elements of an array or object, encoded into its own buffer */
+	protected class Range extends RecursiveAction
+	{
+		PyObject container;
+		PyList keys; // null for arrays
+		int lo;
+		int hi;
+		StringBuilder out;
+		JSONEncodeError error;
+
+		Range(PyObject c, PyList k, int l, int h)
+		{
+			container = c;
+			keys = k;
+			lo = l;
+			hi = h;
+			out = new StringBuilder();
+			error = null;
+		}
+
+		protected void compute()
+		{
+			JysonEncoder encoder = new JysonEncoder();
+			encoder.set_options(JysonParallelEncoder.this);
+			// So that the elements can be checked for (circular) references to the containers enclosing them
+			encoder.open_containers.putAll(open_containers);
+			encoder.converting.addAll(converting);
+			try
+			{
+				for (int ix = lo ; ix < hi ; ix++)
+				{
+					if (ix > lo)
+						out.append(',');
+					if (keys == null)
+						encoder.append_json_repr(out, container.__getitem__(ix));
+					else
+					{
+						PyObject k = keys.__getitem__(ix);
+						encoder.append_json_key_repr(out, k);
+						encoder.append_json_repr(out, container.__getitem__(k));
+					}
+				}
+			}
+			catch (JSONEncodeError jee)
+				{ error = jee; }
+		}
+	}
+
+	protected JysonParallelEncoder ( int t )
+	{
+		threshold = Math.max(t, 2);
+		pool = get_shared_pool();
+	}
+
+	protected static synchronized ForkJoinPool get_shared_pool ( )
+	{
+		if (shared_pool == null)
+			shared_pool = new ForkJoinPool();
+		return shared_pool;
+	}
+
+	/**
+	* Encode the elements of a large array or object in parallel, and append them to the buffer in order.
+	* The open_containers of this encoder are read concurrently by the ranges, so must not change until they have finished.
+	*/
+
+	protected void append_json_ranges ( StringBuilder buf, PyObject container, PyList keys, int num_items )
+		throws JSONEncodeError
+	{
+		int range_size = Math.max(threshold / 2, num_items / (pool.getParallelism() * 4));
+		final List<Range> ranges = new ArrayList<Range>();
+		for (int lo = 0 ; lo < num_items ; lo += range_size)
+			ranges.add(new Range(container, keys, lo, Math.min(lo + range_size, num_items)));
+		pool.invoke(new RecursiveAction()
+		{
+			protected void compute()
+			{
+				invokeAll(ranges);
+			}
+		});
+		for (int ix = 0 ; ix < ranges.size() ; ix++)
+		{
+			Range range = ranges.get(ix);
+			if (range.error != null)
+				throw range.error;
+			if (ix > 0)
+				buf.append(',');
+			buf.append(range.out);
+		}
+	}
+
+	protected void append_json_map_repr ( StringBuilder buf, PyObject map, PyList keys )
+		throws JSONEncodeError
+	{
+		int num_keys = keys.__len__();
+		if (num_keys < threshold)
+		{
+			super.append_json_map_repr(buf, map, keys);
+			return;
+		}
+		Frame frame = push_frame(buf, map, map, keys, null, true, num_keys);
+		append_json_ranges(buf, map, keys, num_keys);
+		// All of the elements have been appended: the frame is closed by append_json_repr()
+		frame.ix = frame.len;
+	}
+
+	protected void append_json_sequence_repr ( StringBuilder buf, PySequence sequence )
+		throws JSONEncodeError
+	{
+		int num_items = sequence.__len__();
+		if (num_items < threshold)
+		{
+			super.append_json_sequence_repr(buf, sequence);
+			return;
+		}
+		Frame frame = push_frame(buf, sequence, sequence, null, null, false, num_items);
+		append_json_ranges(buf, sequence, null, num_items);
+		// All of the elements have been appended: the frame is closed by append_json_repr()
+		frame.ix = frame.len;
+	}
+
+}
@@ -0,0 +1,172 @@
+/*
+ * Copyright 2009-2012 Alan Kennedy
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License"); 
+ * you may not use this file except in compliance with the License. 
+ * You may obtain a copy of the License at 
+ *
+ *    http://www.apache.org/licenses/LICENSE-2.0 
+ *
+ * Unless required by applicable law or agreed to in writing, software 
+ * distributed under the License is distributed on an "AS IS" BASIS, 
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+ * See the License for the specific language governing permissions and 
+ * limitations under the License. 
+ *
+ */
+
+package com.xhaus.jyson;
+
+import java.util.HashMap;
+import java.util.Iterator;
+import java.util.Map;
+
+import org.python.core.*;
+
+/**
+ * A set of JSON Pointers (RFC 6901), compiled into a tree which the decoder follows to decide
+ * which parts of the JSON text to decode, and which to skip.
+ * <br/><br/>
+ * In addition to the standard pointer syntax, a reference token of <b>*</b> matches every key
+ * of an object or every element of an array, e.g. <b>/items/&#42;/price</b>.
+ */
+
+public class JysonPathFilter
+
+{
+
+	/** The filters for the values of specific object keys or array indices */
+	protected HashMap<String, JysonPathFilter> children;
+
+	/** The filter for the values of all object keys or array indices, if any */
+	protected JysonPathFilter wildcard;
+
+	/** true if the whole of the value at this path is selected */
+	protected boolean selected;
+
+	protected JysonPathFilter()
+	{
+		children = new HashMap<String, JysonPathFilter>();
+		wildcard = null;
+		selected = false;
+	}
+
+	/**
+	* Compile a sequence of JSON Pointers into a filter
+	*
+	* @param pointers A Jython sequence of JSON Pointer strings
+	* @return The filter selecting the values at all of the given pointers
+	*/
+
+	public static JysonPathFilter compile ( PyObject pointers )
+	{
+		JysonPathFilter root = new JysonPathFilter();
+		if (pointers instanceof PyString)
+			root.add(pointers.toString());
+		else
+		{
+			PyObject iter = pointers.__iter__();
+			for (PyObject pointer ; (pointer = iter.__iternext__()) != null ; )
+				root.add(pointer.toString());
+		}
+		root.merge_wildcards();
+		return root;
+	}
+
+	protected void add ( String pointer )
+	{
+		if (pointer.length() > 0 && pointer.charAt(0) != '/')
+			throw Py.ValueError("JSON pointers must start with '/': '"+pointer+"'");
+		JysonPathFilter node = this;
+		int start = 1;
+		while (start <= pointer.length())
+		{
+			int end = pointer.indexOf('/', start);
+			if (end == -1)
+				end = pointer.length();
+			String token = pointer.substring(start, end);
+			JysonPathFilter next;
+			if ("*".compareTo(token) == 0)
+			{
+				if (node.wildcard == null)
+					node.wildcard = new JysonPathFilter();
+				next = node.wildcard;
+			}
+			else
+			{
+				token = token.replace("~1", "/").replace("~0", "~");
+				next = node.children.get(token);
+				if (next == null)
+				{
+					next = new JysonPathFilter();
+					node.children.put(token, next);
+				}
+			}
+			node = next;
+			start = end + 1;
+		}
+		node.selected = true;
+	}
+
+	/**
+	* Make the filters for specific keys also select everything selected by the wildcard filter alongside them
+	*/
+
+	protected void merge_wildcards ( )
+	{
+		if (wildcard != null)
+		{
+			for (Iterator<JysonPathFilter> it = children.values().iterator() ; it.hasNext() ; )
+				it.next().merge(wildcard);
+			wildcard.merge_wildcards();
+		}
+		for (Iterator<JysonPathFilter> it = children.values().iterator() ; it.hasNext() ; )
+			it.next().merge_wildcards();
+	}
+
+	protected void merge ( JysonPathFilter other )
+	{
+		selected |= other.selected;
+		for (Iterator<Map.Entry<String, JysonPathFilter>> it = other.children.entrySet().iterator() ; it.hasNext() ; )
+		{
+			Map.Entry<String, JysonPathFilter> entry = it.next();
+			JysonPathFilter mine = children.get(entry.getKey());
+			if (mine == null)
+			{
+				mine = new JysonPathFilter();
+				children.put(entry.getKey(), mine);
+			}
+			mine.merge(entry.getValue());
+		}
+		if (other.wildcard != null)
+		{
+			if (wildcard == null)
+				wildcard = new JysonPathFilter();
+			wildcard.merge(other.wildcard);
+		}
+	}
+
+	/**
+	* Return the filter for the value of the given object key, or null if it is not selected
+	*/
+
+	protected JysonPathFilter child ( String key )
+	{
+		if (children.isEmpty())
+			return wildcard;
+		JysonPathFilter result = children.get(key);
+		return result != null ? result : wildcard;
+	}
+
+	/**
+	* Return the filter for the given array element, or null if it is not selected
+	*/
+
+	protected JysonPathFilter child ( int index )
+	{
+		if (children.isEmpty())
+			return wildcard;
+		return child(Integer.toString(index));
+	}
+
+}
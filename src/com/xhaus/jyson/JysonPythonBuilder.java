@@ -0,0 +1,93 @@
+/*
+ * Copyright 2009-2012 Alan Kennedy
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License"); 
+ * you may not use this file except in compliance with the License. 
+ * You may obtain a copy of the License at 
+ *
+ *    http://www.apache.org/licenses/LICENSE-2.0 
+ *
+ * Unless required by applicable law or agreed to in writing, software 
+ * distributed under the License is distributed on an "AS IS" BASIS, 
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+ * See the License for the specific language governing permissions and 
+ * limitations under the License. 
+ *
+ */
+
+package com.xhaus.jyson;
+
+import java.math.BigInteger;
+
+import org.python.core.*;
+
+/**
+ * A JysonBuilder which builds Jython objects: objects are PyStringMaps, arrays are PyLists,
+ * strings are PyUnicodes, integers are PyIntegers or PyLongs, and floats are PyFloats.
+ */
+
+public class JysonPythonBuilder extends JysonBuilder
+
+{
+
+	/** The builder is stateless, so a single instance is shared by all decoders */
+	public static final JysonPythonBuilder INSTANCE = new JysonPythonBuilder();
+
+	public Object new_object ( )
+	{
+		return new PyStringMap(); // PyStringMaps accept only string keys, like JSON
+	}
+
+	public Object new_key ( String key )
+	{
+		return new PyUnicode(key);
+	}
+
+	public void put ( Object json_object, Object key, Object value )
+	{
+		((PyStringMap)json_object).__setitem__((PyObject)key, (PyObject)value);
+	}
+
+	public Object new_array ( )
+	{
+		return new PyList();
+	}
+
+	public void append ( Object json_array, Object value )
+	{
+		((PyList)json_array).append((PyObject)value);
+	}
+
+	public Object new_string ( String s )
+	{
+		return new PyUnicode(s);
+	}
+
+	public Object new_integer ( long value )
+	{
+		if (value >= Integer.MIN_VALUE && value <= Integer.MAX_VALUE)
+			return Py.newInteger((int)value);
+		return new PyLong(value);
+	}
+
+	public Object new_big_integer ( BigInteger value )
+	{
+		return new PyLong(value);
+	}
+
+	public Object new_float ( double value )
+	{
+		return new PyFloat(value);
+	}
+
+	public Object new_boolean ( boolean value )
+	{
+		return value ? Py.True : Py.False;
+	}
+
+	public Object new_null ( )
+	{
+		return Py.None;
+	}
+
+}
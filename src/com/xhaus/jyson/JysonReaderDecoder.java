@@ -0,0 +1,168 @@
+/*
+ * Copyright 2009-2012 Alan Kennedy
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License"); 
+ * you may not use this file except in compliance with the License. 
+ * You may obtain a copy of the License at 
+ *
+ *    http://www.apache.org/licenses/LICENSE-2.0 
+ *
+ * Unless required by applicable law or agreed to in writing, software 
+ * distributed under the License is distributed on an "AS IS" BASIS, 
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+ * See the License for the specific language governing permissions and 
+ * limitations under the License. 
+ *
+ */
+
+package com.xhaus.jyson;
+
+import java.io.IOException;
+import java.io.Reader;
+
+/**
+ * A JysonDecoder which reads its JSON text from a java.io.Reader, in fixed size chunks,
+ * rather than from a single java.lang.String holding the entire text.
+ */
+
+public class JysonReaderDecoder extends JysonDecoder
+
+{
+
+	/** The default number of characters read from the underlying reader at a time */
+	public static final int DEFAULT_BUFFER_SIZE = 8192;
+
+	protected Reader reader;
+
+	protected char[] chunk;
+
+	/** The index in the chunk of the next character to be returned */
+	protected int chunk_pos;
+
+	/** The number of valid characters in the chunk */
+	protected int chunk_len;
+
+	protected boolean at_eof;
+
+	protected JysonReaderDecoder(Reader r)
+	{
+		this(r, DEFAULT_BUFFER_SIZE);
+	}
+
+	protected JysonReaderDecoder(Reader r, int buffer_size)
+	{
+		super(null);
+		reader = r;
+		// One extra slot, so that the last character of a chunk survives a refill, for push()
+		chunk = new char[Math.max(buffer_size, 1) + 1];
+		chunk_pos = 0;
+		chunk_len = 0;
+		at_eof = false;
+	}
+
+	/**
+	* Refill the chunk from the reader, keeping the last character read so that it can still be pushed back.
+	*
+	* @return false if the reader is exhausted
+	*/
+
+	protected boolean fill ( )
+		throws JSONDecodeError
+	{
+		if (at_eof)
+			return false;
+		int keep = 0;
+		if (chunk_len > 0)
+		{
+			chunk[0] = chunk[chunk_len-1];
+			keep = 1;
+		}
+		chunk_pos = keep;
+		chunk_len = keep;
+		try
+		{
+			int n;
+			do {
+				n = reader.read(chunk, keep, chunk.length-keep);
+			} while (n == 0);
+			if (n < 0)
+			{
+				at_eof = true;
+				return false;
+			}
+			chunk_len += n;
+			return true;
+		}
+		catch (IOException iox)
+			{ throw decode_exception("Error reading JSON text: " + iox.getMessage()); }
+	}
+
+	protected void push()
+	{
+		if (chunk_pos > 0)
+		{
+			chunk_pos -= 1;
+			curr_pos -= 1;
+		}
+	}
+
+	protected char get_char ( )
+		throws JSONDecodeError
+	{
+		if (chunk_pos == chunk_len && !fill())
+			return 0;
+		curr_pos++;
+		return chunk[chunk_pos++];
+	}
+
+	protected String get_chars ( int n, String desc )
+		throws JSONDecodeError
+	{
+		char[] next = new char[n];
+		for (int ix = 0 ; ix < n ; ix++)
+		{
+			if (chunk_pos == chunk_len && !fill())
+				{ throw decode_exception("Ran out of characters reading "+desc); }
+			next[ix] = chunk[chunk_pos++];
+			curr_pos++;
+		}
+		return new String(next);
+	}
+
+	protected String get_string(char quote)
+		throws JSONDecodeError
+	{
+		StringBuilder buf = null;
+		while (true)
+		{
+			if (chunk_pos == chunk_len && !fill())
+				throw decode_exception("Line terminators must be escaped inside strings");
+			int start = chunk_pos;
+			int end = start;
+			while (end < chunk_len && !ends_string_run(chunk[end], quote))
+				end++;
+			curr_pos += end - start;
+			chunk_pos = end;
+			if (buf == null && end < chunk_len && chunk[end] == quote)
+			{
+				// The entire string is in this chunk
+				chunk_pos++;
+				curr_pos++;
+				return new String(chunk, start, end - start);
+			}
+			if (buf == null)
+				buf = get_string_buf();
+			buf.append(chunk, start, end - start);
+			if (end == chunk_len)
+				continue; // The run continues into the next chunk
+			char c = chunk[chunk_pos++];
+			curr_pos++;
+			if (c == quote)
+				return buf.toString();
+			if (c != '\\')
+				throw decode_exception("Line terminators must be escaped inside strings");
+			buf.append(decode_escape());
+		}
+	}
+
+}
@@ -0,0 +1,129 @@
+/*
+ * Copyright 2009-2012 Alan Kennedy
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License"); 
+ * you may not use this file except in compliance with the License. 
+ * You may obtain a copy of the License at 
+ *
+ *    http://www.apache.org/licenses/LICENSE-2.0 
+ *
+ * Unless required by applicable law or agreed to in writing, software 
+ * distributed under the License is distributed on an "AS IS" BASIS, 
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+ * See the License for the specific language governing permissions and 
+ * limitations under the License. 
+ *
+ */
+
+package com.xhaus.jyson;
+
+import java.util.ArrayList;
+
+/**
+ * A JysonDecoder which decodes JSON objects into records, following a compiled JysonSchema.
+ * <br/><br/>
+ * The schema of every open array and object is kept on a stack alongside its frame, and the type of every value
+ * is checked against the schema of the array or object containing it as soon as its first character is read.
+ * The values of the fields of a record are collected into an array, in the order of the fields, and members which
+ * are not fields of the record are skipped without being decoded.
+ */
+
+public class JysonRecordDecoder extends JysonDecoder
+
+{
+
+	/** Returned instead of the value of a member which is not a field of its record, and has been skipped */
+	protected static final Object SKIPPED = new Object();
+
+	protected JysonSchema root;
+
+	/** The schemas of the open arrays and objects, innermost last, in step with the stack of frames */
+	protected ArrayList<JysonSchema> schemas = new ArrayList<JysonSchema>();
+
+	/** The schema of the array or object being opened by start_value() */
+	protected JysonSchema opening = JysonSchema.ANY;
+
+	protected JysonRecordDecoder(JysonSchema r)
+	{
+		super(null);
+		root = r;
+	}
+
+	protected void reset ( String s )
+	{
+		super.reset(s);
+		schemas.clear();
+	}
+
+	/**
+	* Return the schema of the value starting at the current position, or null if it is a member of a record which is not one of its fields
+	*/
+
+	protected JysonSchema value_schema ( )
+	{
+		if (stack.isEmpty())
+			return root;
+		Frame frame = stack.get(stack.size()-1);
+		return schemas.get(schemas.size()-1).member(frame.is_object ? frame.key : null);
+	}
+
+	protected Object open_container ( Object container, boolean is_object )
+		throws JSONDecodeError
+	{
+		Object result = super.open_container(container, is_object);
+		schemas.add(opening);
+		return result;
+	}
+
+	protected Object close_container ( )
+		throws JSONDecodeError
+	{
+		JysonSchema schema = schemas.remove(schemas.size()-1);
+		Object container = super.close_container();
+		if (schema.kind == JysonSchema.KIND_RECORD)
+			return schema.new_record((Object[])container, this);
+		return container;
+	}
+
+	protected Object start_value ( char c )
+		throws JSONDecodeError
+	{
+		JysonSchema expected = value_schema();
+		if (expected == null)
+		{
+			push();
+			skip_value();
+			return SKIPPED;
+		}
+		JysonSchema schema = expected.select(c);
+		if (schema == null)
+		{
+			if (c == 0)
+				{ throw decode_exception("Ran out of characters reading "+expected.describe()); }
+			throw decode_exception("Expected "+expected.describe()+", not '"+c+"'");
+		}
+		opening = schema;
+		if (schema.kind == JysonSchema.KIND_RECORD)
+			return open_container(new Object[schema.field_names.length], true);
+		Object value = super.start_value(c);
+		if (value != OPENED && !expected.accepts(c, value))
+			throw decode_exception("Expected "+expected.describe()+", not a fraction or exponent");
+		return value;
+	}
+
+	protected Object add_member ( Object value )
+		throws JSONDecodeError
+	{
+		JysonSchema schema = schemas.get(schemas.size()-1);
+		if (schema.kind != JysonSchema.KIND_RECORD)
+			return super.add_member(value);
+		Frame frame = stack.get(stack.size()-1);
+		if (value != SKIPPED)
+			((Object[])frame.container)[schema.field_position(frame.key)] = value;
+		frame.count++;
+		if (end_member(frame))
+			return close_container();
+		return next_member();
+	}
+
+}
@@ -0,0 +1,271 @@
+/*
+ * Copyright 2009-2012 Alan Kennedy
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License"); 
+ * you may not use this file except in compliance with the License. 
+ * You may obtain a copy of the License at 
+ *
+ *    http://www.apache.org/licenses/LICENSE-2.0 
+ *
+ * Unless required by applicable law or agreed to in writing, software 
+ * distributed under the License is distributed on an "AS IS" BASIS, 
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+ * See the License for the specific language governing permissions and 
+ * limitations under the License. 
+ *
+ */
+
+package com.xhaus.jyson;
+
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.HashMap;
+import java.util.LinkedHashMap;
+import java.util.Map;
+
+import org.python.core.*;
+
+/**
+ * A bounded cache of decoded objects, keyed by the contents of their JSON texts and the options of the decoder,
+ * so that a JSON text which is decoded repeatedly is only decoded once. When the cache is full, the least
+ * recently used result is evicted.
+ * <br/><br/>
+ * The cached objects are never returned themselves: each call is given a copy of the arrays and objects of the
+ * result, which shares its (immutable) strings and numbers, unless the cache is created to return shared results,
+ * in which case they must not be modified. Only results built by the "python" and "java" targets are cached,
+ * and only from JSON texts of at most MAX_TEXT_LENGTH characters. The cache is shared by the decoders of every
+ * thread using a codec instance, so all access is synchronized.
+ */
+
+public class JysonResultCache
+
+{
+
+	/** The longest JSON text whose result is cached */
+	public static final int MAX_TEXT_LENGTH = 65536;
+
+	/** A JSON text, and the decoder options with which it is decoded */
+	protected static class Key
+	{
+		String json_text;
+		Object[] options;
+		int hash;
+
+		Key(String t, JysonDecoder decoder)
+		{
+			json_text = t;
+			options = new Object[] {
+				decoder.accept_any_primary_datum, decoder.accept_dangling_commas,
+				decoder.accept_shell_style_comments, decoder.accept_single_quoted_strings,
+				decoder.accept_hex_char_escapes, decoder.accept_hexadecimal_integers,
+				decoder.accept_octal_integers, decoder.accept_junk_after_data,
+				decoder.max_depth, decoder.parse_float, decoder.parse_int, decoder.builder,
+			};
+			hash = json_text.hashCode() * 31 + Arrays.hashCode(options);
+		}
+
+		public int hashCode ( )
+		{
+			return hash;
+		}
+
+		public boolean equals ( Object other )
+		{
+			if (!(other instanceof Key))
+				return false;
+			Key key = (Key)other;
+			return hash == key.hash && json_text.equals(key.json_text) && Arrays.equals(options, key.options);
+		}
+	}
+
+	protected int capacity;
+
+	protected boolean shared;
+
+	protected long hits = 0;
+
+	protected long misses = 0;
+
+	protected long evictions = 0;
+
+	protected Map<Key, Object> results;
+
+	public JysonResultCache(int c, boolean s)
+	{
+		capacity = c;
+		shared = s;
+		results = new LinkedHashMap<Key, Object>(16, 0.75f, true)
+		{
+			protected boolean removeEldestEntry ( Map.Entry<Key, Object> eldest )
+			{
+				if (size() <= capacity)
+					return false;
+				evictions++;
+				return true;
+			}
+		};
+	}
+
+	/**
+	* Return the key of the result of decoding a JSON text with the given decoder, or null if the result should not be cached
+	*/
+
+	public Key key ( String json_text, JysonDecoder decoder )
+	{
+		if (json_text.length() > MAX_TEXT_LENGTH || decoder.selection != null ||
+			!(decoder.builder == JysonPythonBuilder.INSTANCE || decoder.builder == JysonJavaBuilder.INSTANCE))
+			return null;
+		return new Key(json_text, decoder);
+	}
+
+	/**
+	* Return (a copy of) the cached result for the given key, or null if it is not in the cache
+	*/
+
+	public Object get_result ( Key key )
+	{
+		Object result;
+		synchronized (this)
+		{
+			result = results.get(key);
+			if (result == null)
+			{
+				misses++;
+				return null;
+			}
+			hits++;
+		}
+		return shared ? result : copy(result);
+	}
+
+	/**
+	* Cache the result for the given key, returning (a copy of) it for the caller
+	*/
+
+	public Object put_result ( Key key, Object result )
+	{
+		if (result == null)
+			return null;
+		synchronized (this)
+			{ results.put(key, result); }
+		return shared ? result : copy(result);
+	}
+
+	public synchronized void clear ( )
+	{
+		results.clear();
+	}
+
+	/**
+	* Return a copy of a value if it is an array or object, or the value itself otherwise
+	*/
+
+	protected static Object shallow_copy ( Object value )
+	{
+		if (value instanceof PyStringMap)
+			return ((PyStringMap)value).copy();
+		if (value instanceof PyList)
+		{
+			// Copy element by element: the list's backing array may have spare capacity beyond its length
+			PyList list = (PyList)value;
+			PyList list_copy = new PyList();
+			for (int ix = 0 ; ix < list.__len__() ; ix++)
+				list_copy.append(list.__getitem__(ix));
+			return list_copy;
+		}
+		if (value instanceof HashMap)
+			return new HashMap<Object, Object>((HashMap<?, ?>)value);
+		if (value instanceof ArrayList)
+			return new ArrayList<Object>((ArrayList<?>)value);
+		return value;
+	}
+
+	/**
+	* Return a copy of the arrays and objects of a decoded value. Nested values are copied from an explicit list
+	* of the copies whose elements are still to be copied, rather than by recursion.
+	*/
+
+	@SuppressWarnings("unchecked")
+	protected static Object copy ( Object value )
+	{
+		Object result = shallow_copy(value);
+		ArrayList<Object> pending = new ArrayList<Object>();
+		if (result != value)
+			pending.add(result);
+		while (!pending.isEmpty())
+		{
+			Object container = pending.remove(pending.size()-1);
+			if (container instanceof PyStringMap)
+			{
+				PyStringMap map = (PyStringMap)container;
+				PyList keys = map.keys();
+				for (int ix = 0 ; ix < keys.__len__() ; ix++)
+				{
+					PyObject k = keys.__getitem__(ix);
+					PyObject element = map.__finditem__(k);
+					Object element_copy = shallow_copy(element);
+					if (element_copy != element)
+					{
+						map.__setitem__(k, (PyObject)element_copy);
+						pending.add(element_copy);
+					}
+				}
+			}
+			else if (container instanceof PyList)
+			{
+				PyList list = (PyList)container;
+				for (int ix = 0 ; ix < list.__len__() ; ix++)
+				{
+					PyObject element = list.__getitem__(ix);
+					Object element_copy = shallow_copy(element);
+					if (element_copy != element)
+					{
+						list.__setitem__(ix, (PyObject)element_copy);
+						pending.add(element_copy);
+					}
+				}
+			}
+			else if (container instanceof HashMap)
+			{
+				for (Map.Entry<Object, Object> entry : ((HashMap<Object, Object>)container).entrySet())
+				{
+					Object element_copy = shallow_copy(entry.getValue());
+					if (element_copy != entry.getValue())
+					{
+						entry.setValue(element_copy);
+						pending.add(element_copy);
+					}
+				}
+			}
+			else
+			{
+				ArrayList<Object> list = (ArrayList<Object>)container;
+				for (int ix = 0 ; ix < list.size() ; ix++)
+				{
+					Object element_copy = shallow_copy(list.get(ix));
+					if (element_copy != list.get(ix))
+					{
+						list.set(ix, element_copy);
+						pending.add(element_copy);
+					}
+				}
+			}
+		}
+		return result;
+	}
+
+	/**
+	* Return a dictionary of the number of hits, misses and evictions, and the number of cached results
+	*/
+
+	public synchronized PyDictionary stats ( )
+	{
+		PyDictionary result = new PyDictionary();
+		result.__setitem__("hits", Py.newLong(hits));
+		result.__setitem__("misses", Py.newLong(misses));
+		result.__setitem__("evictions", Py.newLong(evictions));
+		result.__setitem__("size", Py.newInteger(results.size()));
+		return result;
+	}
+
+}
@@ -0,0 +1,329 @@
+/*
+ * Copyright 2009-2012 Alan Kennedy
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License"); 
+ * you may not use this file except in compliance with the License. 
+ * You may obtain a copy of the License at 
+ *
+ *    http://www.apache.org/licenses/LICENSE-2.0 
+ *
+ * Unless required by applicable law or agreed to in writing, software 
+ * distributed under the License is distributed on an "AS IS" BASIS, 
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. 
+ * See the License for the specific language governing permissions and 
+ * limitations under the License. 
+ *
+ */
+
+package com.xhaus.jyson;
+
+import java.util.HashMap;
+import java.util.Map;
+
+import org.python.core.*;
+
+/**
+ * A schema for decoded values, compiled from a specification of their types by <b>JysonCodec.compile()</b>.
+ * <br/><br/>
+ * The schema of a record maps the keys of a JSON object to the positional fields of a record class,
+ * in the order of its <b>__slots__</b>. A JysonRecordDecoder follows the schema as it decodes, checking the
+ * type of every value as it is read, and collecting the fields of each record into an array, from which
+ * the record is constructed with a single call: no dictionary is built for the object. The types are specified as
+ * <ul>
+ * <li><b>str</b> or <b>unicode</b>, <b>int</b> or <b>long</b> (integers), <b>float</b> (any number), <b>bool</b>, and <b>type(None)</b> (null)</li>
+ * <li><b>list</b> and <b>dict</b>: an array or object of any values</li>
+ * <li><b>[spec]</b>: an array of values of the type <b>spec</b></li>
+ * <li>a tuple of specs: a value of any one of the types, e.g. <b>(int, type(None))</b></li>
+ * <li><b>None</b>: any value</li>
+ * <li>a (previously compiled) JysonSchema: a nested record</li>
+ * </ul>
+ */
+
+public class JysonSchema
+
+{
+
+	protected static final int KIND_ANY = 0;
+	protected static final int KIND_STRING = 1;
+	protected static final int KIND_INTEGER = 2;
+	protected static final int KIND_FLOAT = 3;
+	protected static final int KIND_BOOLEAN = 4;
+	protected static final int KIND_NULL = 5;
+	protected static final int KIND_ARRAY = 6;
+	protected static final int KIND_OBJECT = 7;
+	protected static final int KIND_RECORD = 8;
+	protected static final int KIND_UNION = 9;
+
+	protected static final JysonSchema ANY = new JysonSchema(KIND_ANY);
+
+	protected int kind;
+
+	/** The schema of the elements of an array */
+	protected JysonSchema element = ANY;
+
+	/** The alternative schemas of a union */
+	protected JysonSchema[] alternatives;
+
+	/** For records: the class, and the names, schemas and (by name) positions of its fields */
+	protected PyObject record_class;
+
+	protected String[] field_names;
+
+	protected JysonSchema[] field_schemas;
+
+	protected Map<String, Integer> field_positions;
+
+	/** For records compiled by a codec: the codec whose options are used to decode them, and a decoder for each thread */
+	protected JysonCodec codec;
+
+	protected ThreadLocal<JysonRecordDecoder> decoders = new ThreadLocal<JysonRecordDecoder>();
+
+	protected JysonSchema(int k)
+	{
+		kind = k;
+	}
+
+	/**
+	* Compile the schema of a record class from a dictionary of the types of its fields
+	*/
+
+	protected static JysonSchema compile_record ( JysonCodec codec, PyObject fields, PyObject record_class )
+	{
+		PyObject slots = record_class.__findattr__("__slots__");
+		if (slots == null)
+			throw Py.TypeError("Record classes must define __slots__, which sets the order of their fields");
+		if (slots instanceof PyString)
+			slots = new PyTuple(new PyObject[] {slots});
+		JysonSchema schema = new JysonSchema(KIND_RECORD);
+		schema.codec = codec;
+		schema.record_class = record_class;
+		schema.field_names = new String[slots.__len__()];
+		schema.field_schemas = new JysonSchema[schema.field_names.length];
+		schema.field_positions = new HashMap<String, Integer>();
+		for (int ix = 0 ; ix < schema.field_names.length ; ix++)
+		{
+			schema.field_names[ix] = slots.__getitem__(ix).toString();
+			schema.field_schemas[ix] = ANY;
+			schema.field_positions.put(schema.field_names[ix], ix);
+		}
+		PyObject keys = fields.invoke("keys");
+		for (int ix = 0 ; ix < keys.__len__() ; ix++)
+		{
+			PyObject key = keys.__getitem__(ix);
+			Integer position = schema.field_positions.get(key.toString());
+			if (position == null)
+				throw Py.TypeError("'"+key+"' is not one of the __slots__ of the record class");
+			schema.field_schemas[position] = compile(fields.__getitem__(key));
+		}
+		return schema;
+	}
+
+	/**
+	* Compile the specification of a type
+	*/
+
+	protected static JysonSchema compile ( PyObject spec )
+	{
+		if (spec == Py.None)
+			return ANY;
+		Object java_obj = spec.__tojava__(JysonSchema.class);
+		if (java_obj != Py.NoConversion)
+			return (JysonSchema)java_obj;
+		if (spec instanceof PyList)
+		{
+			if (spec.__len__() != 1)
+				throw Py.TypeError("The type of an array must be specified as a list of one type: [type]");
+			JysonSchema schema = new JysonSchema(KIND_ARRAY);
+			schema.element = compile(spec.__getitem__(0));
+			return schema;
+		}
+		if (spec instanceof PyTuple)
+		{
+			JysonSchema schema = new JysonSchema(KIND_UNION);
+			schema.alternatives = new JysonSchema[spec.__len__()];
+			for (int ix = 0 ; ix < schema.alternatives.length ; ix++)
+				schema.alternatives[ix] = compile(spec.__getitem__(ix));
+			return schema;
+		}
+		if (spec == PyType.fromClass(PyString.class) || spec == PyType.fromClass(PyUnicode.class))
+			return new JysonSchema(KIND_STRING);
+		if (spec == PyType.fromClass(PyInteger.class) || spec == PyType.fromClass(PyLong.class))
+			return new JysonSchema(KIND_INTEGER);
+		if (spec == PyType.fromClass(PyFloat.class))
+			return new JysonSchema(KIND_FLOAT);
+		if (spec == PyType.fromClass(PyBoolean.class))
+			return new JysonSchema(KIND_BOOLEAN);
+		if (spec == Py.None.getType())
+			return new JysonSchema(KIND_NULL);
+		if (spec == PyType.fromClass(PyList.class))
+			return new JysonSchema(KIND_ARRAY);
+		if (spec == PyType.fromClass(PyDictionary.class))
+			return new JysonSchema(KIND_OBJECT);
+		if (spec instanceof PyDictionary || spec instanceof PyStringMap)
+			throw Py.TypeError("Nested records must be compiled separately, with compile()");
+		throw Py.TypeError("Unsupported type in schema: "+spec.__repr__());
+	}
+
+	/**
+	* Return the schema (or, for a union, the alternative) which accepts a value starting with the given character, or null if there is none
+	*/
+
+	protected JysonSchema select ( char c )
+	{
+		switch (kind)
+		{
+			case KIND_ANY:
+				return this;
+			case KIND_STRING:
+				return c == '"' || c == '\'' ? this : null;
+			case KIND_INTEGER:
+			case KIND_FLOAT:
+				return c == '-' || c == '+' || c == '.' || (c >= '0' && c <= '9') ? this : null;
+			case KIND_BOOLEAN:
+				return c == 't' || c == 'f' ? this : null;
+			case KIND_NULL:
+				return c == 'n' ? this : null;
+			case KIND_ARRAY:
+				return c == '[' ? this : null;
+			case KIND_OBJECT:
+			case KIND_RECORD:
+				return c == '{' ? this : null;
+			default:
+				for (int ix = 0 ; ix < alternatives.length ; ix++)
+				{
+					JysonSchema alternative = alternatives[ix].select(c);
+					if (alternative != null)
+						return alternative;
+				}
+				return null;
+		}
+	}
+
+	/**
+	* Return whether a decoded value, which started with the given character, is accepted: only numbers need to be
+	* checked after they are decoded, since an integer field does not accept fractions or exponents
+	*/
+
+	protected boolean accepts ( char c, Object value )
+	{
+		if (kind == KIND_UNION)
+		{
+			for (int ix = 0 ; ix < alternatives.length ; ix++)
+				if (alternatives[ix].select(c) != null && alternatives[ix].accepts(c, value))
+					return true;
+			return false;
+		}
+		if (kind == KIND_INTEGER)
+			return value instanceof PyInteger || value instanceof PyLong;
+		return true;
+	}
+
+	protected boolean accepts_null ( )
+	{
+		return select('n') != null;
+	}
+
+	/**
+	* Return the schema of the value of a member of an array or object with this schema, or null if it is not a field of a record
+	*/
+
+	protected JysonSchema member ( String key )
+	{
+		switch (kind)
+		{
+			case KIND_ARRAY:
+				return element;
+			case KIND_RECORD:
+				Integer position = field_positions.get(key);
+				return position == null ? null : field_schemas[position];
+			default:
+				return ANY;
+		}
+	}
+
+	protected int field_position ( String key )
+	{
+		return field_positions.get(key);
+	}
+
+	/**
+	* Construct a record from the values of its fields, in order: fields which are missing from the JSON object are None
+	*/
+
+	protected PyObject new_record ( Object[] values, JysonDecoder decoder )
+		throws JSONDecodeError
+	{
+		PyObject[] args = new PyObject[values.length];
+		for (int ix = 0 ; ix < values.length ; ix++)
+		{
+			if (values[ix] != null)
+				args[ix] = (PyObject)values[ix];
+			else if (field_schemas[ix].accepts_null())
+				args[ix] = Py.None;
+			else
+				throw decoder.decode_exception("The '"+field_names[ix]+"' member of "+describe()+" is missing");
+		}
+		return record_class.__call__(args);
+	}
+
+	protected String describe ( )
+	{
+		switch (kind)
+		{
+			case KIND_ANY:
+				return "any value";
+			case KIND_STRING:
+				return "a string";
+			case KIND_INTEGER:
+				return "an integer";
+			case KIND_FLOAT:
+				return "a number";
+			case KIND_BOOLEAN:
+				return "a boolean";
+			case KIND_NULL:
+				return "null";
+			case KIND_ARRAY:
+				return "an array";
+			case KIND_OBJECT:
+				return "an object";
+			case KIND_RECORD:
+				return "a '"+record_class.__findattr__("__name__")+"' record";
+			default:
+				StringBuilder buf = new StringBuilder();
+				for (int ix = 0 ; ix < alternatives.length ; ix++)
+				{
+					if (ix > 0)
+						buf.append(" or ");
+					buf.append(alternatives[ix].describe());
+				}
+				return buf.toString();
+		}
+	}
+
+	/**
+	* Decode a JSON text into a record of this schema, with the options of the codec which compiled it
+	*
+	* @param json_text A java.lang.String containing the JSON text to be decoded
+	* @return The record corresponding to the JSON text
+	* @throws JSONDecodeError If an error occurred while decoding the JSON text, or it did not match the schema
+	*/
+
+	public PyObject decode ( PyObject json_text )
+		throws JSONDecodeError
+	{
+		JysonRecordDecoder decoder = decoders.get();
+		if (decoder == null)
+		{
+			decoder = new JysonRecordDecoder(this);
+			decoders.set(decoder);
+		}
+		codec.configure_decoder(decoder);
+		decoder.builder = JysonPythonBuilder.INSTANCE;
+		decoder.reset(json_text.toString());
+		try
+			{ return (PyObject)decoder.get_top_level_object(); }
+		finally
+			{ decoder.reset(null); }
+	}
+
+}
@@ -15,6 +15,7 @@
 #
 
 import java
+import os
 import sys
 import types
 import unittest
@@ -36,6 +37,14 @@ def compareArrayToList(l, a):
 		if l[ix] != a[ix]:
 			raise AssertionError("Arrays differ at element %d: %s != %s" % (ix, l[ix], a[ix]))
 
+def decodedToPython(o):
+	# PyStringMaps do not compare equal to dictionaries, so convert them
+	if hasattr(o, 'keys'):
+		return dict([(k, decodedToPython(o[k])) for k in o.keys()])
+	if isinstance(o, types.ListType):
+		return [decodedToPython(v) for v in o]
+	return o
+
 class MyTestClass:
 
 	def __init__(self):
@@ -166,6 +175,21 @@ class TestDecodeStrings(JysonTest):
 		else:
 			self.fail("Unterminated string should have raised JSONDecodeError")
 
+	def testDecodeStringsWithRunsBetweenEscapes(self):
+		for jyson_string in [r'"\n"', r'"\nstart"', r'"end\n"', r'"mid\tdle"', r'"\t\t\t"', \
+			r'"a\"b\"c"', r'"run one\u00e1run two\\run three"', '"%s\\n%s"' % ('x' * 1000, 'y' * 1000)]:
+			py_string = eval('u' + jyson_string)
+			self.failUnlessEqual([py_string, py_string], self.decoder('[%s, %s]' % (jyson_string, jyson_string)))
+
+	def testDecodeStringWithUnescapedLineTerminator(self):
+		for s in ['["abc\ndef"]', '["\\nabc\rdef"]']:
+			try:
+				obj = self.decoder(s)
+			except JSONDecodeError:
+				pass
+			else:
+				self.fail("Unescaped line terminator in %s should have raised JSONDecodeError" % repr(s))
+
 	def testDecodeSingleQuotedStringRaisesException(self):
 		s = "['Alan Kennedy']"
 		try:
@@ -254,6 +278,13 @@ class TestEncodeStrings(JysonTest):
 		u = u'\N{GREEK SMALL LETTER ALPHA}\N{GREEK CAPITAL LETTER OMEGA}'
 		self.failUnlessEqual(self.encoder(u), u'"\u03b1\u03a9"')
 
+	def testEncodeStringsWithRunsBetweenEscapes(self):
+		for jyson_string in [r'"\n"', r'"\nstart"', r'"end\n"', r'"mid\tdle"', r'"\t\t\t"', r'"a\"b\"c"', \
+			r'"run one\u0001run two\\run three"', r'"\u001Fx\u0000"', '"%s\\n%s"' % ('x' * 1000, 'y' * 100000)]:
+			py_string = eval('u' + jyson_string)
+			self.failUnlessEqual('[%s,%s]' % (jyson_string, jyson_string), self.encoder([py_string, py_string]))
+		self.failUnlessEqual(r'"\u007F\u00FF\u0100"', self.encoder(u'\u007f\u00ff\u0100', emit_ascii=True))
+
 class TestSupplementaryCharacters(JysonTest):
 
 	def testEncodeStringWithSurrogate(self):
@@ -381,6 +412,47 @@ class TestDecodeNumbers(JysonTest):
 		jyson_result = self.decoder('['+electron_mass.upper()+']')
 		self.failUnless((jyson_result[0] + float(electron_mass)) < 0.00000001)
 
+	def testDecodeLongIntegers(self):
+		for value in ['999999999999999999', '-999999999999999999', '1000000000000000000', \
+			'123456789012345678901234567890', '-123456789012345678901234567890']:
+			jyson_result = self.decoder('[%s]' % value)
+			self.failUnlessEqual(type(jyson_result[0]), types.LongType)
+			self.failUnlessEqual(jyson_result[0], long(value))
+
+	def testDecodeFloatsCorrectlyRounded(self):
+		for value in ['0.1', '0.3', '-2.5e-3', '1.7976931348623157e308', '4.9e-324', '2.2250738585072014e-308', \
+			'9007199254740993.0', '0.30000000000000004', '123456789.123456789', '1e23', '8.41e21', \
+			'3.14159265358979323846264338327950288', '0.000000000000000000000000000001', '1E+2', '-0.0']:
+			jyson_result = self.decoder('[%s]' % value)
+			self.failUnlessEqual(type(jyson_result[0]), types.FloatType)
+			self.failUnlessEqual(repr(jyson_result[0]), repr(float(value)))
+
+	def testDecodeInvalidNumbersRaiseException(self):
+		for value in ['-', '+', '.', '-.', '1e', '1e+', '1.5E-', '1x', '1.2.3', '--1', '1-', '0.5a']:
+			try:
+				jyson_result = self.decoder('[%s]' % value)
+			except JSONDecodeError:
+				pass
+			else:
+				self.fail("Invalid number '%s' should have raised JSONDecodeError" % value)
+
+	def testDecodeNumbersAcceptedByJavaParsers(self):
+		# The numbers which the Java parsers accepted before the single pass scanner are still accepted
+		for value, expected in [('-012', -12), ('+012', 12), ('-00', 0), ('-012.5', -12.5), ('+5', 5), \
+			('-0e5', -0.0), ('1.5d', 1.5), ('2D', 2.0), ('1e5f', 100000.0), ('-012345678901234567890', -12345678901234567890L)]:
+			jyson_result = self.decoder('[%s]' % value)
+			self.failUnlessEqual(repr([expected]), repr(jyson_result))
+		self.failUnlessEqual(types.IntType, type(self.decoder('[-012]')[0]))
+		self.failUnlessEqual([-1e400, 1e400], self.decoder('[-Infinity, +Infinity]'))
+		nan = self.decoder('[-NaN]')[0]
+		self.failIf(nan == nan)
+
+	def testDecodeNumbersRejectedByJavaParsers(self):
+		for value in ['0e5', '0E1', '00.5', '-0x1A', 'Infinity', '-Inf', '1 2']:
+			self.assertRaises(JSONDecodeError, self.decoder, '[%s]' % value)
+		self.assertRaises(JSONDecodeError, self.decoder, '[-0x1A]', accept_hexadecimal_integers=True)
+		self.assertRaises(JSONDecodeError, self.decoder, '[0e5]', accept_octal_integers=True)
+
 	def testDecodeOctalIntegerRaisesException(self):
 		try:
 			jyson_result = self.decoder('[010]')
@@ -446,6 +518,24 @@ class TestDecodeNumberOptions(JysonTest):
 			else:
 				self.fail("Invalid hex constant should have raised JSONDecodeError")
 
+	def testDecodeParseFloat(self):
+		import decimal
+		jyson_result = self.decoder('[1.10, 2, -3.5e-2]', parse_float=decimal.Decimal)
+		self.failUnlessEqual(decimal.Decimal('1.10'), jyson_result[0])
+		self.failUnlessEqual(types.IntType, type(jyson_result[1]))
+		self.failUnlessEqual(decimal.Decimal('-3.5e-2'), jyson_result[2])
+
+	def testDecodeParseInt(self):
+		jyson_result = self.decoder('[1, -2, 3.5]', parse_int=long)
+		self.failUnlessEqual([1L, -2L], [jyson_result[0], jyson_result[1]])
+		self.failUnlessEqual(types.LongType, type(jyson_result[0]))
+		self.failUnlessEqual(types.FloatType, type(jyson_result[2]))
+
+	def testDecodeParseIntOnCodecInstance(self):
+		self.codec.parse_int = float
+		self.failUnlessEqual([1.0], self.codec.decode('[1]'))
+		self.failUnlessEqual(types.FloatType, type(self.codec.decode('[1]')[0]))
+
 class TestDecodeConstants(JysonTest):
 
 	# Should this fail? True != 1
@@ -1018,5 +1108,1152 @@ class TestVariousOptions(JysonTest):
 		else:
 			self.fail("Object with dangling commas should have raised exception, even with accept_dangling_commas enabled")
 
+class TestLoadFromFile(JysonTest):
+
+	json_text = """{"key": [1, 2.5, "three", true, null], /* comment */ "other": {"nested": "value"}, "esc": "a\\tb\\u00e1c"}"""
+
+	def _checkResult(self, obj):
+		self.assertArrayEqual([1, 2.5, "three", True, None], obj['key'])
+		self.assertObjectEqual({'nested': 'value'}, obj['other'])
+		self.failUnlessEqual(u'a\tb\u00e1c', obj['esc'])
+
+	def testLoadFromJavaReader(self):
+		self._checkResult(self.codec.load(java.io.StringReader(self.json_text)))
+
+	def testLoadFromJavaInputStream(self):
+		stream = java.io.ByteArrayInputStream(java.lang.String(self.json_text).getBytes("UTF-8"))
+		self._checkResult(self.codec.load(stream))
+
+	def testLoadFromPythonFile(self):
+		import StringIO
+		self._checkResult(self.codec.load(StringIO.StringIO(self.json_text)))
+
+	def testLoadFromBinaryPythonFileDecodesUtf8(self):
+		import StringIO
+		text = u'["\u00e9\u20ac", "\U0001f600"]'
+		utf8 = text.encode("utf-8")
+		stream = java.io.ByteArrayInputStream(java.lang.String(text).getBytes("UTF-8"))
+		expected = self.codec.load(stream)
+		self.failUnlessEqual([u'\u00e9\u20ac', u'\U0001f600'], expected)
+		for buffer_size in range(1, 6):
+			self.failUnlessEqual(expected, self.codec.load(StringIO.StringIO(utf8), buffer_size=buffer_size))
+		self.failUnlessEqual(expected, self.codec.load(StringIO.StringIO(text)))
+		self.assertRaises(JSONDecodeError, self.codec.load, StringIO.StringIO(utf8[:-3]))
+
+	def testLoadWithSmallBuffer(self):
+		# Every token straddles a chunk boundary at some buffer size
+		for buffer_size in range(1, 20):
+			self._checkResult(self.codec.load(java.io.StringReader(self.json_text), buffer_size=buffer_size))
+
+	def testLoadAcceptsOptions(self):
+		obj = self.codec.load(java.io.StringReader("[1,2,3,]"), accept_dangling_commas=True)
+		self.assertArrayEqual([1,2,3], obj)
+
+	def testLoadRaisesDecodeError(self):
+		for bad_text in ['[1,2', '{"key": }', '["unterminated]']:
+			try:
+				self.codec.load(java.io.StringReader(bad_text), buffer_size=2)
+			except JSONDecodeError:
+				pass
+			else:
+				self.fail("Loading bad JSON text >>>%s<<< should have raised JSONDecodeError" % bad_text)
+
+class TestDumpToFile(JysonTest):
+
+	py_object = {'key': [1, 2.5, u'thr\u00e9e', True, None, (4, 5)], 'other': {'nested': 'value'}}
+
+	def testDumpToJavaWriter(self):
+		writer = java.io.StringWriter()
+		self.codec.dump(self.py_object, writer)
+		self.failUnlessEqual(self.encoder(self.py_object), writer.toString())
+
+	def testDumpToJavaOutputStream(self):
+		stream = java.io.ByteArrayOutputStream()
+		self.codec.dump(self.py_object, stream)
+		self.failUnlessEqual(self.encoder(self.py_object), stream.toString("UTF-8"))
+
+	def testDumpToPythonFile(self):
+		import StringIO
+		f = StringIO.StringIO()
+		self.codec.dump(self.py_object, f, emit_ascii=True)
+		self.failUnlessEqual(self.encoder(self.py_object, emit_ascii=True), f.getvalue())
+
+	def testIterencodeChunks(self):
+		expected = self.encoder(self.py_object)
+		for chunk_size in range(1, len(expected)+2):
+			chunks = list(self.codec.iterencode(self.py_object, chunk_size))
+			self.failUnlessEqual(expected, "".join(chunks))
+			for chunk in chunks[:-1]:
+				self.failUnless(len(chunk) >= chunk_size)
+
+	def testIterencodeScalar(self):
+		self.failUnlessEqual(['"Hello World"'], list(self.codec.iterencode("Hello World")))
+
+	def testIterencodeJavaCollections(self):
+		java_list = java.util.ArrayList()
+		java_list.add(1)
+		java_list.add("two")
+		py_object = {"a": java_list}
+		chunks = list(self.codec.iterencode(py_object, chunk_size=1))
+		self.failUnlessEqual('{"a":[1,"two"]}', "".join(chunks))
+		self.failUnless(len(chunks) > 1)
+
+	def testIterencodeStopsAfterEncodeError(self):
+		chunks = self.codec.iterencode([[1], [2, int], [3]], chunk_size=1)
+		self.failUnlessEqual(['[', '[', '1', ']', ',[', '2'], [chunks.next() for i in range(6)])
+		self.assertRaises(JSONEncodeError, chunks.next)
+		self.failUnlessEqual([], list(chunks))
+
+	def testIterencodeRaisesEncodeError(self):
+		try:
+			list(self.codec.iterencode([1, 2, int], chunk_size=1))
+		except JSONEncodeError:
+			pass
+		else:
+			self.fail("Encoding function should have raised exception")
+
+class TestParseEvents(JysonTest):
+
+	def testEventsAndPaths(self):
+		json_text = """{"a": [1, "two", {"b": null}], "c": true}"""
+		expected = [
+			('start_map', None, ()),
+			('map_key', 'a', ()),
+			('start_array', None, ('a',)),
+			('number', 1, ('a', 0)),
+			('string', 'two', ('a', 1)),
+			('start_map', None, ('a', 2)),
+			('map_key', 'b', ('a', 2)),
+			('null', None, ('a', 2, 'b')),
+			('end_map', None, ('a', 2)),
+			('end_array', None, ('a',)),
+			('map_key', 'c', ()),
+			('boolean', True, ('c',)),
+			('end_map', None, ()),
+		]
+		self.failUnlessEqual(expected, list(self.codec.parse_events(json_text)))
+
+	def testEventsFromFile(self):
+		json_text = """[[], {}, 2.5]"""
+		expected = [
+			('start_array', None, ()),
+			('start_array', None, (0,)),
+			('end_array', None, (0,)),
+			('start_map', None, (1,)),
+			('end_map', None, (1,)),
+			('number', 2.5, (2,)),
+			('end_array', None, ()),
+		]
+		self.failUnlessEqual(expected, list(self.codec.parse_events(java.io.StringReader(json_text), buffer_size=1)))
+
+	def testEventsAcceptOptions(self):
+		events = list(self.codec.parse_events("[1,]", accept_dangling_commas=True))
+		self.failUnlessEqual(['start_array', 'number', 'end_array'], [e[0] for e in events])
+		events = list(self.codec.parse_events("1", accept_any_primary_datum=True))
+		self.failUnlessEqual([('number', 1, ())], events)
+
+	def testEventsRaiseDecodeError(self):
+		for bad_text in ['[1,2', '[1,]', '{"key" 1}', '{"key": 1,}', '1', '[] []']:
+			try:
+				list(self.codec.parse_events(bad_text))
+			except JSONDecodeError:
+				pass
+			else:
+				self.fail("Parsing bad JSON text >>>%s<<< should have raised JSONDecodeError" % bad_text)
+
+class TestSelectPaths(JysonTest):
+
+	json_text = """{
+		"meta": {"id": 42, "source": {"name": "feed", "tags": ["a", "b"]}},
+		"items": [
+			{"price": 1.5, "name": "first", "extra": [1, {"x": "]}"}]},
+			{"price": 2.5, "name": "second", "extra": 'not even valid'},
+			{"name": "third"}
+		],
+		"a/b": 1, "m~n": 2, "ignored": "value with \\" quote"
+	}"""
+
+	def testSelectSingleValue(self):
+		result = decodedToPython(self.decoder(self.json_text.replace("'not even valid'", "null"), select=["/meta/id"]))
+		self.failUnlessEqual({'meta': {'id': 42}}, result)
+
+	def testSelectWholeSubtree(self):
+		result = decodedToPython(self.decoder(self.json_text.replace("'not even valid'", "null"), select=["/meta/source"]))
+		self.failUnlessEqual({'meta': {'source': {'name': 'feed', 'tags': ['a', 'b']}}}, result)
+
+	def testSelectWildcard(self):
+		result = decodedToPython(self.decoder(self.json_text, select=["/meta/id", "/items/*/price"], accept_single_quoted_strings=True))
+		self.failUnlessEqual({'meta': {'id': 42}, 'items': [{'price': 1.5}, {'price': 2.5}, {}]}, result)
+
+	def testSelectArrayIndex(self):
+		result = decodedToPython(self.decoder(self.json_text, select=["/items/1/name", "/items/*/price"], accept_single_quoted_strings=True))
+		self.failUnlessEqual({'items': [{'price': 1.5}, {'price': 2.5, 'name': 'second'}, {}]}, result)
+
+	def testSelectEscapedKeys(self):
+		result = decodedToPython(self.decoder(self.json_text, select=["/a~1b", "/m~0n"], accept_single_quoted_strings=True))
+		self.failUnlessEqual({'a/b': 1, 'm~n': 2}, result)
+
+	def testSelectEverything(self):
+		text = self.json_text.replace("'not even valid'", "null")
+		self.failUnlessEqual(decodedToPython(self.decoder(text)), decodedToPython(self.decoder(text, select=[""])))
+
+	def testSkippedValuesMustBeComplete(self):
+		for bad_text in ['{"a": [1, 2}', '{"a": "unterminated}', '{"a": }']:
+			try:
+				self.decoder(bad_text, select=["/b"])
+			except JSONDecodeError:
+				pass
+			else:
+				self.fail("Skipping bad JSON text >>>%s<<< should have raised JSONDecodeError" % bad_text)
+
+class TestLoadsLines(JysonTest):
+
+	def _makeLines(self, n):
+		return ['{"n": %d, "s": "line %d"}' % (i, i) for i in range(n)]
+
+	def testLinesInOrder(self):
+		lines = self._makeLines(1000)
+		for workers in [1, 2, 4]:
+			results = self.codec.loads_lines("\n".join(lines), workers=workers, batch_size=7)
+			self.failUnlessEqual(range(1000), [r['n'] for r in results])
+
+	def testLinesFromFile(self):
+		import StringIO
+		f = StringIO.StringIO("\r\n".join(self._makeLines(10)) + "\r\n\r\n")
+		results = self.codec.loads_lines(f, workers=2, batch_size=3)
+		self.failUnlessEqual(range(10), [r['n'] for r in results])
+
+	def testBlankLinesSkipped(self):
+		results = self.codec.loads_lines('\n[1]\n  \n[2]\n', workers=2)
+		self.failUnlessEqual([[1], [2]], results)
+
+	def testLinesAcceptOptions(self):
+		results = self.codec.loads_lines('1\n"two"\n[3,]', accept_any_primary_datum=True, accept_dangling_commas=True)
+		self.failUnlessEqual([1, "two", [3]], results)
+
+	def testLinesRaiseDecodeError(self):
+		lines = self._makeLines(100)
+		lines[57] = '{"n": 57,'
+		try:
+			self.codec.loads_lines("\n".join(lines), workers=4, batch_size=5)
+		except JSONDecodeError, jde:
+			self.failUnless(str(jde).find("line=58") != -1)
+		else:
+			self.fail("Bad line should have raised JSONDecodeError")
+
+	def testErrorLineCountsBlankLines(self):
+		try:
+			self.codec.loads_lines('[1]\n\n  \n[2]\n{"n": 4,\n[5]', workers=2, batch_size=10)
+		except JSONDecodeError, jde:
+			self.failUnless(str(jde).find("line=5") != -1)
+		else:
+			self.fail("Bad line should have raised JSONDecodeError")
+
+	def testRepeatedCallsShareThreads(self):
+		from java.lang import Runtime, Thread
+		self.codec.loads_lines('[1]\n[2]', workers=2, batch_size=1)
+		threads = Thread.activeCount()
+		for i in range(50):
+			self.failUnlessEqual([[1], [2]], self.codec.loads_lines('[1]\n[2]', workers=2, batch_size=1))
+		self.failUnless(Thread.activeCount() <= threads + Runtime.getRuntime().availableProcessors())
+
+class TestParallelEncode(JysonTest):
+
+	def _makeRecords(self, n):
+		return [{'id': i, 'name': u'record \u00e9 %d' % i, 'values': [i, i * 1.5, None, True]} for i in range(n)]
+
+	def testParallelListIdentical(self):
+		records = self._makeRecords(5000)
+		for threshold in [2, 10, 1000, 100000]:
+			self.failUnlessEqual(self.encoder(records), self.encoder(records, parallel=True, threshold=threshold))
+
+	def testParallelDictIdentical(self):
+		d = {}
+		for i in range(5000):
+			d['key%d' % i] = [i, 'value %d' % i]
+		self.failUnlessEqual(self.encoder(d, emit_ascii=True), self.encoder(d, emit_ascii=True, parallel=True, threshold=16))
+		class IncrementingDict(dict):
+			def __getitem__(self, k):
+				return dict.__getitem__(self, k) + 1
+		d = IncrementingDict([('key%d' % i, i) for i in range(5000)])
+		self.failUnlessEqual(self.encoder(d), self.encoder(d, parallel=True, threshold=16))
+		self.failUnless(self.encoder(d, parallel=True, threshold=16).find('"key0":1') != -1)
+
+	def testParallelRaisesEncodeError(self):
+		records = self._makeRecords(1000)
+		records[789] = int
+		try:
+			self.encoder(records, parallel=True, threshold=10)
+		except JSONEncodeError:
+			pass
+		else:
+			self.fail("Encoding function should have raised exception")
+
+class TestKeyCache(JysonTest):
+
+	json_text = "[" + ",".join(['{"alpha": %d, "beta": "%d", "gamma": [%d]}' % (i, i, i) for i in range(100)]) + "]"
+
+	def _checkResult(self, result):
+		self.failUnlessEqual(100, len(result))
+		for i in range(100):
+			self.assertObjectEqual({'alpha': i, 'beta': str(i), 'gamma': [i]}, result[i])
+
+	def testDefaultKeyCache(self):
+		self._checkResult(self.decoder(self.json_text))
+
+	def testKeyCacheDisabled(self):
+		self._checkResult(self.decoder(self.json_text, key_cache_size=0))
+
+	def testKeyCacheEviction(self):
+		# Fewer slots than distinct keys, so keys are evicted continually
+		self._checkResult(self.decoder(self.json_text, key_cache_size=2))
+
+class TestConfiguredCodec(JysonTest):
+
+	def testDefaultInstanceIsStrict(self):
+		codec = JysonCodec()
+		for bad_text in ['[1,]', "['single']", '[010]', '[] junk', '1']:
+			try:
+				codec.decode(bad_text)
+			except JSONDecodeError:
+				pass
+			else:
+				self.fail("Default codec instance should not accept >>>%s<<<" % bad_text)
+
+	def testPermissiveInstance(self):
+		codec = JysonCodec(strict_mode=False)
+		self.failUnlessEqual([1, 'single', 8], codec.decode("[1, 'single', 010,] # comment"))
+
+	def testIndividualOptions(self):
+		codec = JysonCodec(accept_dangling_commas=True)
+		self.failUnlessEqual([1, 2], codec.decode("[1,2,]"))
+		try:
+			codec.decode("['single']")
+		except JSONDecodeError:
+			pass
+		else:
+			self.fail("Codec instance should only accept the options which are set")
+
+	def testOptionChangesTakeEffect(self):
+		codec = JysonCodec()
+		codec.accept_any_primary_datum = True
+		self.failUnlessEqual(1, codec.decode("1"))
+		codec.accept_any_primary_datum = False
+		self.assertRaises(JSONDecodeError, codec.decode, "1")
+
+	def testCallOptionsOverrideInstance(self):
+		codec = JysonCodec(strict_mode=False)
+		self.assertRaises(JSONDecodeError, codec.decode, "[1,]", accept_dangling_commas=False)
+
+	def testReuseAfterError(self):
+		codec = JysonCodec()
+		self.assertRaises(JSONDecodeError, codec.decode, '{"key": [1, 2')
+		self.assertObjectEqual({'key': [1, 2]}, codec.decode('{"key": [1, 2]}'))
+
+	def testEncode(self):
+		codec = JysonCodec(emit_ascii=True)
+		py_object = [u'Al\u00e1in', {'key': (1, 2.5, None)}]
+		self.failUnlessEqual(self.encoder(py_object, emit_ascii=True), codec.encode(py_object))
+		self.failUnlessEqual(self.encoder(py_object), codec.encode(py_object, emit_ascii=False))
+		self.failUnlessEqual('"Al\\u00E1in"', codec.encode(u'Al\u00e1in'))
+
+	def testEncodeAndDecodeOnManyThreads(self):
+		import threading
+		codec = JysonCodec()
+		errors = []
+		def work(n):
+			try:
+				for i in range(200):
+					text = codec.encode({'thread': n, 'i': i})
+					obj = codec.decode(text)
+					if obj['thread'] != n or obj['i'] != i:
+						errors.append((n, i))
+			except Exception, x:
+				errors.append(x)
+		threads = [threading.Thread(target=work, args=(n,)) for n in range(8)]
+		for t in threads: t.start()
+		for t in threads: t.join()
+		self.failUnlessEqual([], errors)
+
+class TestLoadsBytes(JysonTest):
+
+	unicode_text = u'{"name": "Al\u00e1in \u00d3 Cinn\u00e9ide", "clef": "\U0001D11E", "escaped": "\\u00e1\\n", "n": [1, 2.5]}'
+
+	def _checkResult(self, obj):
+		self.failUnlessEqual(u'Al\u00e1in \u00d3 Cinn\u00e9ide', obj['name'])
+		self.failUnlessEqual(u'\U0001D11E', obj['clef'])
+		self.failUnlessEqual(u'\u00e1\n', obj['escaped'])
+		self.failUnlessEqual([1, 2.5], obj['n'])
+
+	def testLoadsFromJavaByteArray(self):
+		self._checkResult(self.codec.loads_bytes(java.lang.String(self.unicode_text).getBytes("UTF-8")))
+
+	def testLoadsFromByteBuffer(self):
+		buf = java.nio.ByteBuffer.wrap(java.lang.String(self.unicode_text).getBytes("UTF-8"))
+		self._checkResult(self.codec.loads_bytes(buf))
+		# The position of the caller's buffer is not changed
+		self.failUnlessEqual(0, buf.position())
+
+	def testLoadsFromJythonString(self):
+		self._checkResult(self.codec.loads_bytes(self.unicode_text.encode('utf-8')))
+		self._checkResult(self.codec.loads_bytes('\xef\xbb\xbf' + self.unicode_text.encode('utf-8')))
+
+	def testLoadsFromBytearray(self):
+		self._checkResult(self.codec.loads_bytes(bytearray(self.unicode_text.encode('utf-8'))))
+
+	def testLoadsAcceptsOptions(self):
+		self.failUnlessEqual([1], self.codec.loads_bytes("[1,]", accept_dangling_commas=True))
+
+	def testInvalidUTF8RaisesDecodeError(self):
+		for bad_bytes in ['["\xe1"]', '["\xc3"]', '["\xc0\x80"]', '["\xed\xa0\x80"]', '["\xff"]', '[\xc3\xa1]']:
+			try:
+				self.codec.loads_bytes(bad_bytes)
+			except JSONDecodeError:
+				pass
+			else:
+				self.fail("Invalid UTF-8 %s should have raised JSONDecodeError" % repr(bad_bytes))
+
+	def testUnicodeRaisesTypeError(self):
+		self.assertRaises(TypeError, self.codec.loads_bytes, self.unicode_text)
+
+class TestLoadPath(JysonTest):
+
+	unicode_text = u'{"name": "Al\u00e1in", "values": [1, 22, 333, "four four"], "nested": {"clef": "\U0001D11E"}}'
+
+	def setUp(self):
+		JysonTest.setUp(self)
+		import tempfile
+		fd, self.path = tempfile.mkstemp(suffix=".json")
+		f = os.fdopen(fd, "wb")
+		f.write(self.unicode_text.encode('utf-8'))
+		f.close()
+
+	def tearDown(self):
+		os.remove(self.path)
+
+	def _checkResult(self, obj):
+		self.failUnlessEqual(u'Al\u00e1in', obj['name'])
+		self.failUnlessEqual([1, 22, 333, 'four four'], obj['values'])
+		self.failUnlessEqual(u'\U0001D11E', obj['nested']['clef'])
+
+	def testLoadPathMapped(self):
+		self._checkResult(self.codec.load_path(self.path))
+
+	def testLoadPathFromFile(self):
+		self._checkResult(self.codec.load_path(java.io.File(self.path)))
+
+	def testLoadPathNotMapped(self):
+		self._checkResult(self.codec.load_path(self.path, mmap=False))
+
+	def testLoadPathSmallWindows(self):
+		# Every token and UTF-8 sequence straddles a window boundary at some window size
+		for window_size in range(2, 20):
+			self._checkResult(self.codec.load_path(self.path, window_size=window_size))
+
+	def testLoadPathBadJSON(self):
+		f = open(self.path, "wb")
+		f.write('[1, 2, 3, 4, 5, 6, 7, 8, 9, x]')
+		f.close()
+		self.assertRaises(JSONDecodeError, self.codec.load_path, self.path, window_size=4)
+
+	def testLoadMissingPath(self):
+		self.assertRaises(IOError, self.codec.load_path, self.path + ".missing")
+
+class TestIndexEngine(JysonTest):
+
+	json_texts = [
+		'{}', '[]', '[[], {}, [{}]]',
+		'{"name": "Al\xc3\xa1in", "values": [1, -22, 3.5e2, true, false, null], "nested": {"a": {"b": ["c"]}}}',
+		'["short", "a string which spans several eight byte words", ""]',
+		'["\\"quoted\\"", "back\\\\slash", "\\u00e1\\n", "tab\there", "\\\\"]',
+		'{"a":1,"b":[2,3],"c":{"d":"e"}}',
+		' \r\n\t[ 1 ,\n 2 ] \n',
+	]
+
+	def testSameResultsAsStreamEngine(self):
+		for json_text in self.json_texts:
+			self.failUnlessEqual(self.codec.loads_bytes(json_text), self.codec.loads_bytes(json_text, engine="index"))
+
+	def testStringsAcrossWordBoundaries(self):
+		# Every escape and closing quote falls on every position within an eight byte word
+		for length in range(20):
+			for json_text in ['["%s"]' % ("x" * length), '["%s\\"y"]' % ("x" * length), '[" %s", "%s\\\\"]' % ("x" * length, "x" * length)]:
+				self.failUnlessEqual(self.codec.loads_bytes(json_text), self.codec.loads_bytes(json_text, engine="index"))
+
+	def testPermissiveOptions(self):
+		self.failUnlessEqual([1], self.codec.loads_bytes('[1,]', engine="index", accept_dangling_commas=True))
+		self.failUnlessEqual({"a": 1}, self.codec.loads_bytes('{"a": 1,}', engine="index", accept_dangling_commas=True))
+		self.failUnlessEqual(42, self.codec.loads_bytes('42', engine="index", accept_any_primary_datum=True))
+		self.failUnlessEqual([1], self.codec.loads_bytes('[1] junk', engine="index", accept_junk_after_data=True))
+		self.failUnlessEqual([1, 2], self.codec.loads_bytes('[1, /* comment */ 2]', engine="index"))
+		self.failUnlessEqual(['a'], self.codec.loads_bytes("['a']", engine="index", accept_single_quoted_strings=True))
+		self.failUnlessEqual([255], self.codec.loads_bytes('[0xFF]', engine="index", accept_hexadecimal_integers=True))
+
+	def testErrorsSameAsStreamEngine(self):
+		for bad_text in ['', '42', '[1, 2', '[1,,2]', '[1,]', '{"a" 1}', '{"a": 1,}', '{1: 2}', '[1 2]',
+				'[tru]', '["unterminated]', '["a"x]', '[1] junk', "['a']", '["\xc3"]', '[\x00]']:
+			try:
+				self.codec.loads_bytes(bad_text)
+			except JSONDecodeError, stream_error:
+				pass
+			else:
+				self.fail("%s should have raised JSONDecodeError" % repr(bad_text))
+			try:
+				self.codec.loads_bytes(bad_text, engine="index")
+			except JSONDecodeError, index_error:
+				self.failUnlessEqual(str(stream_error), str(index_error))
+			else:
+				self.fail("%s should have raised JSONDecodeError with the index engine" % repr(bad_text))
+
+	def testLoadPathIndexEngine(self):
+		import tempfile
+		fd, path = tempfile.mkstemp(suffix=".json")
+		try:
+			f = os.fdopen(fd, "wb")
+			f.write(self.json_texts[3])
+			f.close()
+			self.failUnlessEqual(self.codec.load_path(path), self.codec.load_path(path, engine="index"))
+			self.assertRaises(ValueError, self.codec.load_path, path, engine="index", mmap=False)
+		finally:
+			os.remove(path)
+
+	def testUnknownEngineRaisesValueError(self):
+		self.assertRaises(ValueError, self.codec.loads_bytes, '[]', engine="turbo")
+
+class TestEncoderRegistry(JysonTest):
+
+	def tearDown(self):
+		import datetime, decimal
+		for cls in [datetime.date, decimal.Decimal, MyTestClass]:
+			JysonCodec.register_encoder(cls, None)
+
+	def testRegisteredEncoder(self):
+		import decimal
+		JysonCodec.register_encoder(decimal.Decimal, float)
+		self.failUnlessEqual('[1.5,2]', self.encoder([decimal.Decimal('1.5'), 2]))
+
+	def testRegisteredEncoderAppliesToSubclasses(self):
+		import datetime
+		JysonCodec.register_encoder(datetime.date, lambda d: d.isoformat())
+		self.failUnlessEqual('["2012-03-04"]', self.encoder([datetime.date(2012, 3, 4)]))
+		self.failUnlessEqual('["2012-03-04T05:06:07"]', self.encoder([datetime.datetime(2012, 3, 4, 5, 6, 7)]))
+
+	def testUnregisterEncoder(self):
+		import decimal
+		JysonCodec.register_encoder(decimal.Decimal, float)
+		self.failUnlessEqual('[1.5]', self.encoder([decimal.Decimal('1.5')]))
+		JysonCodec.register_encoder(decimal.Decimal, None)
+		self.assertRaises(JSONEncodeError, self.encoder, [decimal.Decimal('1.5')])
+
+	def testJsonMethodTakesPrecedence(self):
+		JysonCodec.register_encoder(MyTestClass, lambda o: 'registered')
+		my_obj = MyTestClass()
+		self.failUnlessEqual(my_obj.json_text, self.encoder(my_obj))
+
+	def testDefault(self):
+		class Point(object):
+			def __init__(self, x, y):
+				self.x, self.y = x, y
+		result = self.encoder([Point(1, 2)], default=lambda p: [p.x, p.y])
+		self.failUnlessEqual('[[1,2]]', result)
+		self.assertRaises(JSONEncodeError, self.encoder, [Point(1, 2)])
+
+	def testDefaultOnCodecInstance(self):
+		self.codec.default_encoder = repr
+		self.failUnlessEqual('["set([1])"]', self.codec.encode([set([1])]))
+
+	def testDefaultReturningSameTypeRaisesException(self):
+		self.assertRaises(JSONEncodeError, self.encoder, [set([1])], default=lambda s: set([2]))
+
+	def testDefaultReturningEarlierTypeRaisesException(self):
+		swap = lambda s: type(s) is set and frozenset(s) or set(s)
+		self.assertRaises(JSONEncodeError, self.encoder, [set([1])], default=swap)
+		self.failUnlessEqual('[[1],[2]]', self.encoder([set([1]), set([2])], default=lambda s: type(s) is set and frozenset(s) or list(s)))
+
+	def testDefaultWrappingObjectInContainerRaisesException(self):
+		self.assertRaises(JSONEncodeError, self.encoder, [set([1])], default=lambda o: [o])
+		self.assertRaises(JSONEncodeError, self.encoder, set([1]), default=lambda o: {"o": o})
+		self.assertRaises(JSONEncodeError, list, self.codec.iterencode(set([1]), chunk_size=1, default=lambda o: [o]))
+
+	def testDefaultForNestedObjectsOfOneType(self):
+		class Node(object):
+			def __init__(self, *children):
+				self.children = list(children)
+		tree = Node(Node(), Node(Node()))
+		self.failUnlessEqual('[[],[[]]]', self.encoder(tree, default=lambda n: n.children))
+		self.failUnlessEqual('[[1],[1]]', self.encoder([set([1]), set([1])], default=lambda s: frozenset(s) if type(s) is set else list(s)))
+
+	def testRegisterNonClassRaisesException(self):
+		self.assertRaises(TypeError, JysonCodec.register_encoder, 'not a class', float)
+
+class DictBuilder(JysonBuilder):
+
+	def new_object(self): return {}
+	def new_key(self, key): return key
+	def put(self, json_object, key, value): json_object[key] = value
+	def new_array(self): return []
+	def append(self, json_array, value): json_array.append(value)
+	def new_string(self, s): return s
+	def new_integer(self, value): return value
+	def new_big_integer(self, value): return long(value.toString())
+	def new_float(self, value): return value
+	def new_boolean(self, value): return value
+	def new_null(self): return None
+
+class TestDecodeTarget(JysonTest):
+
+	json_text = '{"a": [1, 2.5, "x", true, null, 123456789012345678901234567890], "b": {"c": -1}}'
+
+	def testJavaTarget(self):
+		result = self.decoder(self.json_text, target="java")
+		self.failUnless(isinstance(result, java.util.HashMap))
+		array = result.get("a")
+		self.failUnless(isinstance(array, java.util.ArrayList))
+		self.failUnlessEqual(1, array.get(0))
+		self.failUnlessEqual(2.5, array.get(1))
+		self.failUnlessEqual("x", array.get(2))
+		self.failUnlessEqual(True, array.get(3))
+		self.failUnlessEqual(None, array.get(4))
+		self.failUnlessEqual(123456789012345678901234567890L, array.get(5))
+		self.failUnlessEqual(-1, result.get("b").get("c"))
+
+	def testJavaTargetAcceptsOptions(self):
+		result = self.decoder("[1, 2, 3,]", target="java", accept_dangling_commas=True)
+		self.failUnless(isinstance(result, java.util.ArrayList))
+		self.failUnlessEqual(3, result.size())
+
+	def testJavaTargetWithSelection(self):
+		result = self.decoder(self.json_text, target="java", select=["/b/c"])
+		self.failUnlessEqual(1, result.size())
+		self.failUnlessEqual(-1, result.get("b").get("c"))
+
+	def testJavaTargetOnCodecInstance(self):
+		self.codec.target = "java"
+		self.failUnless(isinstance(self.codec.decode('{"a": 1}'), java.util.HashMap))
+
+	def testPythonTarget(self):
+		result = self.decoder(self.json_text, target="python")
+		self.failUnlessEqual({'c': -1}, decodedToPython(result['b']))
+
+	def testCustomBuilder(self):
+		result = self.decoder(self.json_text, target=DictBuilder())
+		self.failUnlessEqual({'a': [1, 2.5, 'x', True, None, 123456789012345678901234567890L], 'b': {'c': -1}}, result)
+
+	def testUnknownTargetRaisesException(self):
+		self.assertRaises(ValueError, self.decoder, self.json_text, target="xml")
+
+class TestLazyDecode(JysonTest):
+
+	json_text = '{"envelope": {"id": 42, "type": "order"}, "payload": [{"sku": "a\\u00e1", "qty": 1.5}, [true, false, null]], "s": "str"}'
+
+	def testLazyObject(self):
+		result = self.decoder(self.json_text, lazy=True)
+		self.failUnless(isinstance(result, java.util.Map))
+		self.failUnlessEqual(3, result.size())
+		self.failUnlessEqual(['envelope', 'payload', 's'], list(result.keySet()))
+		self.failUnlessEqual(42, result.get('envelope').get('id'))
+		self.failUnlessEqual(u'a\u00e1', result.get('payload').get(0).get('sku'))
+		self.failUnlessEqual(None, result.get('missing'))
+
+	def testLazyArray(self):
+		result = self.decoder('[1, [2, 3], "four"]', lazy=True)
+		self.failUnless(isinstance(result, java.util.List))
+		self.failUnlessEqual(3, result.size())
+		self.failUnlessEqual(3, result.get(1).get(1))
+		self.failUnlessEqual('four', result.get(2))
+
+	def testValuesDecodedOnce(self):
+		result = self.decoder(self.json_text, lazy=True)
+		self.failUnless(result.get('s') is result.get('s'))
+
+	def testErrorsInValuesRaisedOnAccess(self):
+		result = self.decoder('{"ok": 1, "bad": [1, 2, x]}', lazy=True)
+		self.failUnlessEqual(1, result.get('ok'))
+		bad = result.get('bad')
+		self.failUnlessEqual(2, bad.get(1))
+		self.assertRaises(JSONDecodeError, bad.get, 2)
+
+	def testStructuralErrorsRaised(self):
+		for bad_text in ['{"a": [1, 2}', '{"a": 1', '[1, 2,]']:
+			self.assertRaises(JSONDecodeError, self.decoder, bad_text, lazy=True)
+
+	def testLazyJavaTarget(self):
+		result = self.decoder(self.json_text, lazy=True, target="java")
+		self.failUnlessEqual(42, result.get('envelope').get('id'))
+
+	def testEncodeLazyResult(self):
+		result = self.decoder(self.json_text, lazy=True)
+		self.failUnlessEqual(decodedToPython(self.decoder(self.json_text)), decodedToPython(self.decoder(self.encoder(result))))
+
+	def testLazyOnCodecInstance(self):
+		self.codec.lazy = True
+		self.failUnless(isinstance(self.codec.decode(self.json_text), java.util.Map))
+
+	def testLazyWithSelectRaisesException(self):
+		self.assertRaises(ValueError, self.decoder, self.json_text, lazy=True, select=["/s"])
+
+class TestNesting(JysonTest):
+
+	depth = 100000
+
+	def _makeNestedList(self, depth):
+		result = []
+		for ix in xrange(depth - 1):
+			result = [result]
+		return result
+
+	def testDecodeDeeplyNestedArrays(self):
+		result = self.decoder("[" * self.depth + "]" * self.depth)
+		for ix in xrange(self.depth - 1):
+			self.failUnlessEqual(1, len(result))
+			result = result[0]
+		self.failUnlessEqual([], result)
+
+	def testDecodeDeeplyNestedObjects(self):
+		result = self.decoder('{"a": ' * self.depth + '1' + '}' * self.depth)
+		for ix in xrange(self.depth):
+			result = result['a']
+		self.failUnlessEqual(1, result)
+
+	def testDecodeDeeplyNestedBytes(self):
+		json_text = "[" * self.depth + "1" + "]" * self.depth
+		for engine in ["stream", "index"]:
+			# Compared through the (non-recursive) encoder, since comparing the lists themselves would recurse
+			self.failUnlessEqual(json_text, self.encoder(self.codec.loads_bytes(json_text, engine=engine)))
+
+	def testDecodeMaxDepth(self):
+		self.failUnlessEqual([[[1]]], self.decoder("[[[1]]]", max_depth=3))
+		for json_text in ['[[[[1]]]]', '{"a": {"b": {"c": {}}}}', '[{"a": [[]]}]']:
+			self.assertRaises(JSONDecodeError, self.decoder, json_text, max_depth=3)
+			self.assertRaises(JSONDecodeError, self.codec.loads_bytes, json_text, max_depth=3, engine="index")
+
+	def testDecodeMaxDepthOnCodecInstance(self):
+		self.codec.max_depth = 2
+		self.failUnlessEqual([[1]], self.codec.decode("[[1]]"))
+		self.assertRaises(JSONDecodeError, self.codec.decode, "[[[1]]]")
+
+	def testDecodeErrorInNestedValue(self):
+		# The decoder is reused after an error, with none of the unfinished arrays still open
+		self.assertRaises(JSONDecodeError, self.codec.decode, '[[[1, x]]]')
+		self.failUnlessEqual([[1]], self.codec.decode("[[1]]", max_depth=2))
+
+	def testEncodeDeeplyNestedList(self):
+		self.failUnlessEqual("[" * self.depth + "]" * self.depth, self.encoder(self._makeNestedList(self.depth)))
+
+	def testEncodeMaxDepth(self):
+		self.failUnlessEqual("[[[]]]", self.encoder(self._makeNestedList(3), max_depth=3))
+		self.assertRaises(JSONEncodeError, self.encoder, self._makeNestedList(4), max_depth=3)
+		self.assertRaises(JSONEncodeError, self.encoder, {"a": {"b": {"c": {}}}}, max_depth=3)
+
+	def testEncodeCircularReferenceRaisesException(self):
+		l = [1, 2]
+		l.append(l)
+		d = {"a": 1}
+		d["b"] = [d]
+		for circular in [l, d]:
+			self.assertRaises(JSONEncodeError, self.encoder, circular)
+			self.assertRaises(JSONEncodeError, self.encoder, circular, parallel=True, threshold=2)
+			self.assertRaises(JSONEncodeError, self.codec.encode, circular)
+			try:
+				list(self.codec.iterencode(circular, chunk_size=1))
+			except JSONEncodeError:
+				pass
+			else:
+				self.fail("Circular reference should have raised exception")
+
+	def testEncodeSharedReferences(self):
+		shared = [1, {"a": 2}]
+		self.failUnlessEqual('[[1,{"a":2}],[1,{"a":2}]]', self.encoder([shared, shared]))
+		self.failUnlessEqual('[[1,{"a":2}],[1,{"a":2}]]', self.encoder([shared, shared], parallel=True, threshold=2))
+
+	def testEncoderReusedAfterCircularReference(self):
+		l = []
+		l.append(l)
+		self.assertRaises(JSONEncodeError, self.codec.encode, l)
+		self.failUnlessEqual("[[]]", self.codec.encode([[]]))
+
+class TestStats(JysonTest):
+
+	def setUp(self):
+		JysonTest.setUp(self)
+		self.codec.reset_stats()
+		self.codec.enable_stats(True)
+
+	def tearDown(self):
+		self.codec.enable_stats(False)
+		self.codec.reset_stats()
+
+	def testDecodeStats(self):
+		self.decoder('[1, 2]')
+		self.codec.loads_bytes('{"a": 1}')
+		self.assertRaises(JSONDecodeError, self.decoder, '[1, 2')
+		stats = self.codec.stats()
+		self.failUnless(stats['enabled'])
+		self.failUnlessEqual(3, stats['decode']['calls'])
+		self.failUnlessEqual(14, stats['decode']['size'])
+		self.failUnlessEqual({'JSONDecodeError': 1, 'other': 0}, stats['decode']['errors'])
+		self.failUnlessEqual({8: 1, 16: 1}, stats['decode']['sizes'])
+		self.failUnlessEqual(2, sum(stats['decode']['latency_us'].values()))
+		self.failUnlessEqual(0, stats['encode']['calls'])
+
+	def testEncodeStats(self):
+		self.encoder([1, 2])
+		self.codec.encode({"a": 1})
+		l = []
+		l.append(l)
+		self.assertRaises(JSONEncodeError, self.encoder, l)
+		stats = self.codec.stats()
+		self.failUnlessEqual(3, stats['encode']['calls'])
+		self.failUnlessEqual(12, stats['encode']['size'])
+		self.failUnlessEqual({'JSONEncodeError': 1, 'other': 0}, stats['encode']['errors'])
+		self.failUnlessEqual(0, stats['decode']['calls'])
+
+	def testDisabledStats(self):
+		self.codec.enable_stats(False)
+		self.decoder('[1, 2]')
+		self.encoder([1, 2])
+		stats = self.codec.stats()
+		self.failIf(stats['enabled'])
+		self.failUnlessEqual(0, stats['decode']['calls'])
+		self.failUnlessEqual(0, stats['encode']['calls'])
+
+	def testEnabledThroughMBean(self):
+		from java.lang.management import ManagementFactory
+		from javax.management import Attribute, ObjectName
+		self.codec.enable_stats(False)
+		server = ManagementFactory.getPlatformMBeanServer()
+		name = ObjectName("com.xhaus.jyson:type=Metrics")
+		self.failUnless(server.isRegistered(name))
+		self.failIf(server.getAttribute(name, "Enabled"))
+		server.setAttribute(name, Attribute("Enabled", True))
+		self.decoder('[1, 2]')
+		self.failUnless(self.codec.stats()['enabled'])
+		self.failUnlessEqual(1, server.getAttribute(name, "DecodeCalls"))
+		server.invoke(name, "reset", None, None)
+		self.failUnlessEqual(0, self.codec.stats()['decode']['calls'])
+
+class Frozen(object):
+
+	__json_immutable__ = True
+
+	def __init__(self, value):
+		self.value = value
+
+	def __json__(self):
+		return '{"frozen":%d}' % self.value
+
+class TestFragmentCache(JysonTest):
+
+	def setUp(self):
+		JysonTest.setUp(self)
+		self.codec.fragment_cache_size = 2
+
+	def testNoCacheByDefault(self):
+		self.failUnlessEqual(None, JysonCodec().fragment_cache_stats())
+
+	def testCachedTuple(self):
+		catalog = (1, "two", (3.5, None), Frozen(4))
+		expected = '[1,"two",[3.5,null],{"frozen":4}]'
+		for ix in range(3):
+			self.failUnlessEqual('{"catalog":%s}' % expected, self.codec.encode({"catalog": catalog}))
+		stats = self.codec.fragment_cache_stats()
+		self.failUnlessEqual(2, stats['hits'])
+		self.failUnlessEqual(1, stats['misses'])
+		self.failUnlessEqual(1, stats['size'])
+		self.failUnlessEqual(len(expected), stats['length'])
+
+	def testCachedFrozenObjectAndLongString(self):
+		long_string = u"\u00e9" * 100
+		for ix in range(2):
+			self.failUnlessEqual('[{"frozen":1},"%s"]' % long_string, self.codec.encode([Frozen(1), long_string]))
+		self.failUnlessEqual(1, self.codec.fragment_cache_stats()['hits'])
+
+	def testCacheReplacedWhenSizeChanges(self):
+		t = (1, 2)
+		self.codec.encode(t)
+		self.codec.fragment_cache_size = 0
+		self.failUnlessEqual('[1,2]', self.codec.encode(t))
+		self.failUnlessEqual(None, self.codec.fragment_cache_stats())
+		self.codec.fragment_cache_size = 3
+		self.codec.encode(t)
+		self.failUnlessEqual(1, self.codec.fragment_cache_stats()['misses'])
+
+	def testShortStringsNotCached(self):
+		self.codec.encode(["short", "short"])
+		self.failUnlessEqual(0, self.codec.fragment_cache_stats()['misses'])
+
+	def testMutableContentsNotCached(self):
+		inner = [1]
+		t = (inner,)
+		self.failUnlessEqual('[[1]]', self.codec.encode(t))
+		inner.append(2)
+		self.failUnlessEqual('[[1,2]]', self.codec.encode(t))
+		self.failUnlessEqual(0, self.codec.fragment_cache_stats()['size'])
+
+	def testEmitAsciiNotShared(self):
+		t = (u"\u00e9",)
+		self.failUnlessEqual(u'["\u00e9"]', self.codec.encode(t))
+		self.failUnlessEqual('["\\u00E9"]', self.codec.encode(t, emit_ascii=True))
+
+	def testEviction(self):
+		tuples = [(ix,) for ix in range(3)]
+		for t in tuples:
+			self.codec.encode(t)
+		self.failUnlessEqual('[0]', self.codec.encode(tuples[0]))
+		stats = self.codec.fragment_cache_stats()
+		self.failUnlessEqual(2, stats['evictions'])
+		self.failUnlessEqual(0, stats['hits'])
+		self.failUnlessEqual(2, stats['size'])
+
+class TestResultCache(JysonTest):
+
+	def setUp(self):
+		JysonTest.setUp(self)
+		self.codec.result_cache_size = 2
+
+	def testNoCacheByDefault(self):
+		self.failUnlessEqual(None, JysonCodec().result_cache_stats())
+
+	def testCachedResultsAreCopies(self):
+		json_text = '{"a": [1, {"b": "c"}], "d": 2}'
+		first = self.codec.decode(json_text)
+		first['a'][1]['b'] = "changed"
+		first['d'] = 3
+		second = self.codec.decode(json_text)
+		self.failUnlessEqual({'a': [1, {'b': 'c'}], 'd': 2}, second)
+		self.failIf(second is self.codec.decode(json_text))
+		stats = self.codec.result_cache_stats()
+		self.failUnlessEqual(2, stats['hits'])
+		self.failUnlessEqual(1, stats['misses'])
+		self.failUnlessEqual(1, stats['size'])
+
+	def testCachedListsWithSpareCapacity(self):
+		json_text = '[%s]' % ', '.join([str(ix) for ix in range(100)])
+		expected = range(100)
+		first = self.codec.decode(json_text)
+		first.append(100)
+		second = self.codec.decode(json_text)
+		self.failUnlessEqual(expected, second)
+		self.failUnlessEqual(100, len(second))
+		second.append(100)
+		second.append(101)
+		self.failUnlessEqual(expected, self.codec.decode(json_text))
+
+	def testSharedResults(self):
+		self.codec.result_cache_shared = True
+		json_text = '[1, [2]]'
+		self.failUnless(self.codec.decode(json_text) is self.codec.decode(json_text))
+
+	def testJavaTargetCopies(self):
+		self.codec.target = "java"
+		first = self.codec.decode('{"a": [1]}')
+		first.get("a").add(2)
+		self.failUnlessEqual(1, self.codec.decode('{"a": [1]}').get("a").size())
+
+	def testKeyedByOptions(self):
+		json_text = '[1,]'
+		self.assertRaises(JSONDecodeError, self.codec.decode, json_text)
+		self.failUnlessEqual([1], self.codec.decode(json_text, strict_mode=False))
+		self.assertRaises(JSONDecodeError, self.codec.decode, json_text)
+		self.failUnlessEqual(0, self.codec.result_cache_stats()['hits'])
+
+	def testEviction(self):
+		for json_text in ['[1]', '[2]', '[3]', '[1]']:
+			self.codec.decode(json_text)
+		stats = self.codec.result_cache_stats()
+		self.failUnlessEqual(0, stats['hits'])
+		self.failUnlessEqual(2, stats['evictions'])
+		self.failUnlessEqual(2, stats['size'])
+
+	def testCacheReplacedWhenOptionsChange(self):
+		self.codec.decode('[1]')
+		self.failUnlessEqual(1, self.codec.result_cache_stats()['size'])
+		self.codec.result_cache_size = 0
+		self.failUnlessEqual([1], self.codec.decode('[1]'))
+		self.failUnlessEqual(None, self.codec.result_cache_stats())
+		self.codec.result_cache_size = 3
+		self.codec.decode('[1]')
+		self.failUnlessEqual(1, self.codec.result_cache_stats()['misses'])
+
+	def testSelectionNotCached(self):
+		self.failUnlessEqual({'a': 1}, self.codec.decode('{"a": 1, "b": 2}', select=["/a"]))
+		self.failUnlessEqual({'a': 1, 'b': 2}, self.codec.decode('{"a": 1, "b": 2}'))
+		self.failUnlessEqual(1, self.codec.result_cache_stats()['misses'])
+
+class TestFeedDecoder(JysonTest):
+
+	def _feedInChunks(self, json_text, chunk_size, **options):
+		decoder = self.codec.feed_decoder(**options)
+		results = []
+		for ix in range(0, len(json_text), chunk_size):
+			results.extend(decoder.feed(json_text[ix:ix+chunk_size]))
+		results.extend(decoder.close())
+		return results
+
+	def testValuesCompletedByEachChunk(self):
+		decoder = self.codec.feed_decoder()
+		self.failUnlessEqual([], decoder.feed('{"a": [1, 2'))
+		self.failUnlessEqual([{'a': [1, 2]}], decoder.feed(']}\n['))
+		self.failUnlessEqual([[3], []], decoder.feed('3][]'))
+		self.failUnlessEqual([], decoder.close())
+
+	def testChunksEndingAnywhere(self):
+		json_text = r'{"s": "esc\"aped \u00e9\\", "n": [-12.5e3, 123456789012]} [true, null] {"k": {}}'
+		expected = [{'s': u'esc"aped \u00e9\\', 'n': [-12.5e3, 123456789012L]}, [True, None], {'k': {}}]
+		for chunk_size in [1, 2, 3, 7, len(json_text)]:
+			self.failUnlessEqual(expected, self._feedInChunks(json_text, chunk_size))
+
+	def testTopLevelScalars(self):
+		json_text = '12 "a" 3.5 true'
+		for chunk_size in [1, 4, len(json_text)]:
+			self.failUnlessEqual([12, 'a', 3.5, True], self._feedInChunks(json_text, chunk_size, accept_any_primary_datum=True))
+		self.assertRaises(JSONDecodeError, self._feedInChunks, '12', 1)
+
+	def testUtf8Bytes(self):
+		import jarray
+		utf8 = java.lang.String(u'["\u00e9\u20ac", "\U0001f600"]').getBytes("UTF-8")
+		for chunk_size in [1, 2, 3]:
+			decoder = self.codec.feed_decoder()
+			results = []
+			for ix in range(0, len(utf8), chunk_size):
+				results.extend(decoder.feed(jarray.array(utf8[ix:ix+chunk_size], 'b')))
+			results.extend(decoder.close())
+			self.failUnlessEqual([[u'\u00e9\u20ac', u'\U0001f600']], results)
+
+	def testPermissiveOptions(self):
+		json_text = "# comment with [ and '\n['a', # ]\n 2,]"
+		self.failUnlessEqual([['a', 2]], self._feedInChunks(json_text, 3, strict_mode=False))
+		self.assertRaises(JSONDecodeError, self._feedInChunks, json_text, 3)
+
+	def testSlashComments(self):
+		json_text = '// line "comment" with [\n[1, /* block ] with " and */ 2]/**/{"a": 3 // }\n}/* last */'
+		for chunk_size in [1, 2, 3, len(json_text)]:
+			self.failUnlessEqual([[1, 2], {'a': 3}], self._feedInChunks(json_text, chunk_size))
+		self.failUnlessEqual([12, 34], self._feedInChunks('12/* c */34// c', 1, accept_any_primary_datum=True))
+		for json_text in ['[1] /* unclosed', '[1] /', '[1] / [2]']:
+			self.assertRaises(JSONDecodeError, self._feedInChunks, json_text, 1)
+
+	def testControlCharactersAreWhitespace(self):
+		json_text = '[1]\f\v[2]\x1f 3\f'
+		for chunk_size in [1, 2, 3]:
+			self.failUnlessEqual([[1], [2], 3], self._feedInChunks(json_text, chunk_size, accept_any_primary_datum=True))
+
+	def testIncompleteUtf8SequenceIsCopied(self):
+		import jarray
+		utf8 = java.lang.String(u'["\u20ac"]').getBytes("UTF-8")
+		chunk = jarray.array(utf8[:3], 'b')
+		decoder = self.codec.feed_decoder()
+		self.failUnlessEqual([], decoder.feed(java.nio.ByteBuffer.wrap(chunk)))
+		chunk[2] = ord('x')
+		self.failUnlessEqual([[u'\u20ac']], decoder.feed(jarray.array(utf8[3:], 'b')))
+
+	def testIncompleteValueRaisesException(self):
+		for json_text in ['[1, 2', '{"a": "b', '"abc\\']:
+			self.assertRaises(JSONDecodeError, self._feedInChunks, json_text, 2, accept_any_primary_datum=True)
+
+	def testErrorStopsDecoder(self):
+		decoder = self.codec.feed_decoder()
+		self.assertRaises(JSONDecodeError, decoder.feed, '[1, x]')
+		self.assertRaises(ValueError, decoder.feed, '[1]')
+
+class TestConcatenatedDocuments(JysonTest):
+
+	def testRawDecode(self):
+		json_text = '{"a": 1} [2, 3]  "x"'
+		self.failUnlessEqual(({'a': 1}, 8), self.codec.raw_decode(json_text))
+		self.failUnlessEqual(([2, 3], 15), self.codec.raw_decode(json_text, 8))
+		self.failUnlessEqual(('x', 20), self.codec.raw_decode(json_text, start=15, accept_any_primary_datum=True))
+		self.assertRaises(JSONDecodeError, self.codec.raw_decode, json_text, 15)
+		self.assertRaises(JSONDecodeError, self.codec.raw_decode, json_text, 20)
+		self.assertRaises(ValueError, self.codec.raw_decode, json_text, 21)
+
+	def testRawDecodeNumberEndPosition(self):
+		self.failUnlessEqual((12, 2), self.codec.raw_decode('12,34', accept_any_primary_datum=True))
+
+	def testIterDocuments(self):
+		json_text = '{"a": 1}{"b": [2]}\n[3] \n\t[]\n'
+		self.failUnlessEqual([{'a': 1}, {'b': [2]}, [3], []], list(self.codec.iter_documents(json_text)))
+		self.failUnlessEqual([], list(self.codec.iter_documents('  \n')))
+
+	def testIterDocumentsFromFile(self):
+		reader = java.io.StringReader('[1] [2]\n' * 1000)
+		self.failUnlessEqual([[1], [2]] * 1000, list(self.codec.iter_documents(reader, buffer_size=7)))
+
+	def testIterDocumentsWithOptions(self):
+		json_text = "1 'two' # comment\n [3,]"
+		self.failUnlessEqual([1, 'two', [3]], list(self.codec.iter_documents(json_text, strict_mode=False)))
+		self.assertRaises(JSONDecodeError, list, self.codec.iter_documents(json_text))
+
+	def testIterDocumentsError(self):
+		documents = self.codec.iter_documents('[1] [2, x] [3]')
+		self.failUnlessEqual([1], documents.next())
+		self.assertRaises(JSONDecodeError, documents.next)
+
+class Point(object):
+
+	__slots__ = ('x', 'y')
+
+	def __init__(self, x, y):
+		self.x = x
+		self.y = y
+
+class Shape(object):
+
+	__slots__ = ['name', 'points', 'tags', 'closed']
+
+	def __init__(self, name, points, tags, closed):
+		self.name = name
+		self.points = points
+		self.tags = tags
+		self.closed = closed
+
+class TestSchemaRecords(JysonTest):
+
+	def setUp(self):
+		JysonTest.setUp(self)
+		self.point = self.codec.compile({'x': float, 'y': float}, Point)
+		self.shape = self.codec.compile({'name': unicode, 'points': [self.point], 'tags': (list, type(None)), 'closed': bool}, Shape)
+
+	def testDecodeRecord(self):
+		point = self.point.decode('{"y": 2.5, "x": 1}')
+		self.failUnless(isinstance(point, Point))
+		self.failUnlessEqual((1, 2.5), (point.x, point.y))
+
+	def testDecodeNestedRecords(self):
+		shape = self.shape.decode('{"name": "triangle", "closed": true, "points": [{"x": 0, "y": 0}, {"x": 1, "y": 0}, {"x": 0, "y": 1}], "tags": ["a", {"b": 1}]}')
+		self.failUnlessEqual("triangle", shape.name)
+		self.failUnlessEqual(True, shape.closed)
+		self.failUnlessEqual([(0, 0), (1, 0), (0, 1)], [(p.x, p.y) for p in shape.points])
+		self.failUnlessEqual(["a", {"b": 1}], shape.tags)
+
+	def testUnknownMembersSkipped(self):
+		point = self.point.decode('{"x": 1, "z": {"deep": [1, 2, {"x": "not a number"}]}, "y": 2}')
+		self.failUnlessEqual((1, 2), (point.x, point.y))
+
+	def testMissingMembers(self):
+		shape = self.shape.decode('{"name": "empty", "points": [], "closed": false}')
+		self.failUnlessEqual(None, shape.tags)
+		self.assertRaises(JSONDecodeError, self.point.decode, '{"x": 1}')
+
+	def testTypesCheckedWhileDecoding(self):
+		for json_text in ['{"x": "1", "y": 2}', '{"x": 1, "y": null}', '[1, 2]', '{"x": 1, "y": [2]}']:
+			self.assertRaises(JSONDecodeError, self.point.decode, json_text)
+		integer_point = self.codec.compile({'x': int, 'y': (int, type(None))}, Point)
+		self.failUnlessEqual((1, None), (lambda p: (p.x, p.y))(integer_point.decode('{"x": 1, "y": null}')))
+		self.assertRaises(JSONDecodeError, integer_point.decode, '{"x": 1.5, "y": 2}')
+		self.assertRaises(JSONDecodeError, self.shape.decode, '{"name": "s", "points": [{"x": 1, "y": 2}, 3], "closed": true}')
+
+	def testCodecOptionsApply(self):
+		self.assertRaises(JSONDecodeError, self.point.decode, '{"x": 1, "y": 2,}')
+		self.codec.strict_mode = False
+		point = self.point.decode("{'x': 1, 'y': 2,}")
+		self.failUnlessEqual((1, 2), (point.x, point.y))
+
+	def testCompileErrors(self):
+		self.assertRaises(TypeError, self.codec.compile, {'x': float}, MyTestClass)
+		self.assertRaises(TypeError, self.codec.compile, {'z': float}, Point)
+		self.assertRaises(TypeError, self.codec.compile, {'x': {'a': int}}, Point)
+		self.assertRaises(TypeError, self.codec.compile, {'x': [int, float]}, Point)
+
 if __name__ == "__main__":
 	unittest.main()